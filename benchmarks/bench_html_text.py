@@ -0,0 +1,79 @@
+"""Benchmark HTML-to-text extraction on large newsletter-style HTML.
+
+Shows that full extraction is linear in the HTML size and that the
+bounded preview (as used by get_email_details) stops early, so its cost
+does not grow with the message.
+
+    python benchmarks/bench_html_text.py
+"""
+import argparse
+import base64
+import time
+
+from inbox_classifier.mime import extract_text, iter_decoded
+from inbox_classifier.html_text import html_to_text
+
+HEAD = """<html><head><title>Weekly Deals</title>
+<style>body{margin:0} .btn{background:#f60;color:#fff} @media (max-width:600px){.col{width:100%}}</style>
+</head><body>
+<div style="display:none;max-height:0;overflow:hidden">This week only: up to 50% off &zwnj;&nbsp;&zwnj;&nbsp;</div>
+<table width="100%" cellpadding="0" cellspacing="0"><tr><td align="center">
+<a href="https://example.com/view">View in browser</a>
+"""
+
+ITEM = """<table class="col" width="600" style="border:1px solid #eee"><tr>
+<td><img src="https://cdn.example.com/p/{n}.jpg" width="120" alt=""></td>
+<td style="font-family:Arial,sans-serif;font-size:14px">
+<h2>Product {n} &mdash; now &pound;{n}.99</h2>
+<p>Hand-picked for you. Free delivery on orders over &pound;20 &amp; easy returns.</p>
+<a class="btn" href="https://click.example.com/?u={n}&amp;utm_source=newsletter">Shop now</a>
+</td></tr></table>
+<img src="https://t.example.com/open/{n}.gif" width="1" height="1" style="display:block">
+"""
+
+FOOT = """</td></tr></table>
+<p style="font-size:10px">You received this email because you subscribed. Unsubscribe.</p>
+<script>/* tracking */</script></body></html>"""
+
+
+def newsletter(size: int) -> str:
+    items, n, length = [], 0, len(HEAD) + len(FOOT)
+    while length < size:
+        item = ITEM.format(n=n)
+        items.append(item)
+        length += len(item)
+        n += 1
+    return HEAD + ''.join(items) + FOOT
+
+
+def best_of(func, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', default='100000,1000000,4000000,16000000',
+                        help='Comma-separated HTML sizes in bytes')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'size':>10} {'full (s)':>10} {'full MB/s':>10} {'preview (ms)':>13}")
+    for size in (int(s) for s in args.sizes.split(',')):
+        html = newsletter(size)
+        data = base64.urlsafe_b64encode(html.encode()).decode()
+        payload = {'mimeType': 'text/html', 'body': {'data': data}}
+
+        full = best_of(lambda: html_to_text(iter_decoded(data), max_chars=10 ** 12), args.repeat)
+        preview = best_of(lambda: extract_text(payload), args.repeat)
+        print(f"{len(html):>10} {full:>10.3f} {len(html) / full / 1e6:>10.1f} {preview * 1000:>13.2f}")
+
+    print("\nPreview:", extract_text(payload)[:120].replace('\n', ' | '))
+
+
+if __name__ == '__main__':
+    main()
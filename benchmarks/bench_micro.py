@@ -0,0 +1,236 @@
+"""Micro-benchmarks for the per-message hot paths, with JSON baselines and a regression gate.
+
+Covers parse_categories, parse_skip_rules, should_skip_email,
+get_email_details (header and body extraction, no network) and
+parse_response, on synthetic inputs scaled by category count, rule count
+and message size. Each case reports the best per-call time over several
+timeit repeats, and its time relative to a fixed calibration workload
+timed alongside it; the regression gate compares the relative figure,
+so a uniformly slower or busier machine doesn't fail it.
+
+    python benchmarks/bench_micro.py run                    # print results
+    python benchmarks/bench_micro.py run --save             # write benchmarks/baselines/micro.json
+    python benchmarks/bench_micro.py compare                # exit 1 if a case is >25% slower
+    python benchmarks/bench_micro.py compare --threshold 0.1 --filter skip
+
+Baselines are machine-specific: record one on the machine that compares
+against it (the committed baseline is a reference point, not a gate for
+other hardware). Changes to a hot path should ship with a refreshed
+baseline and the compare output in the commit message.
+"""
+import argparse
+import base64
+import json
+import platform
+import re
+import sys
+import time
+import timeit
+from datetime import datetime, timezone
+from pathlib import Path
+from unittest import mock
+
+from inbox_classifier.ai_classifier import parse_categories, parse_response
+from inbox_classifier.email_fetcher import get_email_details
+from inbox_classifier.skip_rules import parse_skip_rules, should_skip_email
+
+BASELINE = Path(__file__).parent / 'baselines' / 'micro.json'
+DEFAULT_THRESHOLD = 0.25
+
+CATEGORY_COUNTS = (3, 10, 50)
+RULE_COUNTS = (10, 100, 1000)
+MESSAGE_SIZES = (1_000, 100_000, 1_000_000)
+
+CALIBRATION_TEXT = ' '.join(f'Word{n % 37} value-{n}, ' for n in range(300))
+CALIBRATION_PATTERN = re.compile(r'\w+')
+
+SENTENCE = 'Thanks for the update on the quarterly report, please review the attached draft. '
+
+
+def rules_text(categories: int, skip_rules: int = 2) -> str:
+    sections = [
+        f'Category{n} emails include:\n' + '\n'.join(f'- kind {k} of category {n} mail' for k in range(5))
+        for n in range(categories)
+    ]
+    skips = '\n'.join(
+        f'- from:sender{n}@example{n}.com' if n % 2 else f'- subject:Automated report {n}'
+        for n in range(skip_rules)
+    )
+    return '\n\n'.join(sections) + f'\n\nSkip classification for:\n{skips}'
+
+
+def message(shape: str, size: int) -> dict:
+    text = (SENTENCE * (size // len(SENTENCE) + 1))[:size]
+    if shape == 'html':
+        body = '<html><head><style>p{margin:0}</style></head><body>' + ''.join(
+            f'<p>{text[i:i + 400]}</p>' for i in range(0, len(text), 400)
+        ) + '</body></html>'
+    else:
+        body = text
+    data = base64.urlsafe_b64encode(body.encode()).decode()
+    return {
+        'id': 'msg-1',
+        'labelIds': ['INBOX', 'UNREAD'],
+        'payload': {
+            'mimeType': f'text/{shape}',
+            'headers': [{'name': f'X-Header-{n}', 'value': 'x' * 40} for n in range(20)] + [
+                {'name': 'Subject', 'value': 'Quarterly report draft'},
+                {'name': 'From', 'value': 'Dana <dana@work.example.com>'},
+                {'name': 'To', 'value': 'me@example.com'},
+            ],
+            'body': {'size': len(body), 'data': data},
+        },
+    }
+
+
+class StubService:
+    """Just enough of the Gmail service for get_email_details: get() returns the message."""
+
+    def __init__(self, message: dict):
+        self._message = message
+
+    def users(self):
+        return self
+
+    def messages(self):
+        return self
+
+    def get(self, **kwargs):
+        return self._message
+
+
+def cases():
+    """Yield (name, zero-argument callable) for every benchmark case."""
+    for count in CATEGORY_COUNTS:
+        rules = rules_text(count)
+        yield f'parse_categories[categories={count}]', lambda rules=rules: parse_categories(rules)
+
+    for count in RULE_COUNTS:
+        rules = rules_text(3, count)
+        yield f'parse_skip_rules[rules={count}]', lambda rules=rules: parse_skip_rules(rules)
+
+    email = {'sender': 'Dana <dana@work.example.com>', 'subject': 'Quarterly report draft'}
+    for count in RULE_COUNTS:
+        # No rule matches, so every rule is checked
+        skip = parse_skip_rules(rules_text(3, count))
+        yield f'should_skip_email[rules={count}]', lambda skip=skip: should_skip_email(email, skip)
+
+    for shape in ('plain', 'html'):
+        for size in MESSAGE_SIZES:
+            service = StubService(message(shape, size))
+            yield (f'get_email_details[{shape},size={size}]',
+                   lambda service=service: get_email_details(service, 'msg-1'))
+
+    for count in CATEGORY_COUNTS:
+        categories = parse_categories(rules_text(count))
+        reply = f'{count} 92 weekly newsletter from a retailer'
+        yield f'parse_response[categories={count}]', lambda c=categories, r=reply: parse_response(r, c)
+
+
+def calibration():
+    """Fixed pure-Python workload (regex, string and dict operations) used as a speed reference."""
+    counts = {}
+    for word in CALIBRATION_PATTERN.findall(CALIBRATION_TEXT):
+        counts[word.lower()] = counts.get(word.lower(), 0) + 1
+    return sorted(counts.items())
+
+
+def measure(func, repeat: int) -> tuple:
+    """Return the best per-call times, in microseconds, of func and of the calibration workload.
+
+    The two are timed alternately so that both see the same machine load;
+    comparisons use their ratio, which changes little when the whole
+    machine is faster or slower.
+    """
+    timer, reference = timeit.Timer(func), timeit.Timer(calibration)
+    number, _ = timer.autorange()
+    reference_number, _ = reference.autorange()
+    times, reference_times = [], []
+    for _ in range(repeat):
+        times.append(timer.timeit(number) / number)
+        reference_times.append(reference.timeit(reference_number) / reference_number)
+    return min(times) * 1e6, min(reference_times) * 1e6
+
+
+def run(name_filter: str = '', repeat: int = 5) -> dict:
+    results = {}
+    # get_email_details calls the API through gmail_client.execute; serve the stub directly
+    with mock.patch('inbox_classifier.email_fetcher.execute', lambda request: request):
+        for name, func in cases():
+            if name_filter in name:
+                us, reference_us = measure(func, repeat)
+                results[name] = {'us': round(us, 3), 'relative': round(us / reference_us, 4)}
+    return {
+        'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'results': results,
+    }
+
+
+def compare(baseline: dict, current: dict, threshold: float) -> list:
+    """Print baseline vs current per case; return the names of regressed cases.
+
+    The change is measured on time relative to the calibration workload.
+    """
+    regressions = []
+    print(f"{'case':<44} {'baseline us':>12} {'current us':>12} {'change':>8}")
+    for name, result in current['results'].items():
+        before = baseline['results'].get(name)
+        if before is None:
+            print(f"{name:<44} {'-':>12} {result['us']:>12.2f} {'new':>8}")
+            continue
+        change = result['relative'] / before['relative'] - 1
+        flag = ''
+        if change > threshold:
+            regressions.append(name)
+            flag = '  REGRESSED'
+        print(f"{name:<44} {before['us']:>12.2f} {result['us']:>12.2f} {change:>+8.0%}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = commands.add_parser('run', help='Run the benchmarks')
+    run_parser.add_argument('--save', nargs='?', const=BASELINE, type=Path, help='Write results as a baseline')
+
+    compare_parser = commands.add_parser('compare', help='Run (or load) results and compare with a baseline')
+    compare_parser.add_argument('baseline', nargs='?', default=BASELINE, type=Path)
+    compare_parser.add_argument('--current', type=Path, help='Compare a saved result instead of running')
+    compare_parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                                help='Allowed slowdown as a fraction (default 0.25)')
+
+    for sub in (run_parser, compare_parser):
+        sub.add_argument('--filter', default='', help='Only cases whose name contains this')
+        sub.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    if args.command == 'run':
+        start = time.perf_counter()
+        current = run(args.filter, args.repeat)
+        for name, result in current['results'].items():
+            print(f"{name:<44} {result['us']:>12.2f} us {result['relative']:>10.4f}x calibration")
+        print(f"({time.perf_counter() - start:.1f}s)")
+        if args.save:
+            args.save.parent.mkdir(parents=True, exist_ok=True)
+            args.save.write_text(json.dumps(current, indent=2) + '\n')
+            print(f"Saved baseline to {args.save}")
+        return
+
+    baseline = json.loads(args.baseline.read_text())
+    if args.current:
+        current = json.loads(args.current.read_text())
+        current['results'] = {k: v for k, v in current['results'].items() if args.filter in k}
+    else:
+        current = run(args.filter, args.repeat)
+    regressions = compare(baseline, current, args.threshold)
+    if regressions:
+        print(f"\n{len(regressions)} case(s) regressed by more than {args.threshold:.0%}: {', '.join(regressions)}")
+        sys.exit(1)
+    print(f"\nNo case regressed by more than {args.threshold:.0%}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,125 @@
+"""Compare the compact reply protocol with the old free-text "Category: reason" replies.
+
+Offline it measures reply parsing cost and estimated output tokens. With
+--live (needs ANTHROPIC_API_KEY) it also times real calls and reports the
+output tokens the API billed, old protocol vs compact, with and without
+reasons, and the time until a streamed verdict is settled.
+
+    python benchmarks/bench_response_protocol.py
+    python benchmarks/bench_response_protocol.py --live --emails 10
+"""
+import argparse
+import os
+import statistics
+import time
+
+from inbox_classifier.ai_classifier import (
+    build_request, get_client, parse_categories, parse_response, resolve_reasoning, stream_verdict
+)
+from inbox_classifier.condense import estimate_tokens
+
+CATEGORIES = ['Important', 'Action', 'Finance', 'Travel', 'Social', 'Receipts', 'Routine',
+              'Newsletters', 'Promotions', 'Optional']
+RULES = '\n\n'.join(f'{c} emails include:\n- things about {c.lower()}' for c in CATEGORIES)
+
+LEGACY_REPLY = 'Promotions: This is a marketing email from a retailer advertising a seasonal sale with discount codes.'
+COMPACT_REPLY = '9 95 retailer seasonal sale'
+COMPACT_NO_REASON = '9 95'
+
+EMAILS = [
+    {'subject': 'Your March statement is ready', 'sender': 'Bank <alerts@bank.com>', 'to': 'me', 'body': 'Your statement for March is available online.'},
+    {'subject': '48 hours only: 40% off everything', 'sender': 'Shop <deals@shop.com>', 'to': 'me', 'body': 'Use code SPRING40 at checkout.'},
+    {'subject': 'Can you review the draft by Friday?', 'sender': 'Dana <dana@work.com>', 'to': 'me', 'body': 'Attached the proposal, need your comments.'},
+    {'subject': 'Your flight to Lisbon', 'sender': 'Airline <noreply@air.com>', 'to': 'me', 'body': 'Check-in opens 24 hours before departure.'},
+]
+
+
+def legacy_parse(response_text, categories):
+    """The previous parser: a startswith check per category."""
+    for category in categories:
+        if response_text.startswith(f'{category}:'):
+            return {
+                'classification': category,
+                'reasoning': response_text.replace(f'{category}:', '').strip()
+            }
+    return None
+
+
+def legacy_request(email, rules, model):
+    """The previous request: free-text reply, max_tokens=150, no stop sequence."""
+    categories = parse_categories(rules)
+    response_format = '\nor\n'.join(f'{c}: [brief reason]' for c in categories)
+    prompt = (f"Analyze this email and classify it as {', '.join(categories)}.\n\n{rules}\n\n"
+              f"Email Details:\nSubject: {email['subject']}\nFrom: {email['sender']}\n"
+              f"To: {email['to']}\nBody: {email['body']}\n\n"
+              f"Respond with EXACTLY this format:\n{response_format}\n")
+    return {'model': model, 'max_tokens': 150, 'messages': [{'role': 'user', 'content': prompt}]}
+
+
+def time_parse(parse, reply, n):
+    start = time.perf_counter()
+    for _ in range(n):
+        parse(reply, CATEGORIES)
+    return (time.perf_counter() - start) / n * 1e6
+
+
+def offline(n):
+    print(f"{'protocol':<22} {'parse (us)':>11} {'est. output tokens':>19}")
+    for name, parse, reply in [
+        ('legacy free text', legacy_parse, LEGACY_REPLY),
+        ('compact + reason', parse_response, COMPACT_REPLY),
+        ('compact, no reason', parse_response, COMPACT_NO_REASON),
+    ]:
+        assert parse(reply, CATEGORIES)['classification'] == 'Promotions'
+        print(f"{name:<22} {time_parse(parse, reply, n):>11.2f} {estimate_tokens(reply):>19}")
+
+
+def live(model, emails):
+    client = get_client(os.environ['ANTHROPIC_API_KEY'])
+    variants = [
+        ('legacy free text', lambda e: legacy_request(e, RULES, model), None),
+        ('compact + reason', lambda e: build_request(e, RULES, model), 'on'),
+        ('compact, no reason', lambda e: build_request(e, RULES, model), 'off'),
+    ]
+    print(f"\n{model}: {'protocol':<22} {'median (ms)':>12} {'mean out tokens':>16}")
+    for name, request, reasons in variants:
+        if reasons:
+            os.environ['CLASSIFIER_REASONS'] = reasons
+        latencies, tokens = [], []
+        for i in range(emails):
+            params = request(EMAILS[i % len(EMAILS)])
+            start = time.perf_counter()
+            message = client.messages.create(**params)
+            latencies.append((time.perf_counter() - start) * 1000)
+            tokens.append(message.usage.output_tokens)
+        print(f"{'':<{len(model) + 2}}{name:<22} {statistics.median(latencies):>12.0f} "
+              f"{statistics.mean(tokens):>16.1f}")
+
+    os.environ['CLASSIFIER_REASONS'] = 'on'
+    to_verdict, to_reason = [], []
+    for i in range(emails):
+        params = build_request(EMAILS[i % len(EMAILS)], RULES, model)
+        start = time.perf_counter()
+        result = stream_verdict(client, params, CATEGORIES)
+        to_verdict.append((time.perf_counter() - start) * 1000)
+        resolve_reasoning(result)
+        to_reason.append((time.perf_counter() - start) * 1000)
+    print(f"{'':<{len(model) + 2}}{'streamed verdict':<22} {statistics.median(to_verdict):>12.0f}"
+          f"   (reason complete at {statistics.median(to_reason):.0f} ms)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--live', action='store_true', help='Also call the API (needs ANTHROPIC_API_KEY)')
+    parser.add_argument('--model', default='claude-haiku-4-5')
+    parser.add_argument('--emails', type=int, default=8)
+    parser.add_argument('-n', type=int, default=200_000, help='Parse iterations')
+    args = parser.parse_args()
+
+    offline(args.n)
+    if args.live:
+        live(args.model, args.emails)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,137 @@
+"""End-to-end throughput of process_emails against local Gmail and Anthropic stand-ins.
+
+A synthetic backlog (synthetic.Mailbox, next to this script) is served by
+FakeGmail at the HTTP transport level, so quota scheduling, retries,
+MIME decoding, the pipeline, the ledger and the logs all run for real;
+FakeAnthropic answers in the compact reply protocol. Polling cycles run
+back to back (no sleep between them) until the backlog is labeled or
+stops making progress.
+
+Reports emails/s, p50/p99 time-to-label (from the start of the run, when
+the whole backlog is already waiting) and API calls per backlog email.
+
+    python benchmarks/bench_throughput.py --sizes 100,10000
+    python benchmarks/bench_throughput.py --sizes 100000 --gmail-quota 5000 \
+        --gmail-latency 0.02 --claude-latency 0.4 --error-rate 0.01
+
+Gmail's real per-user quota (250 units/s) caps messages.get at about 45/s,
+so a 100k backlog takes over half an hour at the default settings;
+--gmail-quota raises the simulated limit (and the client's budget to
+match) to find the next bottleneck. Pipeline worker counts and the rest
+of the configuration come from the usual environment variables (PIPELINE_*_WORKERS, BATCH_THRESHOLD, CLASSIFIER_STREAMING, ...).
+"""
+import argparse
+import logging
+import os
+import tempfile
+import time
+from unittest import mock
+
+import fakes
+from fakes import FakeAnthropic, FakeGmail, Latency
+from inbox_classifier import ai_classifier
+from inbox_classifier.accounts import Account
+from inbox_classifier.main import process_emails
+from synthetic import Mailbox
+
+# Consecutive cycles without a newly labeled email before a run gives up
+MAX_STALLED_CYCLES = 3
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] if ordered else float('nan')
+
+
+def run(size, args):
+    mailbox = Mailbox(size, seed=args.seed)
+    gmail = FakeGmail(mailbox, Latency(args.gmail_latency, seed=args.seed), args.error_rate,
+                      units_per_second=args.gmail_quota, seed=args.seed)
+    claude = FakeAnthropic(mailbox=mailbox, latency=Latency(args.claude_latency, seed=args.seed),
+                           per_token=args.token_latency, error_rate=args.error_rate,
+                           requests_per_minute=args.claude_rpm, batch_latency=args.batch_latency,
+                           seed=args.seed)
+
+    patches = [
+        mock.patch('inbox_classifier.main.get_gmail_service', lambda token_path=None: gmail.service()),
+        mock.patch('inbox_classifier.gmail_client.thread_http', fakes.thread_http),
+        mock.patch.object(ai_classifier, 'Anthropic', claude),
+        mock.patch.dict(os.environ, {
+            'ANTHROPIC_API_KEY': 'bench',
+            'GMAIL_QUOTA_UNITS_PER_SECOND': str(args.gmail_quota),
+        }),
+    ]
+
+    with tempfile.TemporaryDirectory() as config_dir:
+        account = Account('bench', config_dir)
+        for patch in patches:
+            patch.start()
+        ai_classifier._clients.clear()
+        try:
+            start = time.monotonic()
+            cycles = stalled = 0
+            while gmail.unlabeled() and stalled < MAX_STALLED_CYCLES:
+                labeled = len(gmail.labeled_at)
+                process_emails([account])
+                cycles += 1
+                if len(gmail.labeled_at) > labeled:
+                    stalled = 0
+                elif claude.pending_batch_end() is not None:
+                    # Nothing to do until a batch ends; the service would be polling meanwhile
+                    time.sleep(max(0.0, claude.pending_batch_end() - time.monotonic()) + 0.01)
+                else:
+                    stalled += 1
+            elapsed = time.monotonic() - start
+        finally:
+            for patch in reversed(patches):
+                patch.stop()
+            ai_classifier._clients.clear()
+
+    latencies = [t - start for t in gmail.labeled_at.values()]
+    labeled = len(latencies)
+    per_email = max(size, 1)
+    return {
+        'size': size,
+        'labeled': labeled,
+        'cycles': cycles,
+        'seconds': elapsed,
+        'emails_per_second': labeled / elapsed if elapsed else 0.0,
+        'p50': percentile(latencies, 0.5),
+        'p99': percentile(latencies, 0.99),
+        'gmail_calls': {k.replace('gmail.users.', ''): v / per_email for k, v in sorted(gmail.calls.items())},
+        'gmail_units': gmail.units / per_email,
+        'claude_calls': {k: v / per_email for k, v in sorted(claude.calls.items())},
+    }
+
+
+def report(result):
+    print(f"\n{result['size']} emails: {result['labeled']} labeled in {result['seconds']:.1f}s "
+          f"over {result['cycles']} cycles")
+    print(f"  throughput     {result['emails_per_second']:.1f} emails/s")
+    print(f"  time-to-label  p50 {result['p50']:.2f}s  p99 {result['p99']:.2f}s")
+    print("  Gmail/email    " + ', '.join(f'{k} {v:.3f}' for k, v in result['gmail_calls'].items())
+          + f"  ({result['gmail_units']:.1f} quota units)")
+    print("  Claude/email   " + (', '.join(f'{k} {v:.3f}' for k, v in result['claude_calls'].items()) or 'none'))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', default='100,10000,100000', help='Comma-separated backlog sizes')
+    parser.add_argument('--gmail-latency', type=float, default=0.03, help='Mean Gmail call latency (s)')
+    parser.add_argument('--gmail-quota', type=float, default=250, help='Gmail quota units per second')
+    parser.add_argument('--claude-latency', type=float, default=0.4, help='Mean time to first token (s)')
+    parser.add_argument('--token-latency', type=float, default=0.01, help='Seconds per output token')
+    parser.add_argument('--claude-rpm', type=float, default=None, help='Anthropic requests per minute limit')
+    parser.add_argument('--batch-latency', type=float, default=5.0, help='Seconds until a message batch ends')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Share of calls failing with a 5xx')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--verbose', action='store_true', help='Show the service log')
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.INFO if args.verbose else logging.WARNING)
+    for size in (int(s) for s in args.sizes.split(',')):
+        report(run(size, args))
+
+
+if __name__ == '__main__':
+    main()
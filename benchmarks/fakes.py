@@ -0,0 +1,482 @@
+import itertools
+import json
+import math
+import random
+import re
+import threading
+import time
+from collections import Counter
+from types import SimpleNamespace
+from typing import Callable, Dict, Iterator, List
+from urllib.parse import parse_qs, urlparse
+
+import anthropic
+import httplib2
+from google.oauth2.credentials import Credentials
+from google_auth_httplib2 import AuthorizedHttp
+from googleapiclient.discovery import build
+
+from inbox_classifier.batches import BatchResult
+from inbox_classifier.condense import estimate_tokens
+from inbox_classifier.gmail_quota import METHOD_COSTS
+from synthetic import Mailbox
+
+
+class Latency:
+    """Simulated network latency, log-normally distributed around `mean` seconds."""
+
+    def __init__(self, mean: float = 0.0, sigma: float = 0.5, seed: int = 0):
+        self.mean = mean
+        self.sigma = sigma
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def sample(self) -> float:
+        if self.mean <= 0:
+            return 0.0
+        with self._lock:
+            return self._rng.lognormvariate(math.log(self.mean) - self.sigma ** 2 / 2, self.sigma)
+
+    def wait(self):
+        delay = self.sample()
+        if delay:
+            time.sleep(delay)
+
+
+class TokenBucket:
+    """Per-second budget refilled continuously, like Gmail's per-user quota."""
+
+    def __init__(self, per_second: float, clock: Callable[[], float] = time.monotonic):
+        self.per_second = per_second
+        self.clock = clock
+        self._tokens = per_second
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def take(self, amount: float) -> bool:
+        """Spend amount if available; False means the caller is rate limited."""
+        with self._lock:
+            now = self.clock()
+            self._tokens = min(self.per_second, self._tokens + (now - self._updated) * self.per_second)
+            self._updated = now
+            if self._tokens < amount:
+                return False
+            self._tokens -= amount
+            return True
+
+
+# FakeGmail instances by access token, so transports cached per thread by
+# gmail_client reach the mailbox their credentials belong to
+_gmail_servers: Dict[str, 'FakeGmail'] = {}
+_gmail_ids = itertools.count(1)
+
+ROUTES = [
+    ('GET', re.compile(r'/gmail/v1/users/me/messages$'), 'gmail.users.messages.list'),
+    ('POST', re.compile(r'/gmail/v1/users/me/messages/batchModify$'), 'gmail.users.messages.batchModify'),
+    ('GET', re.compile(r'/gmail/v1/users/me/messages/(?P<id>[^/]+)$'), 'gmail.users.messages.get'),
+    ('POST', re.compile(r'/gmail/v1/users/me/messages/(?P<id>[^/]+)/modify$'), 'gmail.users.messages.modify'),
+    ('GET', re.compile(r'/gmail/v1/users/me/labels$'), 'gmail.users.labels.list'),
+    ('POST', re.compile(r'/gmail/v1/users/me/labels$'), 'gmail.users.labels.create'),
+]
+
+
+class FakeHttp:
+    """httplib2.Http stand-in routing Gmail REST calls to the FakeGmail they authorize for."""
+
+    timeout = None
+    follow_redirects = True
+    redirect_codes = frozenset()
+
+    def __init__(self, *args, **kwargs):
+        self.connections = {}
+
+    def request(self, uri, method='GET', body=None, headers=None, **kwargs):
+        token = (headers or {}).get('authorization', '').rpartition(' ')[2]
+        server = _gmail_servers.get(token)
+        if server is None:
+            return httplib2.Response({'status': 401}), b'{"error": {"code": 401, "message": "Invalid Credentials"}}'
+        return server.handle(method, uri, body)
+
+    def add_certificate(self, *args, **kwargs):
+        pass
+
+    def close(self):
+        pass
+
+
+def thread_http(credentials) -> AuthorizedHttp:
+    """Drop-in for gmail_client.thread_http that serves requests from FakeGmail.
+
+    Patch it over gmail_client.thread_http so every request made through
+    gmail_client.execute (quota scheduling and retries included) is served
+    locally.
+    """
+    return AuthorizedHttp(credentials, http=FakeHttp())
+
+
+class FakeGmail:
+    """In-process stand-in for the Gmail REST API serving a synthetic Mailbox.
+
+    Serves messages.list (with the unread/label query), messages.get,
+    modify, batchModify and labels. Each call waits a sampled latency,
+    spends Gmail's quota units (429 rateLimitExceeded when over
+    `units_per_second`) and fails with a 503 at `error_rate`.
+
+    With `delivered` set, only that many messages are in the inbox at
+    first; deliver() brings in more, cycling through the mailbox under new
+    IDs once it runs out, so a long run sees a steady stream of new mail.
+
+    Attributes:
+        calls: Counter of calls by method ID (rate-limited and failed ones included)
+        labeled_at: time.monotonic() when each message was labeled and archived
+    """
+
+    def __init__(self, mailbox: Mailbox, latency: Latency = None, error_rate: float = 0.0,
+                 units_per_second: float = 250, seed: int = 0, delivered: int = None):
+        self.mailbox = mailbox
+        self.latency = latency or Latency()
+        self.error_rate = error_rate
+        self.quota = TokenBucket(units_per_second)
+        self.calls: Counter = Counter()
+        self.units = 0
+        self.labeled_at: Dict[str, float] = {}
+
+        self.labels: Dict[str, Dict] = {}
+        self._message_labels: Dict[str, set] = {}
+        self._threads: Dict[str, str] = {}
+        self.delivered = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._service = None
+
+        self.deliver(mailbox.size if delivered is None else delivered)
+
+        self.token = f'fake-gmail-{next(_gmail_ids)}'
+        _gmail_servers[self.token] = self
+
+    def service(self, new: bool = False):
+        """Return a googleapiclient Gmail service authorized for this mailbox.
+
+        Args:
+            new: Build a fresh service, as get_gmail_service does each cycle
+        """
+        if self._service is None or new:
+            credentials = Credentials(token=self.token, refresh_token=self.token)
+            self._service = build('gmail', 'v1', credentials=credentials, static_discovery=True)
+        return self._service
+
+    def deliver(self, count: int = 1):
+        """Bring the next `count` mailbox messages into the inbox, unread."""
+        with self._lock:
+            for number in range(self.delivered, self.delivered + count):
+                message_id = f'{number + 1:016x}'
+                self._message_labels[message_id] = {'INBOX', 'UNREAD'}
+                self._threads[message_id] = self.mailbox.messages[number % self.mailbox.size][1]
+            self.delivered += count
+
+    def expunge_archived(self) -> int:
+        """Forget messages that have left the inbox, keeping a long run's state bounded.
+
+        Returns:
+            Number of messages forgotten
+        """
+        with self._lock:
+            archived = [i for i, labels in self._message_labels.items() if 'INBOX' not in labels]
+            for message_id in archived:
+                del self._message_labels[message_id], self._threads[message_id]
+                self.labeled_at.pop(message_id, None)
+        return len(archived)
+
+    def unlabeled(self) -> int:
+        """Return how many messages are still unread in the inbox."""
+        with self._lock:
+            return sum(1 for labels in self._message_labels.values() if {'INBOX', 'UNREAD'} <= labels)
+
+    def handle(self, method: str, uri: str, body) -> tuple:
+        url = urlparse(uri)
+        for route_method, pattern, method_id in ROUTES:
+            match = pattern.match(url.path)
+            if match and route_method == method:
+                break
+        else:
+            return self._response(404, {'error': {'code': 404, 'message': f'No route for {method} {url.path}'}})
+
+        self.latency.wait()
+        with self._lock:
+            self.calls[method_id] += 1
+            failed = self._rng.random() < self.error_rate
+        if not self.quota.take(METHOD_COSTS.get(method_id, 5)):
+            return self._response(429, {'error': {'code': 429, 'message': 'User-rate limit exceeded',
+                                                  'errors': [{'reason': 'rateLimitExceeded'}]}})
+        if failed:
+            return self._response(503, {'error': {'code': 503, 'message': 'Backend Error'}})
+
+        with self._lock:
+            self.units += METHOD_COSTS.get(method_id, 5)
+        query = {k: v[0] for k, v in parse_qs(url.query).items()}
+        data = json.loads(body) if body else {}
+        handler = getattr(self, '_' + method_id.rsplit('.', 2)[-2] + '_' + method_id.rsplit('.', 1)[-1])
+        return handler(query, data, **match.groupdict())
+
+    def _messages_list(self, query: Dict, data: Dict):
+        terms = query.get('q', '').split()
+        excluded = {self._label_id(t[len('-label:'):]) for t in terms if t.startswith('-label:')}
+        required = {'UNREAD'} if 'is:unread' in terms else set()
+        if 'in:inbox' in terms:
+            required.add('INBOX')
+
+        with self._lock:
+            ids = [message_id for message_id, labels in self._message_labels.items()
+                   if required <= labels and not labels & excluded]
+        start = int(query.get('pageToken') or 0)
+        end = start + int(query.get('maxResults', 100))
+        page = [{'id': i, 'threadId': self._threads[i]} for i in ids[start:end]]
+        result = {'messages': page, 'resultSizeEstimate': len(ids)}
+        if end < len(ids):
+            result['nextPageToken'] = str(end)
+        return self._response(200, result)
+
+    def _messages_get(self, query: Dict, data: Dict, id: str):
+        with self._lock:
+            labels = self._message_labels.get(id)
+        if labels is None:
+            return self._response(404, {'error': {'code': 404, 'message': 'Not Found'}})
+        message = self.mailbox.payload((int(id, 16) - 1) % self.mailbox.size)
+        message['id'] = id
+        with self._lock:
+            message['labelIds'] = sorted(labels)
+        return self._response(200, message)
+
+    def _messages_modify(self, query: Dict, data: Dict, id: str):
+        self._modify([id], data)
+        with self._lock:
+            return self._response(200, {'id': id, 'labelIds': sorted(self._message_labels[id])})
+
+    def _messages_batchModify(self, query: Dict, data: Dict):
+        self._modify(data.get('ids', []), data)
+        return self._response(204, None)
+
+    def _labels_list(self, query: Dict, data: Dict):
+        with self._lock:
+            return self._response(200, {'labels': list(self.labels.values())})
+
+    def _labels_create(self, query: Dict, data: Dict):
+        with self._lock:
+            label = {'id': f'Label_{len(self.labels) + 1}', 'name': data['name'], 'type': 'user'}
+            self.labels[label['id']] = label
+        return self._response(200, label)
+
+    def _modify(self, ids: List[str], data: Dict):
+        now = time.monotonic()
+        with self._lock:
+            for message_id in ids:
+                labels = self._message_labels[message_id]
+                labels.update(data.get('addLabelIds', []))
+                labels.difference_update(data.get('removeLabelIds', []))
+                if 'INBOX' in data.get('removeLabelIds', []):
+                    self.labeled_at.setdefault(message_id, now)
+
+    def _label_id(self, name: str) -> str | None:
+        return next((label['id'] for label in self.labels.values() if label['name'] == name), None)
+
+    @staticmethod
+    def _response(status: int, payload) -> tuple:
+        content = b'' if payload is None else json.dumps(payload).encode('utf-8')
+        return httplib2.Response({'status': status, 'content-type': 'application/json'}), content
+
+
+def _http_response(status: int, headers: Dict = None):
+    return SimpleNamespace(status_code=status, headers=headers or {}, request=None)
+
+
+class FakeStream:
+    """A raw Messages API event stream that releases tokens at a steady pace.
+
+    Starts with message_start (carrying the input token count) and ends
+    with message_delta (the output token count), like the real stream.
+    """
+
+    def __init__(self, pieces: List[str], first_token: float, per_token: float, input_tokens: int = 0):
+        self.pieces = pieces
+        self.first_token = first_token
+        self.per_token = per_token
+        self.input_tokens = input_tokens
+        self.closed = False
+
+    def __iter__(self) -> Iterator:
+        yield SimpleNamespace(type='message_start', message=SimpleNamespace(
+            usage=SimpleNamespace(input_tokens=self.input_tokens, output_tokens=1)))
+        time.sleep(self.first_token)
+        for index, piece in enumerate(self.pieces):
+            if self.closed:
+                return
+            if index:
+                time.sleep(self.per_token)
+            yield SimpleNamespace(type='content_block_delta', delta=SimpleNamespace(type='text_delta', text=piece))
+        yield SimpleNamespace(type='message_delta', usage=SimpleNamespace(
+            output_tokens=estimate_tokens(''.join(self.pieces))))
+
+    def close(self):
+        self.closed = True
+
+
+class FakeAnthropic:
+    """In-process stand-in for the Anthropic client: messages.create and message batches.
+
+    Replies follow the classifier's compact protocol ("<code> <confidence>
+    <reason>"). The category comes from `answer(prompt)` (by default the
+    synthetic mailbox's category for the prompt's From line); a share
+    `unsure_rate` of replies carry low confidence so the cascade
+    escalates. Each reply waits a sampled time to first token plus
+    `per_token` per output token; calls fail with a 500 at `error_rate`
+    and with a 429 (Retry-After: 1) beyond `requests_per_minute`.
+
+    Use an instance in place of the Anthropic class: calling it returns
+    itself.
+
+    Attributes:
+        calls: Counter of calls ('messages.create', 'batches.create', ...)
+        usage: Counter of input_tokens and output_tokens generated
+    """
+
+    def __init__(self, answer: Callable[[str], str] = None, mailbox: Mailbox = None,
+                 latency: Latency = None, per_token: float = 0.0, error_rate: float = 0.0,
+                 requests_per_minute: float = None, unsure_rate: float = 0.1,
+                 batch_latency: float = 0.0, seed: int = 0):
+        if answer is None and mailbox is not None:
+            answer = lambda prompt: mailbox.category_of(_from_line(prompt))
+        self.answer = answer or (lambda prompt: None)
+        self.latency = latency or Latency()
+        self.per_token = per_token
+        self.error_rate = error_rate
+        self.limiter = TokenBucket(requests_per_minute / 60) if requests_per_minute else None
+        self.unsure_rate = unsure_rate
+        self.batch_latency = batch_latency
+        self.calls: Counter = Counter()
+        self.usage: Counter = Counter()
+
+        self.messages = self
+        self.batches = SimpleNamespace(create=self._batch_create, retrieve=self._batch_retrieve,
+                                       results=self._batch_results)
+        self._batches: Dict[str, tuple] = {}
+        self._batch_ids = itertools.count(1)
+        self._collected = set()
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def __call__(self, *args, **kwargs) -> 'FakeAnthropic':
+        return self
+
+    def create(self, model: str, max_tokens: int, messages: List[Dict], stream: bool = False, **kwargs):
+        with self._lock:
+            self.calls['messages.create'] += 1
+            failed = self._rng.random() < self.error_rate
+        if self.limiter and not self.limiter.take(1):
+            raise anthropic.RateLimitError('rate_limit_error', response=_http_response(429, {'retry-after': '1'}),
+                                           body=None)
+        if failed:
+            raise anthropic.InternalServerError('api_error', response=_http_response(500), body=None)
+
+        prompt = messages[0]['content']
+        text = self._reply(prompt, max_tokens)
+        pieces = re.findall(r'\S+\s*', text)
+        if stream:
+            return FakeStream(pieces, self.latency.sample(), self.per_token, estimate_tokens(prompt))
+        time.sleep(self.latency.sample() + self.per_token * max(len(pieces) - 1, 0))
+        return self._message(model, prompt, text)
+
+    def _reply(self, prompt: str, max_tokens: int) -> str:
+        categories = re.findall(r'^(\d+) = (\w+)$', prompt, re.MULTILINE)
+        category = self.answer(prompt)
+        code = next((c for c, name in categories if name == category), None)
+        with self._lock:
+            if code is None:
+                code = self._rng.choice(categories)[0] if categories else '1'
+            confidence = self._rng.randint(40, 70) if self._rng.random() < self.unsure_rate else self._rng.randint(85, 99)
+            self.usage['input_tokens'] += estimate_tokens(prompt)
+        text = f'{code} {confidence}'
+        if 'then a reason' in prompt:
+            text += f' synthetic {(category or "unknown").lower()} mail'
+        with self._lock:
+            self.usage['output_tokens'] += min(max_tokens, estimate_tokens(text))
+        return text
+
+    @staticmethod
+    def _message(model: str, prompt: str, text: str):
+        return SimpleNamespace(
+            model=model, stop_reason='stop_sequence',
+            content=[SimpleNamespace(type='text', text=text)],
+            usage=SimpleNamespace(input_tokens=estimate_tokens(prompt), output_tokens=estimate_tokens(text)),
+        )
+
+    def pending_batch_end(self) -> float | None:
+        """Return when the next batch whose results weren't fetched ends (monotonic), if any."""
+        with self._lock:
+            ends = [ends_at for batch_id, (ends_at, _) in self._batches.items() if batch_id not in self._collected]
+        return min(ends) if ends else None
+
+    def _batch_create(self, requests: List[Dict], **kwargs):
+        with self._lock:
+            self.calls['batches.create'] += 1
+            self.calls['batch_requests'] += len(requests)
+            batch_id = f'msgbatch_fake_{next(self._batch_ids)}'
+            self._batches[batch_id] = (time.monotonic() + self.batch_latency, list(requests))
+        return SimpleNamespace(id=batch_id)
+
+    def _batch_retrieve(self, batch_id: str, **kwargs):
+        with self._lock:
+            self.calls['batches.retrieve'] += 1
+            ends_at, _ = self._batches[batch_id]
+        return SimpleNamespace(id=batch_id, processing_status='ended' if time.monotonic() >= ends_at else 'in_progress')
+
+    def _batch_results(self, batch_id: str, **kwargs):
+        with self._lock:
+            self.calls['batches.results'] += 1
+            self._collected.add(batch_id)
+            _, requests = self._batches[batch_id]
+        for request in requests:
+            params = request['params']
+            prompt = params['messages'][0]['content']
+            text = self._reply(prompt, params['max_tokens'])
+            yield SimpleNamespace(custom_id=request['custom_id'], result=SimpleNamespace(
+                type='succeeded', message=self._message(params['model'], prompt, text)))
+
+
+def _from_line(prompt: str) -> str:
+    match = re.search(r'^From: (.*)$', prompt, re.MULTILINE)
+    return match.group(1) if match else ''
+
+
+class FakeBatchClient:
+    """Local stand-in for AnthropicBatchClient, patched over main.get_batch_client.
+
+    Each request is answered by `reply(params)`; a batch ends after it has
+    been polled `polls_until_done` times.
+    """
+
+    def __init__(self, reply: Callable[[Dict], str], polls_until_done: int = 0):
+        self.reply = reply
+        self.polls_until_done = polls_until_done
+        self.batches: Dict[str, List[Dict]] = {}
+        self._polls: Dict[str, int] = {}
+        self._ids = itertools.count(1)
+
+    def create(self, requests: List[Dict]) -> str:
+        batch_id = f'msgbatch_fake_{next(self._ids)}'
+        self.batches[batch_id] = list(requests)
+        self._polls[batch_id] = 0
+        return batch_id
+
+    def is_done(self, batch_id: str) -> bool:
+        if batch_id not in self.batches:
+            return True
+        self._polls[batch_id] += 1
+        return self._polls[batch_id] > self.polls_until_done
+
+    def results(self, batch_id: str) -> Iterator[BatchResult]:
+        for request in self.batches.get(batch_id, []):
+            text = self.reply(request['params'])
+            if text is None:
+                yield request['custom_id'], None, 'errored', None
+            else:
+                yield request['custom_id'], text, None, None
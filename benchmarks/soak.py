@@ -0,0 +1,334 @@
+"""Soak test: main.main for many polling cycles, watching for leaks.
+
+Runs the service loop itself (inbox_classifier.main.main) against the
+local Gmail and Anthropic stand-ins (benchmarks/fakes.py), with new
+mail arriving between cycles at --mail-per-hour. Only the HTTP transport
+is faked: each cycle builds a new Gmail service on gmail_client's
+per-thread transport cache and opens its ledger and classification log,
+as in production. Every --sample-every cycles the harness records RSS, open file
+descriptors, sockets, threads and (with --tracemalloc) traced memory. After
+the warmup it compares the second half of the samples with the first and
+fails (exit status 1) if any of them grows faster per cycle than its
+threshold.
+
+RSS is the gate for leaks anywhere, C extensions included. When it
+fails, rerun with --tracemalloc to see which lines allocate the growth;
+tracing inflates RSS itself, so it is then gated on traced memory instead.
+
+By default time is compressed: the sleep between cycles only advances a
+virtual clock, which also drives the ledger, the daily log rotation and
+the poll scheduler, so days of cycles (and their log rotations and ledger
+pruning) run in minutes. --speedup 1 sleeps for real.
+
+    python benchmarks/soak.py --cycles 20000
+    python benchmarks/soak.py --days 7 --mail-per-hour 60 --csv soak.csv
+    python benchmarks/soak.py --cycles 5000 --tracemalloc --frames 5
+    python benchmarks/soak.py --cycles 500 --speedup 60
+
+The rest of the configuration comes from the usual environment variables (POLL_*,
+PIPELINE_*_WORKERS, CLASSIFICATION_STORE, BATCH_THRESHOLD, ...).
+"""
+import argparse
+import csv
+import gc
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+from types import SimpleNamespace
+from unittest import mock
+
+from fakes import FakeAnthropic, FakeGmail, FakeHttp
+from inbox_classifier import ai_classifier, main as service
+from inbox_classifier.polling import PollScheduler
+from synthetic import Mailbox
+
+# Resource: (sample key, default growth threshold per cycle, unit)
+RESOURCES = (
+    ('rss', 256, 'bytes'),
+    ('traced', 1024, 'bytes'),
+    ('fds', 0.01, 'fds'),
+    ('sockets', 0.01, 'sockets'),
+    ('threads', 0.01, 'threads'),
+)
+TOP_GROWTH_SITES = 15
+
+
+class VirtualClock:
+    """Wall-clock time that moves on when the service sleeps.
+
+    Stands in for the `time` module (time and sleep; everything else is the
+    real module) and for `datetime` in the modules that stamp or rotate by
+    date. `speedup` > 0 also sleeps for real, that many times faster.
+    """
+
+    def __init__(self, speedup: float = 0, on_sleep=None):
+        self.offset = 0.0
+        self.speedup = speedup
+        self.on_sleep = on_sleep
+        clock = self
+
+        class VirtualDatetime(datetime):
+            @classmethod
+            def now(cls, tz=None):
+                return datetime.fromtimestamp(clock.time(), tz)
+
+            @classmethod
+            def utcnow(cls):
+                return datetime.fromtimestamp(clock.time(), timezone.utc).replace(tzinfo=None)
+
+            @classmethod
+            def utcfromtimestamp(cls, timestamp):
+                # File mtimes are real time; move them onto the virtual clock
+                return datetime.fromtimestamp(timestamp + clock.offset, timezone.utc).replace(tzinfo=None)
+
+        self.datetime = VirtualDatetime
+
+    def time(self) -> float:
+        return time.time() + self.offset
+
+    def sleep(self, seconds: float):
+        if self.speedup:
+            time.sleep(seconds / self.speedup)
+        self.offset += seconds - (seconds / self.speedup if self.speedup else 0)
+        if self.on_sleep is not None:
+            self.on_sleep(seconds)
+
+    def __getattr__(self, name):
+        return getattr(time, name)
+
+
+class Stop(KeyboardInterrupt):
+    """Ends main.main's loop the way Ctrl-C does."""
+
+
+def sample(cycle: int, clock: VirtualClock, tracing: bool) -> dict:
+    """Measure the process's resources after a full garbage collection."""
+    gc.collect()
+    try:
+        rss = int(Path('/proc/self/statm').read_text().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        import resource
+        # Peak rather than current RSS where /proc is missing (macOS reports bytes)
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * (1 if sys.platform == 'darwin' else 1024)
+    fds = sockets = None
+    if os.path.isdir('/proc/self/fd'):
+        links = []
+        for fd in os.listdir('/proc/self/fd'):
+            try:
+                links.append(os.readlink(f'/proc/self/fd/{fd}'))
+            except OSError:
+                pass
+        fds, sockets = len(links), sum(link.startswith('socket:') for link in links)
+    return {
+        'cycle': cycle,
+        'virtual_hours': round(clock.offset / 3600, 2),
+        'rss': rss,
+        'traced': tracemalloc.get_traced_memory()[0] if tracing else None,
+        'fds': fds,
+        'sockets': sockets,
+        'threads': threading.active_count(),
+    }
+
+
+def median(values) -> float:
+    ordered = sorted(values)
+    middle = len(ordered) // 2
+    return ordered[middle] if len(ordered) % 2 else (ordered[middle - 1] + ordered[middle]) / 2
+
+
+def half_growth(points) -> float:
+    """Growth per cycle from the first half of (cycle, value) points to the second.
+
+    Compares the halves' medians, so a one-off step (a new arena, a log
+    rotation) moves it far less than steady growth does.
+    """
+    middle = len(points) // 2
+    early, late = points[:middle], points[middle:]
+    span = median([x for x, _ in late]) - median([x for x, _ in early])
+    return (median([y for _, y in late]) - median([y for _, y in early])) / span if span else 0.0
+
+
+def check_growth(samples, thresholds, warmup: float):
+    """Return (resource, growth per cycle, threshold, unit, failed) per measured resource.
+
+    Growth compares the second half of the samples after the warmup with
+    the first half. Resources without a threshold (None) are reported but
+    never fail.
+    """
+    steady = samples[int(len(samples) * warmup):]
+    results = []
+    for key, _, unit in RESOURCES:
+        points = [(s['cycle'], s[key]) for s in steady if s[key] is not None]
+        if len(points) < 4:
+            continue
+        growth, limit = half_growth(points), thresholds[key]
+        results.append((key, growth, limit, unit, limit is not None and growth > limit))
+    return results
+
+
+def run(args) -> int:
+    mailbox = Mailbox(args.mailbox, seed=args.seed)
+    # Build the synthetic bodies up front so they don't count as growth
+    for index in range(mailbox.size):
+        mailbox.payload(index)
+    gmail = FakeGmail(mailbox, units_per_second=10**6, seed=args.seed, delivered=0)
+    claude = FakeAnthropic(mailbox=mailbox, error_rate=args.error_rate, seed=args.seed)
+    samples, snapshots = [], []
+    state = SimpleNamespace(cycle=0, due=0.0)
+
+    def progress() -> float:
+        if args.days is not None:
+            return clock.offset / (args.days * 86400)
+        return state.cycle / args.cycles
+
+    def between_cycles(seconds):
+        # Every sleep of main.main ends a cycle (a normal wait or an error backoff)
+        state.cycle += 1
+        done = progress() >= 1
+        if state.cycle % args.sample_every == 0 or done:
+            samples.append(sample(state.cycle, clock, args.tracemalloc))
+            if args.tracemalloc and progress() >= args.warmup and not snapshots:
+                snapshots.append(tracemalloc.take_snapshot())
+            if args.verbose:
+                print(format_sample(samples[-1]), flush=True)
+        if done:
+            raise Stop()
+        gmail.expunge_archived()
+        state.due += args.mail_per_hour * seconds / 3600
+        gmail.deliver(int(state.due))
+        state.due -= int(state.due)
+
+    clock = VirtualClock(args.speedup, on_sleep=between_cycles)
+    real_from_env = PollScheduler.from_env
+
+    def poller_from_env():
+        poller = real_from_env()
+        poller.clock, poller.now = clock.time, clock.datetime.now
+        return poller
+
+    with tempfile.TemporaryDirectory() as log_dir:
+        # The service logs to LOG_DIR/classifier.log as usual; warnings also go to stderr
+        root = logging.getLogger()
+        handlers = root.handlers[:]
+        console = logging.StreamHandler()
+        console.setLevel(logging.WARNING)
+        root.handlers = [logging.FileHandler(Path(log_dir) / 'classifier.log'), console]
+        for handler in root.handlers:
+            handler.setFormatter(handlers[0].formatter if handlers else None)
+
+        patches = [
+            mock.patch.object(service, 'LOG_DIR', Path(log_dir)),
+            mock.patch.object(service, 'time', clock),
+            mock.patch.object(service, 'get_gmail_service', lambda token_path=None: gmail.service(new=True)),
+            mock.patch.object(service.PollScheduler, 'from_env', poller_from_env),
+            mock.patch('inbox_classifier.ledger.time', clock),
+            mock.patch('inbox_classifier.logger.datetime', clock.datetime),
+            mock.patch('inbox_classifier.classification_store.datetime', clock.datetime),
+            # Only the raw transport is faked: gmail_client's per-thread cache runs as in production
+            mock.patch('inbox_classifier.gmail_client.build_http', FakeHttp),
+            mock.patch.object(ai_classifier, 'Anthropic', claude),
+            mock.patch.dict(os.environ, {
+                'ANTHROPIC_API_KEY': 'soak',
+                'GMAIL_QUOTA_UNITS_PER_SECOND': '1000000',
+                'ACCOUNTS': '',
+                'METRICS_PORT': '',
+            }),
+        ]
+        for patch in patches:
+            patch.start()
+        ai_classifier._clients.clear()
+        service._profiler = None
+        if args.tracemalloc:
+            tracemalloc.start(args.frames)
+        started = time.monotonic()
+        try:
+            gmail.deliver(args.backlog)
+            samples.append(sample(0, clock, args.tracemalloc))
+            service.main()
+        except Stop:
+            # Raised from an error backoff, outside main's KeyboardInterrupt handler
+            pass
+        finally:
+            for patch in reversed(patches):
+                patch.stop()
+            service._profiler = None
+            root.handlers[0].close()
+            root.handlers = handlers
+        elapsed = time.monotonic() - started
+        final = tracemalloc.take_snapshot() if args.tracemalloc else None
+        if args.tracemalloc:
+            tracemalloc.stop()
+
+    print(f"{state.cycle} cycles ({clock.offset / 86400:.1f} virtual days) in {elapsed:.0f}s; "
+          f"{gmail.delivered} emails delivered, {sum(claude.calls.values())} Claude calls")
+    if args.csv:
+        with open(args.csv, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=list(samples[0]))
+            writer.writeheader()
+            writer.writerows(samples)
+
+    thresholds = {key: getattr(args, f'max_{key}_growth') for key, _, _ in RESOURCES}
+    if args.tracemalloc:
+        # tracemalloc's own bookkeeping grows RSS with every traced block
+        thresholds['rss'] = None
+    results = check_growth(samples, thresholds, args.warmup)
+    print(f"\n{'resource':10} {'first':>14} {'last':>14} {'growth/cycle':>14} {'limit':>10}")
+    for key, growth, limit, unit, failed in results:
+        first = next(s[key] for s in samples if s[key] is not None)
+        print(f"{key:10} {first:>14,} {samples[-1][key]:>14,} {growth:>14.4f} "
+              f"{'-' if limit is None else format(limit, 'g'):>10} {unit}{'  FAIL' if failed else ''}")
+
+    if any(failed for *_, failed in results):
+        if final is not None and snapshots:
+            print("\nTop allocation growth since the end of warmup:")
+            for diff in final.compare_to(snapshots[0], 'traceback' if args.frames > 1 else 'lineno')[:TOP_GROWTH_SITES]:
+                if args.frames > 1:
+                    print(f"  {diff.size_diff / 1024:+.1f} KiB in {diff.count_diff:+} blocks, allocated at:")
+                    for line in diff.traceback.format(most_recent_first=True):
+                        print(f"    {line}")
+                else:
+                    print(f"  {diff}")
+        return 1
+    return 0
+
+
+def format_sample(s: dict) -> str:
+    return '  '.join(f'{key}={value}' for key, value in s.items())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    length = parser.add_mutually_exclusive_group()
+    length.add_argument('--cycles', type=int, default=10000, help='polling cycles to run')
+    length.add_argument('--days', type=float, help='run until this much (virtual) time has passed instead')
+    parser.add_argument('--speedup', type=float, default=0,
+                        help='real sleeps this many times shorter than the service asks (0: no real sleep)')
+    parser.add_argument('--mail-per-hour', type=float, default=30, help='new emails arriving per hour')
+    parser.add_argument('--backlog', type=int, default=50, help='unread emails waiting at the start')
+    parser.add_argument('--mailbox', type=int, default=2000, help='distinct synthetic messages to cycle through')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='share of Claude calls that fail')
+    parser.add_argument('--sample-every', type=int, default=100, help='cycles between resource samples')
+    parser.add_argument('--warmup', type=float, default=0.5, help='share of samples ignored when measuring growth')
+    parser.add_argument('--tracemalloc', action='store_true',
+                        help='trace Python allocations: gate on traced memory and list growth sites '
+                             '(RSS is then reported but not gated)')
+    parser.add_argument('--frames', type=int, default=1, help='tracemalloc frames per allocation')
+    for key, default, unit in RESOURCES:
+        parser.add_argument(f'--max-{key}-growth', type=float, default=default,
+                            help=f'fail above this many {unit} per cycle (default {default})')
+    parser.add_argument('--csv', help='write the samples to this CSV file')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('-v', '--verbose', action='store_true', help='print each sample as it is taken')
+    args = parser.parse_args()
+
+    sys.exit(run(args))
+
+
+if __name__ == '__main__':
+    main()
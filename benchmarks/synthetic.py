@@ -0,0 +1,180 @@
+import base64
+import itertools
+import random
+from typing import Dict, List, Tuple
+
+# Sender kinds: the category a classifier should give them, their share of
+# senders, MIME shapes (with weights), median body size in bytes, and the
+# chance that a message continues an existing thread
+KINDS: Dict[str, Dict] = {
+    'person': {'category': 'Important', 'weight': 0.15, 'median': 1200, 'reply': 0.5,
+               'shapes': {'plain': 0.6, 'alternative': 0.3, 'mixed': 0.1}},
+    'colleague': {'category': 'Important', 'weight': 0.1, 'median': 2500, 'reply': 0.6,
+                  'shapes': {'alternative': 0.6, 'mixed': 0.3, 'plain': 0.1}},
+    'receipt': {'category': 'Important', 'weight': 0.1, 'median': 8000, 'reply': 0.0,
+                'shapes': {'alternative': 0.5, 'html': 0.4, 'mixed': 0.1}},
+    'bank': {'category': 'Routine', 'weight': 0.1, 'median': 6000, 'reply': 0.0,
+             'shapes': {'alternative': 0.7, 'html': 0.3}},
+    'service': {'category': 'Routine', 'weight': 0.1, 'median': 4000, 'reply': 0.0,
+                'shapes': {'alternative': 0.5, 'plain': 0.5}},
+    'newsletter': {'category': 'Optional', 'weight': 0.25, 'median': 40000, 'reply': 0.0,
+                   'shapes': {'html': 0.5, 'alternative': 0.4, 'related': 0.1}},
+    'promo': {'category': 'Optional', 'weight': 0.2, 'median': 60000, 'reply': 0.0,
+              'shapes': {'html': 0.6, 'related': 0.3, 'alternative': 0.1}},
+}
+
+SUBJECTS = {
+    'person': ['Dinner on {n}?', 'Photos from the weekend', 'Quick question', 'Can you call me back'],
+    'colleague': ['Draft for review #{n}', 'Meeting notes {n}', 'Q{q} planning', 'Can you review this by Friday'],
+    'receipt': ['Your order #{n} has shipped', 'Receipt for your payment', 'Booking confirmation {n}'],
+    'bank': ['Your statement is ready', 'Balance update', 'Account notification {n}'],
+    'service': ['Your weekly activity summary', 'Password changed', 'New sign-in to your account'],
+    'newsletter': ['The Weekly Digest #{n}', 'This week in tech', 'Issue {n}: what we are reading'],
+    'promo': ['48 hours only: {q}0% off', 'New arrivals just for you', 'Last chance: free shipping'],
+}
+
+WORDS = ('the of and to in is you that it for on with as your this are at be from we have '
+         'order account update team week report meeting please review attached thanks '
+         'offer price free new today time project deadline schedule statement').split()
+
+# Bodies are drawn from a small pool per kind and shape, so a 100k-message
+# mailbox costs neither the memory nor the CPU of 100k distinct bodies
+POOL_SIZE = 16
+MAX_BODY = 4 * 1024 * 1024
+ZIPF_EXPONENT = 1.1
+
+
+def _b64(text: str) -> str:
+    return base64.urlsafe_b64encode(text.encode('utf-8')).decode('ascii')
+
+
+def _prose(rng: random.Random, size: int) -> str:
+    lines, length = [], 0
+    while length < size:
+        line = ' '.join(rng.choice(WORDS) for _ in range(rng.randint(6, 14))).capitalize() + '.'
+        lines.append(line)
+        length += len(line) + 1
+    return '\n'.join(lines)[:size]
+
+
+def _html(rng: random.Random, size: int) -> str:
+    head = ('<html><head><style>.btn{background:#f60}</style></head><body>'
+            '<div style="display:none">Preview text</div><table width="100%">')
+    rows, length = [], len(head)
+    while length < size:
+        row = (f'<tr><td><img src="https://cdn.example.com/{rng.randrange(10**6)}.jpg">'
+               f'<p>{_prose(rng, 200)}</p><a href="https://click.example.com/?u={rng.randrange(10**6)}">'
+               'Read more</a></td></tr>')
+        rows.append(row)
+        length += len(row)
+    return head + ''.join(rows) + '</table><p>Unsubscribe</p></body></html>'
+
+
+class Mailbox:
+    """A synthetic Gmail mailbox: a backlog of unread inbox messages.
+
+    Senders follow a Zipf distribution (a few senders send most mail), each
+    of a kind (KINDS) that fixes its expected category, typical MIME shape
+    and body size (log-normal around the kind's median). People and
+    colleagues continue existing threads. Generation is deterministic for a
+    given size and seed; payloads are assembled on demand.
+    """
+
+    def __init__(self, size: int, seed: int = 0, senders: int = None):
+        self.size = size
+        rng = random.Random(seed)
+        self._rng_seed = seed
+
+        kinds = list(KINDS)
+        sender_count = senders or max(20, size // 25)
+        self.senders: List[Tuple[str, str]] = []
+        for index in range(sender_count):
+            kind = rng.choices(kinds, weights=[KINDS[k]['weight'] for k in kinds])[0]
+            self.senders.append((kind, f'{kind.title()} {index} <{kind}{index}@{kind}.example.com>'))
+        self._category = {header: KINDS[kind]['category'] for kind, header in self.senders}
+
+        cum_weights = list(itertools.accumulate(1 / (rank + 1) ** ZIPF_EXPONENT for rank in range(sender_count)))
+        self._pools: Dict[Tuple[str, str, bool], List[Dict]] = {}
+        self.messages: List[Tuple] = []
+        threads: Dict[int, Tuple[str, str]] = {}
+        for index in range(size):
+            sender = rng.choices(range(sender_count), cum_weights=cum_weights)[0]
+            kind, header = self.senders[sender]
+            spec = KINDS[kind]
+            shape = rng.choices(list(spec['shapes']), weights=list(spec['shapes'].values()))[0]
+            reply = sender in threads and rng.random() < spec['reply']
+            if reply:
+                thread_id, subject = threads[sender]
+                subject = subject if subject.startswith('Re: ') else f'Re: {subject}'
+            else:
+                thread_id = f'{index:016x}'
+                subject = rng.choice(SUBJECTS[kind]).format(n=rng.randrange(1000), q=rng.randint(1, 4))
+            threads[sender] = (thread_id, subject)
+            self.messages.append((f'{index + 1:016x}', thread_id, header, subject, kind, shape, reply,
+                                  rng.randrange(POOL_SIZE)))
+
+    def category_of(self, sender: str) -> str | None:
+        """Return the expected category for a From header, or None if unknown."""
+        return self._category.get(sender)
+
+    def payload(self, index: int) -> Dict:
+        """Return the Gmail API message resource (format='full') for a message."""
+        message_id, thread_id, sender, subject, kind, shape, reply, variant = self.messages[index]
+        body = self._pool(kind, shape, reply)[variant]
+        headers = [
+            {'name': 'From', 'value': sender},
+            {'name': 'To', 'value': 'me@example.com'},
+            {'name': 'Subject', 'value': subject},
+            {'name': 'Date', 'value': 'Mon, 5 Jan 2026 10:00:00 +0000'},
+            {'name': 'Message-ID', 'value': f'<{message_id}@mail.example.com>'},
+        ]
+        payload = dict(self._shape(shape, body), headers=headers)
+        return {
+            'id': message_id,
+            'threadId': thread_id,
+            'labelIds': ['INBOX', 'UNREAD'],
+            'snippet': subject,
+            'sizeEstimate': body['size'],
+            'internalDate': str(1767607200000 + index),
+            'payload': payload,
+        }
+
+    @staticmethod
+    def _shape(shape: str, body: Dict) -> Dict:
+        plain = {'mimeType': 'text/plain', 'headers': [], 'body': {'size': len(body['plain']), 'data': body['plain']}}
+        html = {'mimeType': 'text/html', 'headers': [], 'body': {'size': len(body['html']), 'data': body['html']}}
+        attachment = {'mimeType': 'application/pdf', 'filename': 'document.pdf', 'headers': [],
+                      'body': {'size': body['attachment'], 'attachmentId': 'ANGjdJ_att'}}
+        if shape == 'plain':
+            return {'mimeType': 'text/plain', 'body': plain['body']}
+        if shape == 'html':
+            return {'mimeType': 'text/html', 'body': html['body']}
+        alternative = {'mimeType': 'multipart/alternative', 'headers': [], 'body': {'size': 0},
+                       'parts': [plain, html]}
+        if shape == 'alternative':
+            return alternative
+        if shape == 'related':
+            image = dict(attachment, mimeType='image/png', filename='banner.png')
+            return {'mimeType': 'multipart/related', 'body': {'size': 0}, 'parts': [html, image]}
+        return {'mimeType': 'multipart/mixed', 'body': {'size': 0}, 'parts': [alternative, attachment]}
+
+    def _pool(self, kind: str, shape: str, reply: bool) -> List[Dict]:
+        key = (kind, shape, reply)
+        pool = self._pools.get(key)
+        if pool is None:
+            rng = random.Random(f'{self._rng_seed}-{kind}-{shape}-{reply}')
+            pool = []
+            for _ in range(POOL_SIZE):
+                size = min(MAX_BODY, int(rng.lognormvariate(0, 0.8) * KINDS[kind]['median']))
+                text = _prose(rng, max(size // 4, 80))
+                if reply:
+                    quoted = '\n'.join(f'> {line}' for line in _prose(rng, size).splitlines())
+                    text += f'\n\nOn Mon, 5 Jan 2026 at 09:12, someone <a@example.com> wrote:\n{quoted}'
+                pool.append({
+                    'plain': _b64(text),
+                    'html': _b64(_html(rng, size)),
+                    'attachment': int(rng.lognormvariate(0, 1) * 200_000),
+                    'size': size,
+                })
+            self._pools[key] = pool
+        return pool
@@ -0,0 +1,57 @@
+import os
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+
+class Account:
+    """A Gmail account served by this process, and where its state lives.
+
+    Each account has its own token, rules, ledger and classification log in
+    its config directory, plus a label ID cache kept across cycles.
+    """
+
+    def __init__(self, name: str, config_dir: Path):
+        self.name = name
+        self.config_dir = Path(config_dir)
+        self.token_path = self.config_dir / 'token.json'
+        self.rules_path = self.config_dir / 'rules.md'
+        self.ledger_path = self.config_dir / 'ledger.db'
+        self.log_path = self.config_dir / 'classifications.jsonl'
+        self.db_path = self.config_dir / 'classifications.db'
+
+        self._label_cache: Tuple[Tuple[str, ...], Dict[str, str]] | None = None
+
+    def cached_label_ids(self, categories: List[str]) -> Dict[str, str] | None:
+        """Return label IDs cached for exactly these categories, if any."""
+        if self._label_cache and self._label_cache[0] == tuple(categories):
+            return self._label_cache[1]
+        return None
+
+    def cache_label_ids(self, categories: List[str], label_ids: Dict[str, str]):
+        self._label_cache = (tuple(categories), label_ids)
+
+    def clear_label_cache(self):
+        """Forget cached label IDs (e.g. after a label was deleted in Gmail)."""
+        self._label_cache = None
+
+    def __repr__(self):
+        return f'Account({self.name!r})'
+
+
+def load_accounts(base_dir: Path) -> List[Account]:
+    """Return the accounts to serve.
+
+    ACCOUNTS is a comma-separated list of names; each account keeps its state
+    in base_dir/accounts/<name>/. Without ACCOUNTS there is a single 'default'
+    account using base_dir itself (the original single-account layout).
+    """
+    names = [n.strip() for n in os.environ.get('ACCOUNTS', '').split(',') if n.strip()]
+    if not names:
+        return [Account('default', base_dir)]
+
+    accounts = []
+    for name in names:
+        account = Account(name, Path(base_dir) / 'accounts' / name)
+        account.config_dir.mkdir(parents=True, exist_ok=True)
+        accounts.append(account)
+    return accounts
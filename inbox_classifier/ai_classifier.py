@@ -1,9 +1,17 @@
+import os
 import re
+import threading
 from anthropic import Anthropic
-from typing import Dict, List
+from concurrent.futures import Future
+from functools import lru_cache
+from typing import Dict, Iterable, Iterator, List, Tuple
 import time
 
 from .rules_loader import load_rules
+from .budget import BudgetExceeded, BudgetGovernor
+from .costs import TOKEN_FIELDS, call_usage
+from .metrics import API_CALLS
+from .retry import call_with_retry
 
 
 def parse_categories(rules: str) -> List[str]:
@@ -11,19 +19,91 @@ def parse_categories(rules: str) -> List[str]:
     return re.findall(r'^(\w+) emails include:', rules, re.MULTILINE)
 
 
-def classify_email(email: Dict[str, str], api_key: str) -> Dict[str, str]:
-    """Classify email using Claude API.
+_clients: Dict[str, Anthropic] = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(api_key: str) -> Anthropic:
+    """Return the shared Anthropic client for an API key.
 
-    Categories are parsed dynamically from rules.md.
+    One client (and connection pool) serves every worker and account,
+    instead of a new one per email. The SDK's own retries are disabled;
+    call_with_retry handles them with a deadline, and each attempt gets
+    the time left until it as its timeout.
     """
-    client = Anthropic(api_key=api_key)
-    rules = load_rules()
-    categories = parse_categories(rules)
+    with _clients_lock:
+        client = _clients.get(api_key)
+        if client is None:
+            client = _clients[api_key] = Anthropic(api_key=api_key, max_retries=0)
+        return client
+
+
+MODEL = "claude-sonnet-4-5-20250929"
+
+# Compact protocol: the reply is one line, "<code> <confidence>[ <reason>]",
+# so a few output tokens suffice; the newline stop sequence ends it early
+MAX_TOKENS = 40
+MAX_TOKENS_NO_REASON = 10
+STOP_SEQUENCES = ['\n']
+
+# Cheapest first; each later tier is only asked when the one before is unsure
+DEFAULT_MODELS = "claude-haiku-4-5," + MODEL
+DEFAULT_MIN_CONFIDENCE = 80
+
+# "<code or name> [confidence | (NN%)][:] [reason]"; names keep replies in
+# the older "Category (NN%): reason" form (e.g. from in-flight batches) valid
+REPLY_PATTERN = re.compile(r'\s*(\w+)[ \t]*(?:\(?(\d{1,3})[ \t]*%?\)?)?[ \t]*[:|-]?\s*(.*)', re.DOTALL)
+
+# A streamed reply's verdict is settled once code and confidence are both
+# followed by whitespace: "1" could still become "10", "9" could become "95"
+VERDICT_PATTERN = re.compile(r'\s*(\w+)\b[ \t]*\(?(\d{1,3})[ \t]*%?\)?[ \t]*[:|-]?\s')
+
+# Seconds the log stage waits for a streamed reason to finish
+REASON_TIMEOUT = 30
+
+
+def cascade_models() -> List[str]:
+    """Return the model tiers from CLASSIFIER_MODELS (comma-separated, cheapest first)."""
+    models = os.environ.get('CLASSIFIER_MODELS', DEFAULT_MODELS)
+    return [m.strip() for m in models.split(',') if m.strip()]
+
+
+def streaming_mode() -> str:
+    """Return CLASSIFIER_STREAMING: 'off' (default), 'on' or 'cancel'."""
+    mode = os.environ.get('CLASSIFIER_STREAMING', 'off').lower()
+    return mode if mode in ('on', 'cancel') else 'off'
+
+
+def reasons_enabled() -> bool:
+    """Return False when CLASSIFIER_REASONS=off: replies are just code and confidence."""
+    return os.environ.get('CLASSIFIER_REASONS', 'on').lower() not in ('off', '0', 'false', 'no')
 
-    category_list = ', '.join(categories)
-    response_format = '\nor\n'.join(f'{c}: [brief reason]' for c in categories)
 
-    prompt = f"""Analyze this email and classify it as {category_list}.
+@lru_cache(maxsize=32)
+def _reply_lookup(categories: Tuple[str, ...]) -> Dict[str, str]:
+    """Map category codes ('1', '2', ...) and lowercase names to category."""
+    lookup = {c.lower(): c for c in categories}
+    lookup.update({str(code): c for code, c in enumerate(categories, 1)})
+    return lookup
+
+
+def build_request(email: Dict[str, str], rules: str, model: str = MODEL) -> Dict:
+    """Return the Messages API parameters for classifying one email.
+
+    Shared by real-time calls and Message Batches submissions.
+    """
+    categories = parse_categories(rules)
+    codes = '\n'.join(f'{code} = {c}' for code, c in enumerate(categories, 1))
+    if reasons_enabled():
+        reply_format = ('the category number, your confidence (0-100) that it is right, '
+                        'then a reason of at most 8 words. Example: 2 90 monthly bank statement')
+        max_tokens = MAX_TOKENS
+    else:
+        reply_format = 'the category number and your confidence (0-100) that it is right. Example: 2 90'
+        max_tokens = MAX_TOKENS_NO_REASON
+
+    prompt = f"""Analyze this email and classify it into one of these categories:
+{codes}
 
 {rules}
 
@@ -33,30 +113,228 @@ From: {email['sender']}
 To: {email['to']}
 Body: {email['body']}
 
-Respond with EXACTLY this format:
-{response_format}
+Reply with one line only: {reply_format}
 """
 
-    # Rate limiting: max 1 request per second
-    time.sleep(1)
-
-    message = client.messages.create(
-        model="claude-sonnet-4-5-20250929",
-        max_tokens=150,
-        messages=[
+    return {
+        'model': model,
+        'max_tokens': max_tokens,
+        'stop_sequences': STOP_SEQUENCES,
+        'messages': [
             {"role": "user", "content": prompt}
-        ]
-    )
+        ],
+    }
+
+
+def parse_response(response_text: str, categories: List[str]) -> Dict | None:
+    """Resolve a reply's category code (or name) with one dict lookup.
+
+    Returns:
+        Dict with keys: classification, reasoning, confidence (None if the
+        reply gave none), or None when the reply names no category
+    """
+    match = REPLY_PATTERN.match(response_text)
+    category = match and _reply_lookup(tuple(categories)).get(match.group(1).lower())
+    if not category:
+        return None
+
+    code, confidence, reasoning = match.groups()
+    return {
+        'classification': category,
+        'reasoning': reasoning.strip(),
+        'confidence': min(int(confidence), 100) if confidence else None,
+    }
+
+
+def _create(client: Anthropic, **params):
+    """Call messages.create, counting every attempt."""
+    API_CALLS.inc(api='anthropic', method='messages.create')
+    return client.messages.create(**params)
+
+
+def _text_deltas(stream: Iterable, usage: Dict = None) -> Iterator[str]:
+    """Yield the text pieces of a raw Messages API event stream.
+
+    If given, `usage` (a call_usage record) is updated as token counts
+    arrive: input and cache counts at the start, output counts as the
+    reply grows.
+    """
+    for event in stream:
+        if event.type == 'content_block_delta' and event.delta.type == 'text_delta':
+            yield event.delta.text
+        elif usage is not None and event.type == 'message_start':
+            usage.update(call_usage(usage['model'], event.message.usage, usage['batch']))
+        elif usage is not None and event.type == 'message_delta':
+            output_tokens = getattr(event.usage, 'output_tokens', None)
+            if isinstance(output_tokens, int):
+                usage['output_tokens'] = output_tokens
+
+
+def _finish_in_background(stream, deltas: Iterator[str], text: str, categories: List[str]) -> Future:
+    """Read the rest of a streamed reply on a daemon thread; resolves to its reason."""
+    future = Future()
+
+    def finish():
+        try:
+            full = text + ''.join(deltas)
+            result = parse_response(full, categories)
+            future.set_result(result['reasoning'] if result else '')
+        except Exception as e:
+            future.set_exception(e)
+        finally:
+            stream.close()
+
+    # discard_reasoning closes the stream to stop it early
+    future.stream = stream
+    threading.Thread(target=finish, name='reason-reader', daemon=True).start()
+    return future
+
+
+def stream_verdict(client: Anthropic, params: Dict, categories: List[str], mode: str = 'on',
+                   usage: Dict = None) -> Dict | None:
+    """Stream a reply and return as soon as its category and confidence are settled.
+
+    With mode 'on' the reason keeps streaming on a background thread and
+    the result carries it as a Future under 'pending_reasoning' (see
+    resolve_reasoning); with 'cancel' the stream is closed and the reason
+    left empty. A reply that ends before the verdict settles (e.g. "2 90"
+    with reasons off) is parsed whole. Token counts go into `usage` (see
+    _text_deltas), including those of a reason still streaming.
+
+    Returns:
+        Same as parse_response
+    """
+    stream = call_with_retry(_create, client, stream=True, pass_timeout=True, **params)
+    deltas = _text_deltas(stream, usage)
+    lookup = _reply_lookup(tuple(categories))
+
+    text = ''
+    for delta in deltas:
+        text += delta
+        match = VERDICT_PATTERN.match(text)
+        if match and match.group(1).lower() in lookup:
+            break
+    else:
+        stream.close()
+        return parse_response(text, categories)
+
+    result = parse_response(text, categories)
+    result['reasoning'] = ''
+    if mode == 'cancel':
+        stream.close()
+    else:
+        result['pending_reasoning'] = _finish_in_background(stream, deltas, text, categories)
+    return result
+
+
+def resolve_reasoning(result: Dict, timeout: float = REASON_TIMEOUT) -> Dict:
+    """Fill in a streamed result's reason, waiting up to timeout for it.
+
+    Results without a pending reason are returned unchanged; a reason that
+    fails or doesn't arrive in time is left empty.
+    """
+    pending = result.pop('pending_reasoning', None)
+    if pending is not None:
+        try:
+            result['reasoning'] = pending.result(timeout=timeout)
+        except Exception:
+            result['reasoning'] = ''
+    return result
+
 
-    response_text = message.content[0].text
+def discard_reasoning(result: Dict) -> Dict:
+    """Stop a streamed result's pending reason, leaving it empty.
+
+    Closing the stream ends generation, so the tokens of a reason nobody
+    will read are neither billed nor left holding a connection open.
+    """
+    pending = result.pop('pending_reasoning', None)
+    if pending is not None:
+        pending.stream.close()
+    return result
+
+
+def _settle_when_done(governor: BudgetGovernor, estimate: int, call: Dict, result: Dict | None):
+    """Correct a call's reservation once its usage is final.
+
+    A streamed reason still being read adds output tokens to `call`, so
+    its call is settled when the reason's stream has been consumed.
+    """
+    def settle(*_):
+        governor.settle(estimate, sum(call[field] for field in TOKEN_FIELDS))
+
+    pending = (result or {}).get('pending_reasoning')
+    if pending is None:
+        settle()
+    else:
+        pending.add_done_callback(settle)
+
+
+def classify_email(email: Dict[str, str], api_key: str, rules: str = None,
+                   governor: BudgetGovernor = None) -> Dict[str, str]:
+    """Classify email using Claude API.
+
+    Categories are parsed dynamically from rules.md. Pass `rules` to reuse
+    rules already loaded for this cycle instead of reloading them per email.
+
+    Models are tried as a cascade (CLASSIFIER_MODELS, cheapest first): a
+    verdict is accepted once its confidence reaches CASCADE_MIN_CONFIDENCE
+    (default 80); otherwise, or when the reply doesn't parse, the next
+    model is asked. The last model's verdict is final.
+
+    With CLASSIFIER_STREAMING on, each reply is streamed and the verdict
+    returned as soon as it is settled (see stream_verdict); call
+    resolve_reasoning on the result before logging it.
+
+    With a governor, every call first reserves its pre-flight token
+    estimate. If the budget runs out after a tier was unsure, that tier's
+    verdict is returned; otherwise BudgetExceeded is raised.
+
+    Returns:
+        Dict with keys: classification, reasoning, confidence, model (the
+        tier that decided), api_calls (call_usage of every tier asked),
+        latency (seconds spent waiting on the API), or None when no reply
+        named a category
+    """
+    client = get_client(api_key)
+    if rules is None:
+        rules = load_rules()
+    categories = parse_categories(rules)
+    models = cascade_models()
+    min_confidence = int(os.environ.get('CASCADE_MIN_CONFIDENCE', DEFAULT_MIN_CONFIDENCE))
+    streaming = streaming_mode()
 
-    # Parse response against dynamic categories
-    for category in categories:
-        if response_text.startswith(f'{category}:'):
-            return {
-                'classification': category,
-                'reasoning': response_text.replace(f'{category}:', '').strip()
-            }
+    unsure = None
+    api_calls, latency = [], 0.0
+    for tier, model in enumerate(models):
+        params = build_request(email, rules, model)
+        if governor is not None:
+            estimate = governor.estimate(params)
+            try:
+                governor.acquire(estimate)
+            except BudgetExceeded:
+                if unsure is None:
+                    raise
+                return unsure
+        started = time.monotonic()
+        if streaming == 'off':
+            message = call_with_retry(_create, client, pass_timeout=True, **params)
+            api_calls.append(call_usage(model, message.usage))
+            result = parse_response(message.content[0].text, categories)
+        else:
+            api_calls.append(call_usage(model))
+            result = stream_verdict(client, params, categories, streaming, api_calls[-1])
+        latency += time.monotonic() - started
+        if governor is not None:
+            _settle_when_done(governor, estimate, api_calls[-1], result)
+        if result is None:
+            continue
+        result.update(model=model, api_calls=api_calls, latency=round(latency, 3))
+        if tier == len(models) - 1 or (result['confidence'] or 0) >= min_confidence:
+            return result
+        # Escalating: nobody will read this tier's reason
+        unsure = discard_reasoning(result)
 
-    # No match — return None so caller can skip this email
-    return None
+    # A low-confidence verdict beats none; None means no match, so the
+    # caller can skip this email
+    return unsure
@@ -0,0 +1,48 @@
+from typing import Any, Callable, Dict, Iterator, List, Tuple
+
+from .ai_classifier import get_client
+from .metrics import API_CALLS
+from .retry import call_with_retry
+
+# Result entries: (custom_id, reply text or None, error or None, message usage or None)
+BatchResult = Tuple[str, str | None, str | None, Any]
+
+
+def _counted(method: str, func: Callable, *args, **kwargs):
+    """Call a Message Batches API method, counting every attempt."""
+    API_CALLS.inc(api='anthropic', method=method)
+    return func(*args, **kwargs)
+
+
+class AnthropicBatchClient:
+    """Submits classification requests through the Message Batches API.
+
+    Batches cost half as much as real-time calls and run outside the
+    real-time rate limits; results arrive within 24 hours (usually minutes).
+    """
+
+    def __init__(self, api_key: str):
+        self.batches = get_client(api_key).messages.batches
+
+    def create(self, requests: List[Dict]) -> str:
+        """Submit requests ({'custom_id', 'params'}) and return the batch ID."""
+        return call_with_retry(_counted, 'batches.create', self.batches.create, requests=requests,
+                               pass_timeout=True).id
+
+    def is_done(self, batch_id: str) -> bool:
+        return call_with_retry(_counted, 'batches.retrieve', self.batches.retrieve, batch_id,
+                               pass_timeout=True).processing_status == 'ended'
+
+    def results(self, batch_id: str) -> Iterator[BatchResult]:
+        for entry in call_with_retry(_counted, 'batches.results', self.batches.results, batch_id,
+                                     pass_timeout=True):
+            if entry.result.type == 'succeeded':
+                message = entry.result.message
+                yield entry.custom_id, message.content[0].text, None, message.usage
+            else:
+                yield entry.custom_id, None, entry.result.type, None
+
+
+def get_batch_client(api_key: str) -> AnthropicBatchClient:
+    """Return the batch client used for backlog mode."""
+    return AnthropicBatchClient(api_key)
@@ -0,0 +1,197 @@
+import os
+import threading
+import time
+from typing import Dict, List
+
+from .condense import estimate_tokens
+
+# What to do with an email when the budget can't cover its classification:
+# 'defer' leaves it unread for a later cycle, 'rules' labels it with the
+# sender's usual category (see ProcessedLedger.sender_history) or defers,
+# 'inbox' leaves it in the inbox marked read, like a skip rule
+POLICIES = ('defer', 'rules', 'inbox')
+
+# Budgets from the environment: (variable, window name, seconds, what is counted)
+BUDGET_VARIABLES = (
+    ('CLAUDE_BUDGET_TOKENS_PER_HOUR', 'hour', 3600, 'tokens'),
+    ('CLAUDE_BUDGET_TOKENS_PER_DAY', 'day', 86400, 'tokens'),
+    ('CLAUDE_BUDGET_REQUESTS_PER_HOUR', 'hour', 3600, 'requests'),
+    ('CLAUDE_BUDGET_REQUESTS_PER_DAY', 'day', 86400, 'requests'),
+)
+
+
+class BudgetExceeded(Exception):
+    """The budget can't cover a call before `retry_at` (epoch seconds)."""
+
+    def __init__(self, message: str, retry_at: float):
+        super().__init__(message)
+        self.retry_at = retry_at
+
+
+class Budget:
+    """A token or request limit per clock-aligned window (UTC hour or day).
+
+    Besides the hard limit per window, spending is paced by a token bucket
+    refilling at limit/window per second and holding `burst` of the
+    window's budget, so the budget is spread across the window instead of
+    spent in its first minutes.
+    """
+
+    def __init__(self, limit: float, window: float, kind: str = 'tokens', name: str = '', burst: float = 0.05):
+        self.limit = limit
+        self.window = window
+        self.kind = kind
+        self.name = name or f'{kind} per {window:g}s'
+        self.rate = limit / window
+        self.capacity = max(limit * burst, 1)
+
+        self.spent = 0.0
+        self.window_start = 0.0
+        self._level = self.capacity
+        self._updated = None
+
+    def amount(self, tokens: int) -> int:
+        return tokens if self.kind == 'tokens' else 1
+
+    def refill(self, now: float):
+        start = now - now % self.window
+        if start != self.window_start:
+            self.window_start, self.spent = start, 0.0
+        if self._updated is not None:
+            self._level = min(self.capacity, self._level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_for(self, amount: float) -> float:
+        """Seconds until the bucket holds `amount` (a bigger call waits for a full bucket)."""
+        return max(0.0, (min(amount, self.capacity) - self._level) / self.rate)
+
+    def charge(self, amount: float):
+        self.spent += amount
+        self._level -= amount
+
+
+class BudgetGovernor:
+    """Spend governor in front of the classifier: hourly and daily token and request budgets.
+
+    Each call is charged its pre-flight estimate (prompt tokens plus
+    max_tokens) before it is made and corrected to the actual usage after.
+    Calls wait up to `max_wait` seconds for pacing; calls that would have
+    to wait longer, or that don't fit what is left of a window, raise
+    BudgetExceeded.
+    """
+
+    def __init__(self, budgets: List[Budget], max_wait: float = 30, clock=time.time, sleep=time.sleep):
+        self.budgets = budgets
+        self.max_wait = max_wait
+        self.clock = clock
+        self.sleep = sleep
+        self.blocked_until = 0.0
+        self.requests = 0
+        self.tokens = 0
+        self.waited_seconds = 0.0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def estimate(params: Dict) -> int:
+        """Return the most tokens a Messages API request can use: its prompt plus max_tokens."""
+        prompt = ''.join(m['content'] for m in params['messages'] if isinstance(m['content'], str))
+        return estimate_tokens(prompt) + params['max_tokens']
+
+    def acquire(self, tokens: int, pace: bool = True) -> float:
+        """Reserve budget for a call, waiting for pacing if needed.
+
+        Args:
+            tokens: Pre-flight estimate of the call's tokens
+            pace: False to check only the window limits (e.g. for batch submissions)
+
+        Returns:
+            Seconds spent waiting
+
+        Raises:
+            BudgetExceeded: The call doesn't fit before the window ends or within max_wait
+        """
+        with self._lock:
+            now = self.clock()
+            wait = 0.0
+            for budget in self.budgets:
+                budget.refill(now)
+                amount = budget.amount(tokens)
+                if budget.spent + amount > budget.limit:
+                    retry_at = budget.window_start + budget.window
+                    self.blocked_until = max(self.blocked_until, retry_at)
+                    raise BudgetExceeded(f"{budget.name} budget of {budget.limit:g} spent", retry_at)
+                if pace:
+                    wait = max(wait, budget.wait_for(amount))
+            if wait > self.max_wait:
+                self.blocked_until = max(self.blocked_until, now + wait)
+                raise BudgetExceeded(f"pacing: next call fits in {wait:.0f}s", now + wait)
+
+            # Reserve now and wait outside the lock; later callers queue behind the reservation
+            for budget in self.budgets:
+                budget.charge(budget.amount(tokens))
+            self.requests += 1
+            self.tokens += tokens
+            self.waited_seconds += wait
+
+        if wait:
+            self.sleep(wait)
+        return wait
+
+    def settle(self, estimated: int, actual: int):
+        """Correct a call's reservation to the tokens it actually used."""
+        with self._lock:
+            for budget in self.budgets:
+                if budget.kind == 'tokens':
+                    budget.charge(actual - estimated)
+            self.tokens += actual - estimated
+
+    def blocked(self) -> bool:
+        """Return True while the last refusal's retry time hasn't come."""
+        return self.clock() < self.blocked_until
+
+    def usage(self) -> Dict:
+        """Return live figures per budget (spent in the current window and limit)."""
+        with self._lock:
+            now = self.clock()
+            for budget in self.budgets:
+                budget.refill(now)
+            return {
+                'requests': self.requests,
+                'tokens': self.tokens,
+                'waited_seconds': self.waited_seconds,
+                'budgets': {budget.name: (budget.spent, budget.limit) for budget in self.budgets},
+            }
+
+
+def budget_policy() -> str:
+    """Return BUDGET_POLICY: 'defer' (default), 'rules' or 'inbox'."""
+    policy = os.environ.get('BUDGET_POLICY', 'defer').lower()
+    return policy if policy in POLICIES else 'defer'
+
+
+_governor: BudgetGovernor | None = None
+_governor_loaded = False
+_governor_lock = threading.Lock()
+
+
+def get_governor() -> BudgetGovernor | None:
+    """Return the process-wide governor, or None when no budget is configured.
+
+    Budgets come from CLAUDE_BUDGET_{TOKENS,REQUESTS}_PER_{HOUR,DAY} (unset
+    or 0 for no limit); BUDGET_BURST (default 0.05) is the share of a
+    window's budget that may be spent at once and BUDGET_MAX_WAIT (default
+    30) the longest a call waits for pacing. Shared by every account.
+    """
+    global _governor, _governor_loaded
+    with _governor_lock:
+        if not _governor_loaded:
+            burst = float(os.environ.get('BUDGET_BURST', 0.05))
+            budgets = [
+                Budget(float(os.environ[variable]), seconds, kind, f'{kind} per {window}', burst)
+                for variable, window, seconds, kind in BUDGET_VARIABLES
+                if float(os.environ.get(variable) or 0) > 0
+            ]
+            if budgets:
+                _governor = BudgetGovernor(budgets, max_wait=float(os.environ.get('BUDGET_MAX_WAIT', 30)))
+            _governor_loaded = True
+        return _governor
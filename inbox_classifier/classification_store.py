@@ -0,0 +1,206 @@
+import sqlite3
+import threading
+from pathlib import Path
+from datetime import datetime
+from email.utils import parseaddr
+from typing import Dict, List, Tuple, Union
+
+from .costs import TOKEN_FIELDS
+from .logger import iter_log_entries
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS classifications (
+    id INTEGER PRIMARY KEY,
+    timestamp TEXT NOT NULL,
+    email_id TEXT NOT NULL,
+    subject TEXT,
+    sender TEXT,
+    sender_domain TEXT,
+    to_addr TEXT,
+    classification TEXT,
+    reasoning TEXT,
+    model TEXT,
+    input_tokens INTEGER,
+    output_tokens INTEGER,
+    cache_read_tokens INTEGER,
+    cache_write_tokens INTEGER,
+    cost REAL,
+    latency REAL
+);
+CREATE INDEX IF NOT EXISTS idx_classifications_email_id ON classifications (email_id);
+CREATE INDEX IF NOT EXISTS idx_classifications_timestamp ON classifications (timestamp);
+CREATE INDEX IF NOT EXISTS idx_classifications_domain ON classifications (sender_domain, timestamp);
+CREATE INDEX IF NOT EXISTS idx_classifications_category ON classifications (classification, timestamp);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+COLUMNS = (
+    'timestamp', 'email_id', 'subject', 'sender', 'sender_domain', 'to_addr',
+    'classification', 'reasoning', 'model',
+    'input_tokens', 'output_tokens', 'cache_read_tokens', 'cache_write_tokens', 'cost', 'latency'
+)
+# Columns added after the first release, with their types, for _migrate
+ADDED_COLUMNS = (
+    ('model', 'TEXT'), ('input_tokens', 'INTEGER'), ('output_tokens', 'INTEGER'),
+    ('cache_read_tokens', 'INTEGER'), ('cache_write_tokens', 'INTEGER'), ('cost', 'REAL'), ('latency', 'REAL'),
+)
+INSERT_SQL = (
+    f"INSERT INTO classifications ({', '.join(COLUMNS)}) "
+    f"VALUES ({', '.join('?' for _ in COLUMNS)})"
+)
+
+
+def sender_domain(sender: str) -> str:
+    """Extract the lowercase domain from a From header (e.g. 'Bob <bob@x.com>' -> 'x.com')."""
+    address = parseaddr(sender)[1] or sender
+    return address.rpartition('@')[2].strip().lower()
+
+
+def _token_counts(usage: Dict[str, int] | None) -> Tuple:
+    return tuple(usage.get(field) for field in TOKEN_FIELDS) if usage else (None,) * len(TOKEN_FIELDS)
+
+
+class SQLiteClassificationLogger:
+    """Classification log stored in an indexed SQLite database.
+
+    Drop-in alternative to ClassificationLogger: entries are buffered and
+    inserted in one transaction per flush. The database runs in WAL mode so
+    readers (stats, caches) never block the writer.
+    """
+
+    def __init__(self, db_path: Union[str, Path] = None, max_buffered: int = 100):
+        """Initialize store.
+
+        Args:
+            db_path: Path to SQLite database. Defaults to ~/.inbox-classifier/classifications.db
+            max_buffered: Insert once this many entries are buffered
+        """
+        if db_path is None:
+            db_path = Path.home() / '.inbox-classifier' / 'classifications.db'
+
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_buffered = max_buffered
+
+        self._buffer: List[Tuple] = []
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript(SCHEMA)
+        self._migrate()
+
+    def _migrate(self):
+        """Add columns introduced after a database was created."""
+        existing = {row['name'] for row in self._conn.execute('PRAGMA table_info(classifications)')}
+        with self._conn:
+            for name, column_type in ADDED_COLUMNS:
+                if name not in existing:
+                    self._conn.execute(f'ALTER TABLE classifications ADD COLUMN {name} {column_type}')
+
+    def log_classification(
+        self,
+        email_id: str,
+        subject: str,
+        sender: str,
+        to: str,
+        classification: str,
+        reasoning: str,
+        model: str = None,
+        usage: Dict[str, int] = None,
+        cost: float = None,
+        latency: float = None
+    ):
+        """Log a classification decision (same arguments as ClassificationLogger)."""
+        row = (
+            datetime.utcnow().isoformat(), email_id, subject, sender,
+            sender_domain(sender), to, classification, reasoning, model,
+            *_token_counts(usage), cost, latency
+        )
+
+        with self._lock:
+            self._buffer.append(row)
+            if len(self._buffer) >= self.max_buffered:
+                self._flush_locked()
+
+    def flush(self):
+        """Insert all buffered entries in a single transaction."""
+        with self._lock:
+            self._flush_locked()
+
+    def close(self):
+        """Flush buffered entries and close the database."""
+        with self._lock:
+            self._flush_locked()
+            self._conn.close()
+
+    def _flush_locked(self):
+        if not self._buffer:
+            return
+        with self._conn:
+            self._conn.executemany(INSERT_SQL, self._buffer)
+        self._buffer = []
+
+    def find_by_email_id(self, email_id: str) -> List[Dict]:
+        """Return every logged classification of a message, oldest first."""
+        return self._query('WHERE email_id = ? ORDER BY timestamp', (email_id,))
+
+    def find_by_sender_domain(self, domain: str, since: str = '') -> List[Dict]:
+        """Return classifications of mail from a sender domain, optionally since an ISO timestamp."""
+        return self._query(
+            'WHERE sender_domain = ? AND timestamp >= ? ORDER BY timestamp',
+            (domain.lower(), since)
+        )
+
+    def find_by_category(self, category: str, since: str = '') -> List[Dict]:
+        """Return classifications in a category, optionally since an ISO timestamp."""
+        return self._query(
+            'WHERE classification = ? AND timestamp >= ? ORDER BY timestamp',
+            (category, since)
+        )
+
+    def _query(self, where: str, params: Tuple) -> List[Dict]:
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {', '.join(COLUMNS)} FROM classifications {where}", params
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def import_jsonl(self, log_path: Union[str, Path]) -> int:
+        """Import an existing JSONL classification log (all segments) once.
+
+        Records the import in the meta table, so later calls are no-ops.
+
+        Returns:
+            Number of entries imported
+        """
+        with self._lock:
+            done = self._conn.execute(
+                "SELECT value FROM meta WHERE key = 'jsonl_imported'"
+            ).fetchone()
+        if done:
+            return 0
+
+        rows = [
+            (
+                entry.get('timestamp', ''), entry.get('email_id', ''), entry.get('subject'),
+                entry.get('sender'), sender_domain(entry.get('sender') or ''), entry.get('to'),
+                entry.get('classification'), entry.get('reasoning'), entry.get('model'),
+                *_token_counts(entry.get('usage')), entry.get('cost'), entry.get('latency')
+            )
+            for entry in iter_log_entries(log_path)
+        ]
+
+        with self._lock:
+            with self._conn:
+                self._conn.executemany(INSERT_SQL, rows)
+                self._conn.execute(
+                    "INSERT INTO meta (key, value) VALUES ('jsonl_imported', ?)",
+                    (datetime.utcnow().isoformat(),)
+                )
+
+        return len(rows)
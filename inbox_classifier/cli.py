@@ -0,0 +1,78 @@
+import argparse
+import os
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+from .costs import SpendAggregator, format_spend_report, read_db_spend
+from .logger import iter_log_entries
+from .stats import collect_db_stats, collect_stats, format_report
+
+DEFAULT_LOG = Path.home() / '.inbox-classifier' / 'classifications.jsonl'
+DEFAULT_DB = DEFAULT_LOG.with_name('classifications.db')
+
+
+def sqlite_store() -> bool:
+    """Return True when the service logs to SQLite (CLASSIFICATION_STORE, from the environment or .env)."""
+    load_dotenv()
+    return os.environ.get('CLASSIFICATION_STORE', 'jsonl').lower() == 'sqlite'
+
+
+def main(argv=None):
+    """Command-line entry point.
+
+    With no subcommand, runs the classifier service. `stats` prints a report
+    over the classification history; `costs` reports Claude token spend per
+    day, category and sender. Both read the store the service writes to:
+    the JSONL log, or the SQLite database with CLASSIFICATION_STORE=sqlite.
+    """
+    parser = argparse.ArgumentParser(prog='inbox-classifier', description='AI-powered Gmail inbox classifier')
+    subparsers = parser.add_subparsers(dest='command')
+
+    stats_parser = subparsers.add_parser('stats', help='Summarize the classification log')
+    stats_parser.add_argument('--log', type=Path, default=DEFAULT_LOG, help='Classification log path')
+    stats_parser.add_argument('--db', type=Path, default=DEFAULT_DB,
+                              help='Classification database path (CLASSIFICATION_STORE=sqlite)')
+    stats_parser.add_argument('--since', default='', help='Only count entries on or after YYYY-MM-DD')
+    stats_parser.add_argument('--top', type=int, default=10, help='Number of senders to show')
+    stats_parser.add_argument('--days', type=int, default=14, help='Number of days to show')
+    stats_parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: CPU count)')
+
+    costs_parser = subparsers.add_parser('costs', help='Report Claude spend per day, category and sender')
+    costs_parser.add_argument('--log', type=Path, default=DEFAULT_LOG, help='Classification log path')
+    costs_parser.add_argument('--db', type=Path, default=DEFAULT_DB,
+                              help='Classification database path (CLASSIFICATION_STORE=sqlite)')
+    costs_parser.add_argument('--days', type=int, default=30, help='Number of days to cover')
+    costs_parser.add_argument('--top', type=int, default=10, help='Number of senders to show')
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'stats':
+        if sqlite_store():
+            if not args.db.exists():
+                parser.error(f"CLASSIFICATION_STORE is sqlite but {args.db} does not exist")
+            stats = collect_db_stats(args.db, since=args.since)
+        else:
+            stats = collect_stats(args.log, since=args.since, workers=args.workers)
+        print(format_report(stats, top=args.top, days=args.days))
+        return
+
+    if args.command == 'costs':
+        aggregator = SpendAggregator(days=args.days)
+        if sqlite_store():
+            if not args.db.exists():
+                parser.error(f"CLASSIFICATION_STORE is sqlite but {args.db} does not exist")
+            read_db_spend(aggregator, args.db)
+        else:
+            for entry in iter_log_entries(args.log):
+                aggregator.add(entry)
+        print(format_spend_report(aggregator, top=args.top))
+        return
+
+    # Imported lazily: the service module configures logging on import
+    from .main import main as run_service
+    run_service()
+
+
+if __name__ == '__main__':
+    main()
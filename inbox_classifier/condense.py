@@ -0,0 +1,108 @@
+import re
+from typing import List
+
+DEFAULT_TOKEN_BUDGET = 80
+
+# Rough characters per token for English text; used to size how much raw
+# text to extract so condensation has enough material to fill the budget
+CHARS_PER_TOKEN = 4
+SOURCE_FACTOR = 4
+
+# Everything from a reply/forward header onward is quoted history. Each
+# form is matched on the lines that make it up (an 'On ... wrote:' line,
+# possibly wrapped once; Outlook's From: line directly followed by Sent: or
+# Date:, optionally under a rule of underscores) so a stray 'From:' or rule
+# in a newsletter doesn't cut the body
+REPLY_HEADER = re.compile(
+    r'^(On\s.{0,200}?(\n.{0,200}?)?\swrote:[ \t]*$'
+    r'|-{2,}[ \t]*(Original|Forwarded) Message[ \t]*-{2,}'
+    r'|(_{20,}[ \t]*\n)?From:[ \t].*\n[ \t]*(Sent|Date):[ \t])',
+    re.IGNORECASE | re.MULTILINE
+)
+
+SIGNATURE = re.compile(r'^--\s*$', re.MULTILINE)
+SENT_FROM = re.compile(r'^\s*Sent from my \w+', re.IGNORECASE)
+
+BOILERPLATE = re.compile(
+    r'view (this (e-?mail|message) )?(in|on) (your |a |the )?(web )?browser'
+    r'|having trouble (viewing|reading)'
+    r'|unsubscribe'
+    r'|manage (your )?(e-?mail )?(preferences|subscriptions?)'
+    r'|you (are )?receiv(ed|ing) this'
+    r'|(this|the) (e-?mail|message)( and any attachments?)? (is|are|may (be|contain)) (confidential|privileged|intended)'
+    r'|all rights reserved'
+    r'|privacy policy'
+    r'|^\s*(©|\(c\)|copyright)\s',
+    re.IGNORECASE
+)
+
+TOKEN_PATTERN = re.compile(r'\w+|[^\w\s]')
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the Claude token count of text without a tokenizer.
+
+    Words count as one token per 4 characters (at least one), punctuation
+    as one each; close enough to budget a prompt, and very fast.
+    """
+    return sum((len(t) + 3) // 4 for t in TOKEN_PATTERN.findall(text))
+
+
+def source_chars(token_budget: int) -> int:
+    """Return how many raw characters to extract for a token budget."""
+    return token_budget * CHARS_PER_TOKEN * SOURCE_FACTOR
+
+
+def strip_quotes(text: str) -> str:
+    """Remove quoted reply history: everything after a reply header, and '>' lines."""
+    match = REPLY_HEADER.search(text)
+    if match:
+        text = text[:match.start()]
+    return '\n'.join(line for line in text.splitlines() if not line.lstrip().startswith('>'))
+
+
+def strip_signature(text: str) -> str:
+    """Remove a '-- ' delimited signature and 'Sent from my ...' lines."""
+    match = SIGNATURE.search(text)
+    if match:
+        text = text[:match.start()]
+    return '\n'.join(line for line in text.splitlines() if not SENT_FROM.match(line))
+
+
+def strip_boilerplate(text: str) -> str:
+    """Remove short lines that are newsletter or legal boilerplate."""
+    return '\n'.join(
+        line for line in text.splitlines()
+        if len(line) > 300 or not BOILERPLATE.search(line)
+    )
+
+
+def fill_budget(text: str, token_budget: int) -> str:
+    """Return the longest prefix of text, cut at a word, that fits token_budget.
+
+    Text starting with a single over-long "word" (a URL, a run of symbols)
+    is cut inside it instead of returning nothing.
+    """
+    kept: List[str] = []
+    used = 0
+    for match in re.finditer(r'\S+\s*', text):
+        cost = estimate_tokens(match.group())
+        if used + cost > token_budget:
+            if not kept:
+                kept.append(match.group()[:token_budget * CHARS_PER_TOKEN])
+            break
+        kept.append(match.group())
+        used += cost
+    return ''.join(kept).rstrip()
+
+
+def condense(text: str, token_budget: int = DEFAULT_TOKEN_BUDGET) -> str:
+    """Strip quotes, signatures and boilerplate, then fit the body into token_budget.
+
+    If stripping removes everything (e.g. a bare forward), the original
+    text is used instead.
+    """
+    text = text.replace('\r\n', '\n')
+    cleaned = strip_boilerplate(strip_signature(strip_quotes(text)))
+    cleaned = re.sub(r'\n\s*\n+', '\n', cleaned).strip()
+    return fill_budget(cleaned or text.strip(), token_budget)
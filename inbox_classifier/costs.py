@@ -0,0 +1,234 @@
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Dict, Iterable, List, Union
+
+from .stats import ADDRESS_PATTERN, open_read_only
+
+# US dollars per million tokens: input, output, cache read, cache write.
+# Model IDs match by prefix, so dated snapshots share their family's price
+PRICES = {
+    'claude-haiku-4-5': (1.00, 5.00, 0.10, 1.25),
+    'claude-sonnet-4-5': (3.00, 15.00, 0.30, 3.75),
+    'claude-sonnet-4': (3.00, 15.00, 0.30, 3.75),
+    'claude-opus-4-5': (5.00, 25.00, 0.50, 6.25),
+    'claude-opus-4': (15.00, 75.00, 1.50, 18.75),
+    'claude-3-5-haiku': (0.80, 4.00, 0.08, 1.00),
+}
+# Unknown models are charged like the default final tier, so spend is never under-reported
+DEFAULT_PRICE = PRICES['claude-sonnet-4-5']
+
+# Message Batches are billed at half price
+BATCH_DISCOUNT = 0.5
+
+TOKEN_FIELDS = ('input_tokens', 'output_tokens', 'cache_read_tokens', 'cache_write_tokens')
+
+# The Messages API's names for the same counts
+API_FIELDS = {
+    'input_tokens': 'input_tokens',
+    'output_tokens': 'output_tokens',
+    'cache_read_tokens': 'cache_read_input_tokens',
+    'cache_write_tokens': 'cache_creation_input_tokens',
+}
+
+
+def price_for(model: str) -> tuple:
+    """Return (input, output, cache read, cache write) dollars per million tokens."""
+    for prefix in sorted(PRICES, key=len, reverse=True):
+        if model.startswith(prefix):
+            return PRICES[prefix]
+    return DEFAULT_PRICE
+
+
+def call_usage(model: str, usage=None, batch: bool = False) -> Dict:
+    """Return one API call's token counts from a Messages API usage object.
+
+    Args:
+        model: Model the call went to
+        usage: message.usage (None for a call whose usage isn't known yet)
+        batch: Whether the call went through the Message Batches API
+
+    Returns:
+        Dict with keys: model, batch and TOKEN_FIELDS
+    """
+    record = {'model': model, 'batch': batch}
+    for field, api_field in API_FIELDS.items():
+        value = getattr(usage, api_field, 0)
+        record[field] = value if isinstance(value, int) else 0
+    return record
+
+
+def call_cost(call: Dict) -> float:
+    """Return the dollar cost of one call recorded by call_usage."""
+    prices = price_for(call['model'])
+    cost = sum(call.get(field, 0) * price for field, price in zip(TOKEN_FIELDS, prices)) / 1_000_000
+    return cost * BATCH_DISCOUNT if call.get('batch') else cost
+
+
+def summarize(calls: Iterable[Dict]) -> Dict:
+    """Total the token counts and cost of an email's API calls (every cascade tier).
+
+    Returns:
+        Dict with keys: TOKEN_FIELDS and cost (dollars)
+    """
+    totals = dict.fromkeys(TOKEN_FIELDS, 0)
+    cost = 0.0
+    for call in calls:
+        for field in TOKEN_FIELDS:
+            totals[field] += call.get(field, 0)
+        cost += call_cost(call)
+    totals['cost'] = round(cost, 8)
+    return totals
+
+
+def sender_address(sender: str) -> str:
+    """Normalize a From header to its lowercase address."""
+    match = ADDRESS_PATTERN.search(sender)
+    return (match.group(1) if match else sender).strip().lower()
+
+
+class SpendAggregator:
+    """Rolling spend totals per day, sender and category over the last `days` days.
+
+    Fed classification log entries (live or replayed from the log); entries
+    without usage (resumed from the ledger, or logged before usage was
+    recorded) count as emails but cost nothing. Days that fall out of the
+    window are dropped as newer entries arrive.
+    """
+
+    def __init__(self, days: int = 30):
+        self.days = days
+        # day -> (sender, category) -> [emails, tokens..., cost]
+        self._days: Dict[str, Dict[tuple, List[float]]] = {}
+        self._latest = ''
+
+    def add(self, entry: Dict):
+        """Count one classification log entry."""
+        self.add_group(entry.get('timestamp', '')[:10], entry.get('sender') or '',
+                       entry.get('classification') or '', 1, entry.get('usage') or {}, entry.get('cost') or 0.0)
+
+    def add_group(self, day: str, sender: str, category: str, emails: int, usage: Dict, cost: float):
+        """Count `emails` entries of one day, sender and category at once, with their summed usage and cost."""
+        if not day:
+            return
+        if day > self._latest:
+            self._latest = day
+            self._prune()
+        if day < self._cutoff():
+            return
+
+        key = (sender_address(sender), category)
+        totals = self._days.setdefault(day, {}).setdefault(key, [0] * (len(TOKEN_FIELDS) + 2))
+        totals[0] += emails
+        for index, field in enumerate(TOKEN_FIELDS, 1):
+            totals[index] += usage.get(field, 0)
+        totals[-1] += cost
+
+    def by_day(self) -> Dict[str, Dict]:
+        """Return totals per day, oldest first."""
+        return {day: self._total(groups.values()) for day, groups in sorted(self._days.items())}
+
+    def by_sender(self) -> Dict[str, Dict]:
+        """Return totals per sender address over the window."""
+        return self._group(lambda sender, category: sender)
+
+    def by_category(self) -> Dict[str, Dict]:
+        """Return totals per category over the window."""
+        return self._group(lambda sender, category: category)
+
+    def hot_senders(self, top: int = 10) -> List[Dict]:
+        """Return the senders costing the most, with how consistently they're classified.
+
+        A sender whose mail nearly always lands in one category is a good
+        candidate for a skip rule or a cached verdict.
+
+        Returns:
+            Dicts with keys: sender, emails, cost, category (most common), share (of its emails)
+        """
+        categories: Dict[str, Dict[str, int]] = {}
+        for groups in self._days.values():
+            for (sender, category), totals in groups.items():
+                counts = categories.setdefault(sender, {})
+                counts[category] = counts.get(category, 0) + totals[0]
+
+        hot = []
+        for sender, totals in self.by_sender().items():
+            category, count = max(categories[sender].items(), key=lambda item: item[1])
+            hot.append({'sender': sender, 'emails': totals['emails'], 'cost': totals['cost'],
+                        'category': category, 'share': count / totals['emails']})
+        hot.sort(key=lambda item: (-item['cost'], -item['emails']))
+        return hot[:top]
+
+    def _group(self, key_of) -> Dict[str, Dict]:
+        grouped: Dict[str, List] = {}
+        for groups in self._days.values():
+            for (sender, category), totals in groups.items():
+                grouped.setdefault(key_of(sender, category), []).append(totals)
+        return {key: self._total(rows) for key, rows in grouped.items()}
+
+    @staticmethod
+    def _total(rows: Iterable[List[float]]) -> Dict:
+        summed = [sum(column) for column in zip(*rows)]
+        total = {'emails': int(summed[0])}
+        total.update(zip(TOKEN_FIELDS, (int(value) for value in summed[1:-1])))
+        total['cost'] = summed[-1]
+        return total
+
+    def _cutoff(self) -> str:
+        if not self._latest:
+            return ''
+        return (date.fromisoformat(self._latest) - timedelta(days=self.days - 1)).isoformat()
+
+    def _prune(self):
+        cutoff = self._cutoff()
+        for day in [day for day in self._days if day < cutoff]:
+            del self._days[day]
+
+
+def read_db_spend(aggregator: SpendAggregator, db_path: Union[str, Path]):
+    """Feed a SQLite classification store's spend into an aggregator.
+
+    Rows are totalled per day, sender and category by the database, over
+    the aggregator's window ending on the latest logged day.
+    """
+    sums = ', '.join(f'COALESCE(SUM({field}), 0)' for field in TOKEN_FIELDS)
+    conn = open_read_only(db_path)
+    try:
+        latest = conn.execute('SELECT MAX(timestamp) FROM classifications').fetchone()[0]
+        if latest is None:
+            return
+        cutoff = (date.fromisoformat(latest[:10]) - timedelta(days=aggregator.days - 1)).isoformat()
+        rows = conn.execute(
+            f"SELECT substr(timestamp, 1, 10), COALESCE(sender, ''), COALESCE(classification, ''), COUNT(*), "
+            f"{sums}, COALESCE(SUM(cost), 0) FROM classifications WHERE timestamp >= ? GROUP BY 1, 2, 3 ORDER BY 1",
+            (cutoff,)
+        ).fetchall()
+    finally:
+        conn.close()
+
+    for day, sender, category, emails, *tokens, cost in rows:
+        aggregator.add_group(day, sender, category, emails, dict(zip(TOKEN_FIELDS, tokens)), cost)
+
+
+def format_spend_report(aggregator: SpendAggregator, top: int = 10) -> str:
+    """Render a SpendAggregator as a plain-text report."""
+    days = aggregator.by_day()
+    emails = sum(d['emails'] for d in days.values())
+    cost = sum(d['cost'] for d in days.values())
+    lines = [f"Last {aggregator.days} days: {emails} emails, ${cost:.4f}"
+             + (f" (${cost / emails * 1000:.3f} per 1000 emails)" if emails else ''), "", "By day:"]
+    for day, totals in days.items():
+        lines.append(f"  {day}  {totals['emails']:>6}  ${totals['cost']:>9.4f}  "
+                     f"in {totals['input_tokens']:>9}  out {totals['output_tokens']:>7}  "
+                     f"cache r/w {totals['cache_read_tokens']}/{totals['cache_write_tokens']}")
+    if not days:
+        lines.append("  (no classifications logged)")
+
+    lines += ["", "By category:"]
+    for category, totals in sorted(aggregator.by_category().items(), key=lambda item: -item[1]['cost']):
+        lines.append(f"  {category:<20} {totals['emails']:>8}  ${totals['cost']:>9.4f}")
+
+    lines += ["", f"Top {top} senders by spend (consistently classified ones are rule candidates):"]
+    for sender in aggregator.hot_senders(top):
+        lines.append(f"  {sender['sender']:<40} {sender['emails']:>6}  ${sender['cost']:>8.4f}  "
+                     f"{sender['share']:>4.0%} {sender['category']}")
+    return '\n'.join(lines)
@@ -1,12 +1,22 @@
-import base64
-from typing import List, Dict
+import os
+from typing import List, Dict, Set
 
-def fetch_unread_emails(service, exclude_labels: List[str] = None) -> List[Dict]:
+from .gmail_client import execute
+from .mime import extract_text
+from .condense import condense, source_chars, DEFAULT_TOKEN_BUDGET
+
+def fetch_unread_emails(service, exclude_labels: List[str] = None,
+                        exclude_ids: Set[str] = None) -> List[Dict]:
     """Fetch unread emails from inbox, excluding already classified ones.
 
+    Follows result pages until FETCH_LIMIT messages (default 1000) are
+    listed, so a backlog can be seen in full and sent to backlog mode.
+
     Args:
         service: Gmail API service
         exclude_labels: List of Gmail label names to exclude
+        exclude_ids: Message IDs to leave out (e.g. backing off); they
+            don't count toward FETCH_LIMIT
 
     Returns:
         List of message objects with 'id' field
@@ -17,45 +27,49 @@ def fetch_unread_emails(service, exclude_labels: List[str] = None) -> List[Dict]
         for label in exclude_labels:
             query += f' -label:{label}'
 
-    results = service.users().messages().list(
-        userId='me',
-        q=query,
-        maxResults=100
-    ).execute()
+    limit = int(os.environ.get('FETCH_LIMIT', 1000))
+    messages = []
+    page_token = None
+    while len(messages) < limit:
+        results = execute(service.users().messages().list(
+            userId='me',
+            q=query,
+            maxResults=min(limit - len(messages), 500),
+            pageToken=page_token
+        ))
+        messages.extend(m for m in results.get('messages', []) if not exclude_ids or m['id'] not in exclude_ids)
+        page_token = results.get('nextPageToken')
+        if not page_token:
+            break
 
-    return results.get('messages', [])
+    return messages[:limit]
 
 def get_email_details(service, message_id: str) -> Dict[str, str]:
     """Get email subject, sender, recipient, and body preview.
 
+    The body is condensed (quotes, signatures and boilerplate removed) to
+    BODY_TOKEN_BUDGET estimated tokens (default 80).
+
     Returns:
         Dict with keys: id, subject, sender, to, body, label_ids
     """
-    message = service.users().messages().get(
+    message = execute(service.users().messages().get(
         userId='me',
         id=message_id,
         format='full'
-    ).execute()
+    ))
 
     headers = message['payload'].get('headers', [])
     subject = next((h['value'] for h in headers if h['name'] == 'Subject'), '')
     sender = next((h['value'] for h in headers if h['name'] == 'From'), '')
     to = next((h['value'] for h in headers if h['name'] == 'To'), '')
 
-    # Extract body (handle both body.data and parts)
-    body = ''
-    payload = message['payload']
-
-    if 'body' in payload and 'data' in payload['body']:
-        body = base64.urlsafe_b64decode(payload['body']['data']).decode('utf-8', errors='ignore')
-    elif 'parts' in payload:
-        for part in payload['parts']:
-            if part['mimeType'] == 'text/plain' and 'data' in part['body']:
-                body = base64.urlsafe_b64decode(part['body']['data']).decode('utf-8', errors='ignore')
-                break
-
-    # Limit body to first 300 characters
-    body_preview = body[:300] if body else ''
+    # Best text part at any depth, decoded only as far as the preview needs
+    token_budget = int(os.environ.get('BODY_TOKEN_BUDGET', DEFAULT_TOKEN_BUDGET))
+    body_preview = condense(
+        extract_text(message['payload'], max_chars=source_chars(token_budget)),
+        token_budget
+    )
 
     return {
         'id': message_id,
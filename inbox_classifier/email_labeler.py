@@ -1,4 +1,6 @@
-from typing import Dict
+from typing import Dict, List
+
+from .gmail_client import execute
 
 def apply_label(service, message_id: str, label_id: str) -> Dict:
     """Apply label to an email message and archive it (remove from inbox).
@@ -11,13 +13,49 @@ def apply_label(service, message_id: str, label_id: str) -> Dict:
     Returns:
         Modified message object
     """
-    result = service.users().messages().modify(
+    result = execute(service.users().messages().modify(
         userId='me',
         id=message_id,
         body={
             'addLabelIds': [label_id],
             'removeLabelIds': ['INBOX']
         }
-    ).execute()
+    ))
+
+    return result
+
+
+def apply_label_batch(service, message_ids: List[str], label_id: str):
+    """Apply one label to several messages and archive them in a single call.
+
+    Args:
+        service: Gmail API service
+        message_ids: Email message IDs (at most 1000)
+        label_id: Label ID to apply
+    """
+    execute(service.users().messages().batchModify(
+        userId='me',
+        body={
+            'ids': message_ids,
+            'addLabelIds': [label_id],
+            'removeLabelIds': ['INBOX']
+        }
+    ))
+
+
+def quarantine_message(service, message_id: str, label_id: str) -> Dict:
+    """Label a message that repeatedly failed classification and mark it read.
+
+    The message stays in the inbox for manual review; marking it read keeps
+    it out of the unread fetch query so it is never retried automatically.
+    """
+    result = execute(service.users().messages().modify(
+        userId='me',
+        id=message_id,
+        body={
+            'addLabelIds': [label_id],
+            'removeLabelIds': ['UNREAD']
+        }
+    ))
 
     return result
@@ -16,10 +16,15 @@ class AuthenticationError(Exception):
     pass
 
 
-def get_gmail_service():
-    """Authenticate and return Gmail API service."""
+def get_gmail_service(token_path: Path = None):
+    """Authenticate and return Gmail API service.
+
+    Args:
+        token_path: OAuth token file. Defaults to ~/.inbox-classifier/token.json
+    """
     creds = None
-    token_path = Path.home() / '.inbox-classifier' / 'token.json'
+    if token_path is None:
+        token_path = Path.home() / '.inbox-classifier' / 'token.json'
     # Use path relative to this module's location (project root)
     module_dir = Path(__file__).parent.parent
     creds_path = module_dir / 'credentials.json'
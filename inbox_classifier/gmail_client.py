@@ -0,0 +1,68 @@
+import threading
+from typing import Dict
+
+from google_auth_httplib2 import AuthorizedHttp
+from googleapiclient.http import build_http
+
+from .gmail_quota import scheduler_for
+from .metrics import API_CALLS
+from .retry import call_with_retry
+
+_thread_local = threading.local()
+
+
+def thread_http(credentials) -> AuthorizedHttp:
+    """Return an authorized HTTP transport owned by the calling thread.
+
+    httplib2 (used by googleapiclient) is not thread-safe, so pipeline workers
+    sharing one Gmail service must not share its default transport. Each
+    thread keeps one raw connection pool, wrapped per user. Services (and
+    their credentials) are rebuilt every cycle, so users are told apart by
+    refresh token, as in gmail_quota.scheduler_for; a user's new
+    credentials replace the old wrapper instead of adding one per cycle.
+    """
+    if not hasattr(_thread_local, 'raw'):
+        _thread_local.raw = build_http()
+        _thread_local.authorized = {}
+
+    key = getattr(credentials, 'refresh_token', None) or id(credentials)
+    http = _thread_local.authorized.get(key)
+    if http is None or http.credentials is not credentials:
+        http = AuthorizedHttp(credentials, http=_thread_local.raw)
+        _thread_local.authorized[key] = http
+    return http
+
+
+def execute(request) -> Dict:
+    """Execute a Gmail API request on the calling thread's own transport.
+
+    All Gmail calls go through here, so they are safe to make from any
+    pipeline worker. Each attempt waits for its quota units to be available
+    and times out at the retry deadline; transient errors (429, 5xx,
+    dropped connections, timeouts) are retried until then.
+    """
+    credentials = request.http.credentials
+    scheduler = scheduler_for(credentials)
+    method_id = getattr(request, 'methodId', None)
+
+    def attempt(timeout: float):
+        scheduler.acquire(method_id)
+        API_CALLS.inc(api='gmail', method=method_id or 'unknown')
+        http = thread_http(credentials)
+        set_timeout(http.http, timeout)
+        return request.execute(http=http)
+
+    return call_with_retry(attempt, pass_timeout=True)
+
+
+def set_timeout(http, seconds: float):
+    """Bound the socket operations of an httplib2 transport's next request.
+
+    New connections take the transport's timeout; pooled ones already
+    have a socket, so it is set there too.
+    """
+    http.timeout = seconds
+    for connection in http.connections.values():
+        connection.timeout = seconds
+        if getattr(connection, 'sock', None) is not None:
+            connection.sock.settimeout(seconds)
@@ -1,13 +1,15 @@
 from typing import Dict, List
 from googleapiclient.errors import HttpError
 
+from .gmail_client import execute
+
 LABEL_PREFIX = ''
 
 
 def get_label_id(service, label_name: str, userId: str = 'me') -> str | None:
     """Get label ID by name, return None if not found."""
     try:
-        results = service.users().labels().list(userId=userId).execute()
+        results = execute(service.users().labels().list(userId=userId))
         labels = results.get('labels', [])
 
         for label in labels:
@@ -28,10 +30,10 @@ def create_label(service, label_name: str, userId: str = 'me') -> str:
     }
 
     try:
-        result = service.users().labels().create(
+        result = execute(service.users().labels().create(
             userId=userId,
             body=label_object
-        ).execute()
+        ))
 
         return result['id']
     except HttpError as error:
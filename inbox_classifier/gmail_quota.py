@@ -0,0 +1,162 @@
+import heapq
+import itertools
+import os
+import threading
+import time
+from collections import Counter, deque
+from typing import Dict
+
+# Quota units charged per call (https://developers.google.com/gmail/api/reference/quota)
+METHOD_COSTS = {
+    'gmail.users.getProfile': 1,
+    'gmail.users.history.list': 2,
+    'gmail.users.labels.list': 1,
+    'gmail.users.labels.get': 1,
+    'gmail.users.labels.create': 5,
+    'gmail.users.labels.update': 5,
+    'gmail.users.labels.delete': 5,
+    'gmail.users.messages.list': 5,
+    'gmail.users.messages.get': 5,
+    'gmail.users.messages.modify': 5,
+    'gmail.users.messages.trash': 5,
+    'gmail.users.messages.batchModify': 50,
+}
+DEFAULT_COST = 5
+
+# When calls are queued, finish messages already in flight (labels, modify)
+# before downloading new ones, and list new mail last
+PRIORITIES = {
+    'gmail.users.labels.list': 0,
+    'gmail.users.labels.create': 0,
+    'gmail.users.messages.modify': 0,
+    'gmail.users.messages.batchModify': 0,
+    'gmail.users.messages.get': 1,
+    'gmail.users.messages.list': 2,
+    'gmail.users.history.list': 2,
+}
+DEFAULT_PRIORITY = 1
+
+# Gmail's per-user limit is 250 units/second as a moving average
+UNITS_PER_SECOND = 250
+
+
+class QuotaScheduler:
+    """Token bucket over Gmail quota units for one user.
+
+    Calls wait until the bucket holds their unit cost, so sustained usage
+    stays just under the per-user limit instead of tripping 429s. Waiting
+    calls are served by priority (see PRIORITIES), then in arrival order.
+    """
+
+    def __init__(self, units_per_second: float = UNITS_PER_SECOND * 0.9, window: float = 10):
+        """Initialize scheduler.
+
+        Args:
+            units_per_second: Sustained rate to allow; the bucket holds one
+                second's worth, so short bursts are allowed
+            window: Seconds over which the live usage rate is averaged
+        """
+        self.rate = units_per_second
+        self.capacity = max(units_per_second, max(METHOD_COSTS.values()))
+        self.window = window
+
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._cond = threading.Condition()
+        self._waiting = []
+        self._seq = itertools.count()
+        self._recent = deque()
+
+        self.units = 0
+        self.calls = Counter()
+        self.waited_seconds = 0.0
+
+    def acquire(self, method_id: str) -> float:
+        """Block until a call to method_id fits in the budget, then charge it.
+
+        Returns:
+            Seconds spent waiting
+        """
+        cost = METHOD_COSTS.get(method_id, DEFAULT_COST)
+        ticket = (PRIORITIES.get(method_id, DEFAULT_PRIORITY), next(self._seq))
+        start = time.monotonic()
+
+        with self._cond:
+            heapq.heappush(self._waiting, ticket)
+            while True:
+                self._refill()
+                if self._waiting[0] == ticket:
+                    if self._tokens >= cost:
+                        break
+                    self._cond.wait((cost - self._tokens) / self.rate)
+                else:
+                    self._cond.wait()
+
+            heapq.heappop(self._waiting)
+            self._tokens -= cost
+            now = time.monotonic()
+            waited = now - start
+
+            self.units += cost
+            self.calls[method_id] += 1
+            self.waited_seconds += waited
+            self._recent.append((now, cost))
+            # Let the next caller in line re-check the bucket
+            self._cond.notify_all()
+
+        return waited
+
+    def usage(self) -> Dict:
+        """Return live usage figures.
+
+        Returns:
+            Dict with keys: units, calls, units_per_second (averaged over the
+            window), limit, available, waiting, waited_seconds
+        """
+        with self._cond:
+            self._refill()
+            now = time.monotonic()
+            while self._recent and self._recent[0][0] < now - self.window:
+                self._recent.popleft()
+            return {
+                'units': self.units,
+                'calls': sum(self.calls.values()),
+                'units_per_second': sum(cost for _, cost in self._recent) / self.window,
+                'limit': self.rate,
+                'available': self._tokens,
+                'waiting': len(self._waiting),
+                'waited_seconds': self.waited_seconds,
+            }
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+
+_schedulers: Dict[object, QuotaScheduler] = {}
+_schedulers_lock = threading.Lock()
+
+
+def scheduler_for(credentials) -> QuotaScheduler:
+    """Return the shared scheduler for the user these credentials belong to.
+
+    Services are rebuilt every cycle, so users are told apart by refresh
+    token rather than by credentials object. The budget is
+    GMAIL_QUOTA_UNITS_PER_SECOND (default 250) times GMAIL_QUOTA_HEADROOM
+    (default 0.9).
+    """
+    key = getattr(credentials, 'refresh_token', None) or id(credentials)
+    with _schedulers_lock:
+        scheduler = _schedulers.get(key)
+        if scheduler is None:
+            limit = float(os.environ.get('GMAIL_QUOTA_UNITS_PER_SECOND', UNITS_PER_SECOND))
+            headroom = float(os.environ.get('GMAIL_QUOTA_HEADROOM', 0.9))
+            scheduler = QuotaScheduler(limit * headroom)
+            _schedulers[key] = scheduler
+        return scheduler
+
+
+def service_scheduler(service) -> QuotaScheduler:
+    """Return the scheduler charged for calls made through a Gmail service."""
+    return scheduler_for(service._http.credentials)
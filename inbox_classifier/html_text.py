@@ -0,0 +1,113 @@
+import re
+from html.parser import HTMLParser
+from typing import Iterable, List
+
+# Elements whose content is never visible text
+SKIP_TAGS = {'head', 'title', 'script', 'style', 'noscript', 'template', 'svg', 'iframe', 'object'}
+
+# Elements that start a new line of text
+BLOCK_TAGS = {
+    'address', 'article', 'blockquote', 'br', 'dd', 'div', 'dl', 'dt', 'footer', 'h1', 'h2',
+    'h3', 'h4', 'h5', 'h6', 'header', 'hr', 'li', 'ol', 'p', 'pre', 'section', 'table',
+    'td', 'th', 'tr', 'ul',
+}
+
+VOID_TAGS = {'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta', 'source', 'wbr'}
+
+# Inline styles used to hide preheaders and tracking markup
+HIDDEN_STYLE = re.compile(r'display\s*:\s*none|visibility\s*:\s*hidden|max-height\s*:\s*0', re.IGNORECASE)
+WHITESPACE = re.compile(r'[ \t\r\f\v\u00a0\u200b\u200c\u200d\u034f]+')
+BLANK_LINES = re.compile(r' *\n\s*')
+
+
+class TextExtractor(HTMLParser):
+    """HTMLParser collecting visible text until max_chars are gathered.
+
+    Content of SKIP_TAGS and of elements hidden with inline styles or the
+    `hidden` attribute is dropped; entities are decoded by the parser.
+    """
+
+    def __init__(self, max_chars: int):
+        super().__init__(convert_charrefs=True)
+        self.max_chars = max_chars
+        self.done = False
+
+        self._parts: List[str] = []
+        self._length = 0
+        self._skip_tag = None
+        self._skip_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if self._skip_tag is not None:
+            if tag == self._skip_tag:
+                self._skip_depth += 1
+            return
+
+        if tag in SKIP_TAGS or (tag not in VOID_TAGS and self._hidden(attrs)):
+            self._skip_tag, self._skip_depth = tag, 1
+        elif tag in BLOCK_TAGS:
+            self._parts.append('\n')
+
+    def handle_endtag(self, tag):
+        if self._skip_tag is not None:
+            if tag == self._skip_tag:
+                self._skip_depth -= 1
+                if self._skip_depth == 0:
+                    self._skip_tag = None
+            return
+
+        if tag in BLOCK_TAGS:
+            self._parts.append('\n')
+
+    def handle_data(self, data):
+        if self.done or self._skip_tag is not None:
+            return
+
+        text = WHITESPACE.sub(' ', data)
+        if not text.strip():
+            if text:
+                self._parts.append(' ')
+            return
+
+        self._parts.append(text)
+        self._length += len(text)
+        if self._length >= self.max_chars:
+            self.done = True
+
+    def text(self) -> str:
+        """Return the visible text gathered so far, whitespace-collapsed."""
+        text = BLANK_LINES.sub('\n', ''.join(self._parts))
+        text = WHITESPACE.sub(' ', text).strip()
+        return text[:self.max_chars]
+
+    @staticmethod
+    def _hidden(attrs) -> bool:
+        for name, value in attrs:
+            if name == 'hidden' or (name == 'style' and value and HIDDEN_STYLE.search(value)):
+                return True
+            if name == 'aria-hidden' and value == 'true':
+                return True
+        return False
+
+
+def html_to_text(chunks: Iterable[str], max_chars: int = 300) -> str:
+    """Extract up to max_chars of visible text from HTML fed in chunks.
+
+    Parsing stops at the first chunk boundary after enough text has been
+    collected, so the remainder of a large HTML body is never decoded.
+
+    Args:
+        chunks: HTML text pieces (e.g. from mime.iter_decoded), or one string
+        max_chars: Visible characters to collect
+    """
+    if isinstance(chunks, str):
+        chunks = (chunks,)
+
+    parser = TextExtractor(max_chars)
+    for chunk in chunks:
+        parser.feed(chunk)
+        if parser.done:
+            break
+    else:
+        parser.close()
+    return parser.text()
@@ -0,0 +1,246 @@
+import hashlib
+import logging
+import math
+import os
+import socket
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Union
+
+from .accounts import Account
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS leases (
+    account TEXT PRIMARY KEY,
+    owner TEXT NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS workers (
+    worker_id TEXT PRIMARY KEY,
+    expires_at REAL NOT NULL
+);
+"""
+
+
+class SQLiteLeaseStore:
+    """Lease store in a SQLite file that every worker node can reach (e.g. shared disk)."""
+
+    def __init__(self, db_path: Union[str, Path]):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), timeout=30, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.executescript(SCHEMA)
+
+    def register_worker(self, worker_id: str, expires_at: float):
+        with self._lock, self._conn:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO workers (worker_id, expires_at) VALUES (?, ?)',
+                (worker_id, expires_at)
+            )
+
+    def live_workers(self, now: float) -> List[str]:
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT worker_id FROM workers WHERE expires_at > ? ORDER BY worker_id', (now,)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def claim(self, account: str, owner: str, now: float, expires_at: float) -> bool:
+        """Take or renew a lease if it is free, expired or already ours (atomic)."""
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                'INSERT INTO leases (account, owner, expires_at) VALUES (?, ?, ?) '
+                'ON CONFLICT(account) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at '
+                'WHERE leases.owner = excluded.owner OR leases.expires_at <= ?',
+                (account, owner, expires_at, now)
+            )
+            return cursor.rowcount == 1
+
+    def release(self, account: str, owner: str):
+        with self._lock, self._conn:
+            self._conn.execute(
+                'DELETE FROM leases WHERE account = ? AND owner = ?', (account, owner)
+            )
+
+    def owners(self, now: float) -> Dict[str, str]:
+        """Return unexpired leases as {account: owner}."""
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT account, owner FROM leases WHERE expires_at > ?', (now,)
+            ).fetchall()
+        return dict(rows)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class MemoryLeaseStore:
+    """In-process stand-in for SQLiteLeaseStore, for tests and single-node runs."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._leases: Dict[str, tuple] = {}
+        self._workers: Dict[str, float] = {}
+
+    def register_worker(self, worker_id: str, expires_at: float):
+        with self._lock:
+            self._workers[worker_id] = expires_at
+
+    def live_workers(self, now: float) -> List[str]:
+        with self._lock:
+            return sorted(w for w, expires in self._workers.items() if expires > now)
+
+    def claim(self, account: str, owner: str, now: float, expires_at: float) -> bool:
+        with self._lock:
+            current = self._leases.get(account)
+            if current and current[0] != owner and current[1] > now:
+                return False
+            self._leases[account] = (owner, expires_at)
+            return True
+
+    def release(self, account: str, owner: str):
+        with self._lock:
+            if self._leases.get(account, (None,))[0] == owner:
+                del self._leases[account]
+
+    def owners(self, now: float) -> Dict[str, str]:
+        with self._lock:
+            return {a: owner for a, (owner, expires) in self._leases.items() if expires > now}
+
+    def close(self):
+        pass
+
+
+def _rank(account: str, worker_id: str) -> str:
+    """Rendezvous-hash rank: each worker prefers a different, stable set of accounts."""
+    return hashlib.sha1(f'{account}:{worker_id}'.encode()).hexdigest()
+
+
+class ShardManager:
+    """Coordinator-free assignment of accounts to worker nodes via leases.
+
+    Every worker heartbeats into the shared store and leases accounts for
+    `ttl` seconds. Between cycles, rebalance() aims for an even share
+    (ceil(accounts / live workers)): it releases leases above the share so
+    a newly joined worker can take them, and claims free or expired ones
+    when below it, so a dead worker's accounts move once its leases lapse.
+    A background thread renews held leases during cycles and the sleeps
+    between them, but only as long as cycles keep starting when they are
+    due (see beat()): a worker whose next cycle is max_stall overdue, e.g.
+    one hung mid-cycle, stops renewing and its accounts move elsewhere
+    after max_stall + ttl. A long sleep, such as quiet hours, is not a stall.
+    """
+
+    def __init__(self, store, worker_id: str, accounts: List[Account], ttl: float = 120,
+                 max_stall: float = 900, clock: Callable[[], float] = time.time):
+        self.store = store
+        self.worker_id = worker_id
+        self.accounts = {account.name: account for account in accounts}
+        self.ttl = ttl
+        self.max_stall = max_stall
+        self.clock = clock
+        self.next_cycle_at = clock()
+
+        self.held: List[str] = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def beat(self, sleep: float = 0):
+        """Record that a cycle completed and the next is due in `sleep` seconds (from the service heartbeat)."""
+        self.next_cycle_at = self.clock() + sleep
+
+    def heartbeat(self):
+        """Renew this worker's presence and every lease it holds."""
+        now = self.clock()
+        self.store.register_worker(self.worker_id, now + self.ttl)
+        with self._lock:
+            self.held = [
+                name for name in self.held
+                if self.store.claim(name, self.worker_id, now, now + self.ttl)
+            ]
+
+    def rebalance(self) -> List[Account]:
+        """Adjust held leases toward a fair share and return the accounts to serve."""
+        self.beat()
+        self.heartbeat()
+        now = self.clock()
+        workers = self.store.live_workers(now) or [self.worker_id]
+        share = math.ceil(len(self.accounts) / len(workers))
+
+        with self._lock:
+            # Give back the accounts we are least attached to first
+            by_preference = sorted(self.held, key=lambda name: _rank(name, self.worker_id))
+            for name in by_preference[share:]:
+                self.store.release(name, self.worker_id)
+            self.held = by_preference[:share]
+
+            owners = self.store.owners(now)
+            candidates = sorted(
+                (name for name in self.accounts if name not in owners),
+                key=lambda name: _rank(name, self.worker_id)
+            )
+            for name in candidates:
+                if len(self.held) >= share:
+                    break
+                if self.store.claim(name, self.worker_id, now, now + self.ttl):
+                    self.held.append(name)
+
+            return [self.accounts[name] for name in sorted(self.held)]
+
+    def start(self):
+        """Start renewing leases in the background every ttl / 3 seconds."""
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._renew_loop, name='lease-renewal', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop renewing and release every lease so other workers can take over at once."""
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+        with self._lock:
+            for name in self.held:
+                self.store.release(name, self.worker_id)
+            self.held = []
+        self.store.register_worker(self.worker_id, 0)
+
+    def renew(self) -> bool:
+        """Renew held leases unless the service has stalled; return True if renewed."""
+        if self.clock() - self.next_cycle_at > self.max_stall:
+            logger.warning(
+                f"No cycle completed within {self.max_stall:.0f}s of when it was due — "
+                "letting leases lapse so other workers take over"
+            )
+            return False
+        try:
+            self.heartbeat()
+        except Exception as e:
+            logger.warning(f"Lease renewal failed: {e}")
+            return False
+        return True
+
+    def _renew_loop(self):
+        while not self._stop.wait(self.ttl / 3):
+            self.renew()
+
+
+def shard_manager_from_env(accounts: List[Account]) -> ShardManager | None:
+    """Build a ShardManager when SHARD_STORE names a shared lease database.
+
+    WORKER_ID defaults to hostname-pid; LEASE_TTL defaults to 120 seconds.
+    """
+    store_path = os.environ.get('SHARD_STORE')
+    if not store_path:
+        return None
+
+    worker_id = os.environ.get('WORKER_ID') or f'{socket.gethostname()}-{os.getpid()}'
+    ttl = float(os.environ.get('LEASE_TTL', 120))
+    return ShardManager(SQLiteLeaseStore(store_path), worker_id, accounts, ttl=ttl)
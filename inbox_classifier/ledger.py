@@ -0,0 +1,288 @@
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Set, Union
+
+FETCHED = 'fetched'
+CLASSIFIED = 'classified'
+BATCHED = 'batched'
+LABELED = 'labeled'
+LOGGED = 'logged'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS messages (
+    email_id TEXT PRIMARY KEY,
+    state TEXT NOT NULL,
+    email TEXT,
+    classification TEXT,
+    reasoning TEXT,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_messages_state ON messages (state, updated_at);
+CREATE TABLE IF NOT EXISTS batches (
+    batch_id TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    submitted_at REAL NOT NULL,
+    done INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS failures (
+    email_id TEXT PRIMARY KEY,
+    attempts INTEGER NOT NULL,
+    next_attempt_at REAL NOT NULL,
+    last_error TEXT,
+    quarantined INTEGER NOT NULL DEFAULT 0,
+    updated_at REAL NOT NULL,
+    quarantine_labeled INTEGER NOT NULL DEFAULT 0
+);
+"""
+# Columns added after the first release, with their definitions, for _migrate
+ADDED_COLUMNS = (
+    ('failures', 'quarantine_labeled', 'INTEGER NOT NULL DEFAULT 0'),
+)
+
+
+class ProcessedLedger:
+    """Durable record of how far each message got through a cycle.
+
+    Every step (fetched -> [batched ->] classified -> labeled -> logged) is
+    committed as it completes, so after a crash the next cycle resumes from the last finished
+    step instead of paying for another classification.
+
+    Messages that fail are retried with exponential backoff; after
+    max_attempts they are quarantined and never retried automatically.
+    """
+
+    def __init__(
+        self,
+        db_path: Union[str, Path] = None,
+        max_attempts: int = 5,
+        backoff_base: float = 60,
+        backoff_max: float = 6 * 3600
+    ):
+        """Initialize ledger.
+
+        Args:
+            db_path: Path to SQLite database. Defaults to ~/.inbox-classifier/ledger.db
+            max_attempts: Failures before a message is quarantined
+            backoff_base: Seconds to wait after the first failure, doubled per failure
+            backoff_max: Upper bound on the wait between attempts
+        """
+        if db_path is None:
+            db_path = Path.home() / '.inbox-classifier' / 'ledger.db'
+
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.executescript(SCHEMA)
+        self._migrate()
+
+    def _migrate(self):
+        """Add columns introduced after a database was created."""
+        with self._conn:
+            for table, name, definition in ADDED_COLUMNS:
+                existing = {row['name'] for row in self._conn.execute(f'PRAGMA table_info({table})')}
+                if name not in existing:
+                    self._conn.execute(f'ALTER TABLE {table} ADD COLUMN {name} {definition}')
+
+    def get(self, email_id: str) -> Dict | None:
+        """Return the ledger entry for a message, or None if never seen.
+
+        Returns:
+            Dict with keys: email_id, state, email, classification, reasoning
+        """
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT * FROM messages WHERE email_id = ?', (email_id,)
+            ).fetchone()
+        return self._to_entry(row) if row else None
+
+    def pending_logs(self) -> List[Dict]:
+        """Return messages that were labeled but never logged."""
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT * FROM messages WHERE state = ? ORDER BY updated_at', (LABELED,)
+            ).fetchall()
+        return [self._to_entry(row) for row in rows]
+
+    def sender_history(self, sender: str) -> Dict[str, int]:
+        """Count the categories recent mail from a sender (exact From header) was labeled with."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT classification, COUNT(*) AS n FROM messages "
+                "WHERE state IN (?, ?) AND json_extract(email, '$.sender') = ? GROUP BY classification",
+                (LABELED, LOGGED, sender)
+            ).fetchall()
+        return {row['classification']: row['n'] for row in rows}
+
+    def mark_fetched(self, email_id: str):
+        """Record that a message's details were fetched (discards any earlier verdict)."""
+        self._write(
+            'INSERT OR REPLACE INTO messages (email_id, state, updated_at) VALUES (?, ?, ?)',
+            (email_id, FETCHED, time.time())
+        )
+
+    def mark_classified(self, email: Dict[str, str], result: Dict[str, str]):
+        """Record a verdict together with the details needed to label and log it."""
+        details = self._details(email)
+        self._write(
+            'INSERT OR REPLACE INTO messages '
+            '(email_id, state, email, classification, reasoning, updated_at) '
+            'VALUES (?, ?, ?, ?, ?, ?)',
+            (email['id'], CLASSIFIED, json.dumps(details),
+             result['classification'], result['reasoning'], time.time())
+        )
+
+    def mark_batched(self, emails: List[Dict[str, str]], batch_id: str):
+        """Record that messages were submitted in a Message Batch awaiting results."""
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO batches (batch_id, size, submitted_at) VALUES (?, ?, ?)',
+                (batch_id, len(emails), now)
+            )
+            self._conn.executemany(
+                'INSERT OR REPLACE INTO messages (email_id, state, email, updated_at) '
+                'VALUES (?, ?, ?, ?)',
+                [(email['id'], BATCHED, json.dumps(self._details(email)), now) for email in emails]
+            )
+
+    def open_batches(self) -> List[str]:
+        """Return IDs of submitted batches whose results have not been collected."""
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT batch_id FROM batches WHERE done = 0 ORDER BY submitted_at'
+            ).fetchall()
+        return [row['batch_id'] for row in rows]
+
+    def finish_batch(self, batch_id: str):
+        """Record that a batch's results were collected."""
+        self._write('UPDATE batches SET done = 1 WHERE batch_id = ?', (batch_id,))
+
+    def mark_labeled(self, email_id: str):
+        """Record that the verdict's label was applied in Gmail."""
+        self._set_state([email_id], LABELED)
+
+    def mark_logged(self, email_ids: Iterable[str]):
+        """Record that classifications reached the classification log."""
+        self._set_state(list(email_ids), LOGGED)
+
+    def record_failure(self, email_id: str, error: str) -> Dict:
+        """Count a failed attempt and schedule the next one.
+
+        Returns:
+            Dict with keys: attempts, next_attempt_at, quarantined
+        """
+        now = time.time()
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                'SELECT attempts FROM failures WHERE email_id = ?', (email_id,)
+            ).fetchone()
+            attempts = (row['attempts'] if row else 0) + 1
+            delay = min(self.backoff_base * 2 ** (attempts - 1), self.backoff_max)
+            quarantined = attempts >= self.max_attempts
+            self._conn.execute(
+                'INSERT OR REPLACE INTO failures '
+                '(email_id, attempts, next_attempt_at, last_error, quarantined, updated_at) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                (email_id, attempts, now + delay, error[:500], int(quarantined), now)
+            )
+
+        return {'attempts': attempts, 'next_attempt_at': now + delay, 'quarantined': quarantined}
+
+    def should_attempt(self, email_id: str) -> bool:
+        """Return False while a message is backing off or quarantined."""
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT next_attempt_at, quarantined FROM failures WHERE email_id = ?', (email_id,)
+            ).fetchone()
+        if row is None:
+            return True
+        return not row['quarantined'] and row['next_attempt_at'] <= time.time()
+
+    def held_back(self) -> Set[str]:
+        """Return IDs of messages backing off or quarantined, to leave out of the unread list."""
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT email_id FROM failures WHERE quarantined = 1 OR next_attempt_at > ?', (time.time(),)
+            ).fetchall()
+        return {row['email_id'] for row in rows}
+
+    def mark_quarantine_labeled(self, email_id: str):
+        """Record that a quarantined message got its Gmail label, so Gmail keeps it out of the fetch."""
+        self._write('UPDATE failures SET quarantine_labeled = 1 WHERE email_id = ?', (email_id,))
+
+    def clear_failures(self, email_id: str):
+        """Forget past failures once a message is processed successfully."""
+        self._write('DELETE FROM failures WHERE email_id = ?', (email_id,))
+
+    def quarantined(self) -> List[Dict]:
+        """Return quarantined messages with their attempt count and last error."""
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT email_id, attempts, last_error FROM failures '
+                'WHERE quarantined = 1 ORDER BY updated_at'
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def prune(self, max_age_days: float = 30, batch_max_age_days: float = 2):
+        """Forget completed messages and stale failure records older than max_age_days.
+
+        Messages still waiting on a batch after batch_max_age_days (batches
+        expire after 24 hours) are forgotten so they get classified again.
+        Quarantines are kept until their Gmail label is confirmed: for a
+        message only quarantined locally, the ledger is all that stops retries.
+        """
+        now = time.time()
+        cutoff = now - max_age_days * 86400
+        with self._lock, self._conn:
+            self._conn.execute(
+                'DELETE FROM messages WHERE state = ? AND updated_at < ?', (LOGGED, cutoff)
+            )
+            self._conn.execute(
+                'DELETE FROM messages WHERE state = ? AND updated_at < ?',
+                (BATCHED, now - batch_max_age_days * 86400)
+            )
+            self._conn.execute('DELETE FROM batches WHERE submitted_at < ?', (cutoff,))
+            self._conn.execute(
+                'DELETE FROM failures WHERE updated_at < ? AND (quarantined = 0 OR quarantine_labeled = 1)',
+                (cutoff,)
+            )
+
+    def close(self):
+        """Close the database."""
+        with self._lock:
+            self._conn.close()
+
+    def _set_state(self, email_ids: List[str], state: str):
+        with self._lock, self._conn:
+            self._conn.executemany(
+                'UPDATE messages SET state = ?, updated_at = ? WHERE email_id = ?',
+                [(state, time.time(), email_id) for email_id in email_ids]
+            )
+
+    def _write(self, sql: str, params: tuple):
+        with self._lock, self._conn:
+            self._conn.execute(sql, params)
+
+    @staticmethod
+    def _details(email: Dict[str, str]) -> Dict[str, str]:
+        return {k: email.get(k, '') for k in ('id', 'subject', 'sender', 'to')}
+
+    @staticmethod
+    def _to_entry(row: sqlite3.Row) -> Dict:
+        return {
+            'email_id': row['email_id'],
+            'state': row['state'],
+            'email': json.loads(row['email']) if row['email'] else None,
+            'classification': row['classification'],
+            'reasoning': row['reasoning'],
+        }
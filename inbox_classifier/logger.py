@@ -1,16 +1,45 @@
+import atexit
+import gzip
 import json
+import os
+import re
+import shutil
+import threading
+import time
 from pathlib import Path
-from datetime import datetime
-from typing import Union
+from datetime import datetime, date
+from typing import Dict, Iterator, List, Union
+
+# Segments being compressed, shared by every logger in the process: a new
+# logger is opened each cycle, and compression outlives the one that started it
+_compressors: Dict[Path, threading.Thread] = {}
+_compressors_lock = threading.Lock()
+
 
 class ClassificationLogger:
-    """Logger for email classifications."""
+    """Buffered, rotating logger for email classifications.
+
+    Entries are buffered in memory and appended to the active JSONL file in
+    batches (group commit). When the UTC day changes, the active file is
+    renamed to a date-stamped segment (e.g. classifications-2026-02-13.jsonl)
+    and gzip-compressed on a background thread, which close() doesn't wait
+    for (see wait_for_compression).
+    """
 
-    def __init__(self, log_path: Union[str, Path] = None):
+    def __init__(
+        self,
+        log_path: Union[str, Path] = None,
+        max_buffered: int = 100,
+        flush_interval: float = 5.0,
+        fsync: bool = False
+    ):
         """Initialize logger.
 
         Args:
             log_path: Path to JSONL log file. Defaults to ~/.inbox-classifier/classifications.jsonl
+            max_buffered: Flush once this many entries are buffered
+            flush_interval: Flush once the oldest buffered entry is this many seconds old
+            fsync: fsync the file after every flush
         """
         if log_path is None:
             log_path = Path.home() / '.inbox-classifier' / 'classifications.jsonl'
@@ -18,6 +47,20 @@ class ClassificationLogger:
         self.log_path = Path(log_path)
         self.log_path.parent.mkdir(parents=True, exist_ok=True)
 
+        self.max_buffered = max_buffered
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+
+        self._buffer: List[str] = []
+        self._buffer_started = 0.0
+        self._file = None
+        self._file_date: date | None = None
+        self._lock = threading.Lock()
+
+        # Compress segments left behind by a previous run that exited mid-rotation
+        for segment in self.log_path.parent.glob(f'{self.log_path.stem}-*{self.log_path.suffix}'):
+            self._compress_in_background(segment)
+
     def log_classification(
         self,
         email_id: str,
@@ -25,7 +68,11 @@ class ClassificationLogger:
         sender: str,
         to: str,
         classification: str,
-        reasoning: str
+        reasoning: str,
+        model: str = None,
+        usage: Dict[str, int] = None,
+        cost: float = None,
+        latency: float = None
     ):
         """Log a classification decision.
 
@@ -36,6 +83,10 @@ class ClassificationLogger:
             to: Email recipient
             classification: IMPORTANT or OPTIONAL
             reasoning: Classification reasoning from AI
+            model: Model (cascade tier) that decided, if known
+            usage: Token counts (input, output, cache read/write) of every call made for it
+            cost: Estimated cost of those calls in US dollars
+            latency: Seconds spent waiting on the API
         """
         entry = {
             'timestamp': datetime.utcnow().isoformat(),
@@ -46,6 +97,165 @@ class ClassificationLogger:
             'classification': classification,
             'reasoning': reasoning
         }
+        if model:
+            entry['model'] = model
+        if usage is not None:
+            entry.update(usage=usage, cost=cost, latency=latency)
+
+        with self._lock:
+            if not self._buffer:
+                self._buffer_started = time.monotonic()
+            self._buffer.append(json.dumps(entry) + '\n')
+
+            if (len(self._buffer) >= self.max_buffered
+                    or time.monotonic() - self._buffer_started >= self.flush_interval):
+                self._flush_locked()
+
+    def flush(self):
+        """Write all buffered entries to disk."""
+        with self._lock:
+            self._flush_locked()
+
+    def close(self):
+        """Flush buffered entries and close the log file.
+
+        Segment compression carries on in the background.
+        """
+        with self._lock:
+            self._flush_locked()
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def _flush_locked(self):
+        if not self._buffer:
+            return
+
+        self._rotate_if_needed()
+        if self._file is None:
+            self._file = open(self.log_path, 'a')
+
+        self._file.write(''.join(self._buffer))
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+        self._buffer = []
+
+    def _rotate_if_needed(self):
+        """Move the active file to a date-stamped segment when the UTC day changes."""
+        today = datetime.utcnow().date()
+
+        if self._file_date is None:
+            if self.log_path.exists() and self.log_path.stat().st_size > 0:
+                self._file_date = datetime.utcfromtimestamp(self.log_path.stat().st_mtime).date()
+            else:
+                self._file_date = today
+
+        if self._file_date == today:
+            return
+
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+        if self.log_path.exists():
+            segment = self._segment_path(self._file_date)
+            self.log_path.rename(segment)
+            self._compress_in_background(segment)
+
+        self._file_date = today
+
+    def _segment_path(self, segment_date: date) -> Path:
+        base = f'{self.log_path.stem}-{segment_date.isoformat()}'
+        segment = self.log_path.with_name(base + self.log_path.suffix)
+        n = 1
+        while segment.exists() or segment.with_name(segment.name + '.gz').exists():
+            segment = self.log_path.with_name(f'{base}.{n}{self.log_path.suffix}')
+            n += 1
+        return segment
+
+    def _compress_in_background(self, segment: Path):
+        with _compressors_lock:
+            for path, thread in list(_compressors.items()):
+                if not thread.is_alive():
+                    del _compressors[path]
+            if segment in _compressors:
+                return
+            thread = threading.Thread(target=_compress_quietly, args=(segment,), daemon=True)
+            _compressors[segment] = thread
+            thread.start()
+
+
+def _compress_quietly(segment: Path):
+    try:
+        compress_segment(segment)
+    except FileNotFoundError:
+        # Finished by an earlier logger's thread after this one listed it
+        pass
+
+
+@atexit.register
+def wait_for_compression(timeout: float = None):
+    """Wait for segments still being compressed, e.g. at shutdown.
+
+    Runs at interpreter exit; a compression cut short anyway (a crash or a
+    kill) leaves the uncompressed segment, which the next logger compresses.
+    """
+    with _compressors_lock:
+        threads = list(_compressors.values())
+    for thread in threads:
+        thread.join(timeout)
+    with _compressors_lock:
+        for segment, thread in list(_compressors.items()):
+            if not thread.is_alive():
+                del _compressors[segment]
+
+
+def compress_segment(segment: Path) -> Path:
+    """Gzip a rotated log segment and remove the uncompressed file.
+
+    Writes to a temporary file first so an interrupted compression never
+    leaves a truncated .gz behind.
+    """
+    target = segment.with_name(segment.name + '.gz')
+    tmp = segment.with_name(segment.name + '.gz.tmp')
+
+    with open(segment, 'rb') as src, gzip.open(tmp, 'wb') as dst:
+        shutil.copyfileobj(src, dst)
+    os.replace(tmp, target)
+    segment.unlink()
+
+    return target
+
+
+def log_segments(log_path: Union[str, Path]) -> List[Path]:
+    """List a classification log's files, oldest first.
+
+    Includes rotated segments (compressed or not) followed by the active file.
+    """
+    log_path = Path(log_path)
+    pattern = re.compile(
+        re.escape(log_path.stem) + r'-(\d{4}-\d{2}-\d{2})(?:\.(\d+))?' + re.escape(log_path.suffix) + r'(\.gz)?$'
+    )
+
+    segments = []
+    for path in log_path.parent.glob(f'{log_path.stem}-*'):
+        match = pattern.match(path.name)
+        if match:
+            segments.append(((match.group(1), int(match.group(2) or 0)), path))
+
+    paths = [path for _, path in sorted(segments)]
+    if log_path.exists():
+        paths.append(log_path)
+    return paths
+
 
-        with open(self.log_path, 'a') as f:
-            f.write(json.dumps(entry) + '\n')
+def iter_log_entries(log_path: Union[str, Path]) -> Iterator[Dict]:
+    """Yield every entry of a classification log across all segments, oldest first."""
+    for path in log_segments(log_path):
+        opener = gzip.open if path.suffix == '.gz' else open
+        with opener(path, 'rt') as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
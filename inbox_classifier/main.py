@@ -1,22 +1,43 @@
 import os
 import time
 import logging
+import threading
 from pathlib import Path
+from collections import Counter
+from itertools import zip_longest
+from typing import Dict, Iterator, List, Set, Tuple
 from dotenv import load_dotenv
 
 from .gmail_auth import get_gmail_service, AuthenticationError
-from .gmail_labels import ensure_labels_exist, get_label_names
+from .gmail_labels import ensure_labels_exist, get_label_names, get_label_id, create_label
 from .email_fetcher import fetch_unread_emails, get_email_details
-from .ai_classifier import classify_email, parse_categories
+from .ai_classifier import (
+    classify_email, parse_categories, build_request, parse_response, cascade_models, resolve_reasoning
+)
 from .rules_loader import load_rules
 from .skip_rules import parse_skip_rules, should_skip_email
-from .email_labeler import apply_label
+from .email_labeler import apply_label, apply_label_batch, quarantine_message
 from .logger import ClassificationLogger
+from .classification_store import SQLiteClassificationLogger
+from .ledger import ProcessedLedger, CLASSIFIED, BATCHED, FETCHED
+from .gmail_client import execute
+from .gmail_quota import service_scheduler
+from .pipeline import Pipeline
+from .accounts import Account, load_accounts
+from .batches import get_batch_client
+from .leases import ShardManager, shard_manager_from_env
+from .retry import Backoff
+from .polling import PollScheduler
+from .metrics import counter, histogram, serve, write_textfile
+from .costs import TOKEN_FIELDS, call_cost, call_usage, summarize
+from .budget import BudgetExceeded, budget_policy, get_governor
+from .profiling import CycleProfiler
 
 # Configure logging to both stdout and file
 LOG_DIR = Path.home() / '.inbox-classifier'
 LOG_FILE = LOG_DIR / 'service.log'
 TOKEN_PATH = LOG_DIR / 'token.json'
+QUARANTINE_LABEL = os.environ.get('QUARANTINE_LABEL', 'Quarantine')
 
 LOG_DIR.mkdir(parents=True, exist_ok=True)
 
@@ -30,6 +51,33 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Per-stage timing: label_sync, list, get, skip, classify, modify, log
+STAGE_SECONDS = histogram('inbox_classifier_stage_seconds', 'Time spent per pipeline stage, per call')
+ERRORS = counter('inbox_classifier_errors_total', 'Failed messages and account cycles, by stage')
+SKIPPED = counter('inbox_classifier_skipped_total', 'Messages left in the inbox by a skip rule')
+CACHE_HITS = counter('inbox_classifier_cache_hits_total',
+                     'Lookups answered locally: label IDs from the label cache, verdicts from the ledger')
+TOKENS = counter('inbox_classifier_tokens_total', 'Claude tokens used, by model and type')
+SPEND = counter('inbox_classifier_spend_dollars_total', 'Estimated Claude spend in US dollars, by model')
+OVER_BUDGET = counter('inbox_classifier_over_budget_total',
+                      'Emails the Claude budget could not cover, by policy applied')
+# A sender's mail must have this many verdicts, this consistent, for BUDGET_POLICY=rules
+LOCAL_MIN_VERDICTS = 3
+LOCAL_MIN_SHARE = 0.9
+# Pipeline stage names, as used for timing and errors
+STAGE_NAMES = {'details': 'get', 'label': 'modify'}
+
+_profiler: CycleProfiler | None = None
+
+
+def get_profiler() -> CycleProfiler:
+    """Return the service's cycle profiler (PROFILE_* settings), writing to LOG_DIR/profiles."""
+    global _profiler
+    if _profiler is None:
+        _profiler = CycleProfiler.from_env(LOG_DIR / 'profiles')
+    return _profiler
+
+
 def wait_for_new_token():
     """Wait for token.json to be updated (e.g., scp'd from Mac), then return to retry auth."""
     logger.critical(
@@ -54,105 +102,609 @@ def wait_for_new_token():
             return
 
 
-def process_emails():
-    """Process unread emails: fetch, classify, label."""
+def process_emails(accounts: List[Account] = None) -> Set[Tuple[str, str]]:
+    """Process unread emails for every account: fetch, classify, label.
+
+    All accounts share one pipeline (and so one set of Gmail and Claude
+    workers); their messages are interleaved so no account starves another.
+
+    Returns:
+        (account name, message ID) of every unread message found
+    """
     load_dotenv()
     api_key = os.getenv('ANTHROPIC_API_KEY')
 
     if not api_key:
         raise ValueError("ANTHROPIC_API_KEY not found in environment")
 
+    if accounts is None:
+        accounts = [Account('default', LOG_DIR)]
+
+    cycles = []
+    try:
+        for account in accounts:
+            try:
+                cycles.append(start_cycle(account, api_key))
+            except Exception as e:
+                # One broken account must not stop the others
+                ERRORS.inc(stage='cycle')
+                if len(accounts) == 1:
+                    raise
+                logger.error(f"[{account.name}] Skipping this cycle: {e}")
+
+        seen = {(cycle.account.name, m['id']) for cycle in cycles for m in cycle.messages}
+        if not seen:
+            logger.info("No new emails to process")
+            return seen
+
+        logger.info(f"Processing {len(seen)} unread emails")
+        run_pipeline(cycles)
+        return seen
+    finally:
+        for cycle in cycles:
+            cycle.finish()
+
+
+def start_cycle(account: Account, api_key: str) -> 'Cycle':
+    """Load an account's rules, labels and unread messages for this cycle."""
     # Parse categories and skip rules
-    rules = load_rules()
+    rules = load_rules(account.rules_path)
     categories = parse_categories(rules)
     skip_rules = parse_skip_rules(rules)
 
     # Initialize components
-    service = get_gmail_service()
-    label_ids = ensure_labels_exist(service, categories)
-    classification_logger = ClassificationLogger()
+    service = get_gmail_service(account.token_path)
+    label_ids = account.cached_label_ids(categories)
+    if label_ids is None:
+        with STAGE_SECONDS.time(stage='label_sync'):
+            label_ids = ensure_labels_exist(service, categories)
+        account.cache_label_ids(categories, label_ids)
+    else:
+        CACHE_HITS.inc(cache='labels')
+
+    ledger = ProcessedLedger(account.ledger_path)
+    try:
+        ledger.prune()
+        classification_logger = open_classification_logger(account)
+    except Exception:
+        ledger.close()
+        raise
+    cycle = Cycle(
+        account, service, label_ids, skip_rules, api_key, rules,
+        classification_logger, ledger, []
+    )
+    try:
+        # Finish messages a previous run labeled but crashed before logging
+        for entry in ledger.pending_logs():
+            _log_classification(cycle.classification_logger, entry['email'], entry)
+            cycle.logged_ids.append(entry['email_id'])
+
+        # Label finished batches first, so the unread list below doesn't
+        # include (and reclassify) the messages they archive
+        cycle.collect_batches()
+
+        # Fetch unread emails (exclude already classified)
+        exclude_labels = get_label_names(categories)
+        with STAGE_SECONDS.time(stage='list'):
+            # Backing off or quarantined: leave them out before anything is fetched
+            cycle.messages = fetch_unread_emails(service, exclude_labels=exclude_labels,
+                                                 exclude_ids=ledger.held_back())
+        cycle.count('gmail_list')
+
+        # Backlog mode: classify a large backlog through the Message Batches API
+        threshold = _env_int('BATCH_THRESHOLD', 200)
+        backlog = cycle.backlog_size() if threshold else 0
+        if threshold and backlog >= threshold:
+            logger.info(f"[{account.name}] Backlog of {backlog} emails: classifying via Message Batches")
+            cycle.batch = []
+    except Exception:
+        # process_emails only finishes the cycles it got back
+        cycle.finish()
+        raise
+    return cycle
+
+
+def open_classification_logger(account: Account):
+    """Open the classification log backend selected by CLASSIFICATION_STORE.
+
+    'jsonl' (default) appends to classifications.jsonl; 'sqlite' writes to an
+    indexed classifications.db, importing the existing JSONL history once.
+    """
+    if os.environ.get('CLASSIFICATION_STORE', 'jsonl').lower() == 'sqlite':
+        store = SQLiteClassificationLogger(account.db_path)
+        imported = store.import_jsonl(account.log_path)
+        if imported:
+            logger.info(f"Imported {imported} entries from classifications.jsonl into SQLite")
+        return store
+    return ClassificationLogger(account.log_path)
+
+
+def _log_classification(classification_logger, email: Dict, result: Dict):
+    # Record which cascade tier decided, when known (not for resumed entries)
+    extra = {'model': result['model']} if result.get('model') else {}
+    if result.get('api_calls'):
+        # Tokens and cost of every tier asked; not known for resumed entries either
+        usage = summarize(result['api_calls'])
+        extra.update(cost=usage.pop('cost'), usage=usage, latency=result.get('latency'))
+        for call in result['api_calls']:
+            for field in TOKEN_FIELDS:
+                if call[field]:
+                    TOKENS.inc(call[field], model=call['model'], type=field)
+            SPEND.inc(call_cost(call), model=call['model'])
+    classification_logger.log_classification(
+        email_id=email['id'],
+        subject=email['subject'],
+        sender=email['sender'],
+        to=email['to'],
+        classification=result['classification'],
+        reasoning=result['reasoning'],
+        **extra
+    )
+
+
+def _env_int(name: str, default: int) -> int:
+    return int(os.environ.get(name, default))
+
+
+def _interleave(cycles: List['Cycle']) -> Iterator[Dict]:
+    """Yield work items round-robin across accounts."""
+    for batch in zip_longest(*(cycle.messages for cycle in cycles)):
+        for cycle, msg in zip(cycles, batch):
+            if msg is not None:
+                yield {'cycle': cycle, 'id': msg['id'], 'email': None, 'result': None}
+
+
+def _label_items(items: List[Dict]) -> List[Dict]:
+    by_cycle = {}
+    for item in items:
+        by_cycle.setdefault(item['cycle'], []).append(item)
+    return [labeled for cycle, group in by_cycle.items() for labeled in cycle.label(group)]
+
+
+def run_pipeline(cycles: List['Cycle']) -> Dict:
+    """Run every account's messages through one staged pipeline.
+
+    details -> skip rules -> classify -> label -> log, each stage with its own
+    workers (PIPELINE_*_WORKERS) and a bounded input queue
+    (PIPELINE_QUEUE_SIZE), so Gmail and Claude I/O overlap.
+    """
+    queue_size = _env_int('PIPELINE_QUEUE_SIZE', 10)
+    # Stage functions pass through unchanged unless profiling is on
+    profiled = get_profiler().stage
+
+    pipeline = Pipeline(on_error=lambda stage, item, e: item['cycle'].on_error(stage, item, e))
+    pipeline.add_stage('details', profiled('details', lambda item: item['cycle'].fetch_details(item)),
+                       workers=_env_int('PIPELINE_DETAIL_WORKERS', 1), queue_size=queue_size)
+    pipeline.add_stage('skip', profiled('skip', lambda item: item['cycle'].apply_skip_rules(item)),
+                       queue_size=queue_size)
+    pipeline.add_stage('classify', profiled('classify', lambda item: item['cycle'].classify(item)),
+                       workers=_env_int('PIPELINE_CLASSIFY_WORKERS', 1), queue_size=queue_size)
+    pipeline.add_stage('label', profiled('label', _label_items, batch=True),
+                       batch_size=_env_int('PIPELINE_LABEL_BATCH', 50), queue_size=queue_size)
+    pipeline.add_stage('log', profiled('log', lambda item: item['cycle'].log(item), last=True),
+                       queue_size=queue_size)
+
+    stats = pipeline.run(_interleave(cycles))
+    for cycle in cycles:
+        cycle.submit_batch()
+    logger.info("Pipeline: " + ", ".join(
+        f"{name} {s['processed']} in {s['busy_seconds']:.1f}s ({s['throughput']:.1f}/s)"
+        for name, s in stats.items()
+    ))
+    for cycle in cycles:
+        usage = ', '.join(f"{k} {v}" for k, v in sorted(cycle.usage.items()))
+        logger.info(f"[{cycle.account.name}] Usage: {usage or 'none'}")
+        quota = service_scheduler(cycle.service).usage()
+        logger.info(
+            f"[{cycle.account.name}] Gmail quota: {quota['units']} units, "
+            f"{quota['units_per_second']:.0f}/{quota['limit']:.0f} units/s, "
+            f"waited {quota['waited_seconds']:.1f}s"
+        )
+    governor = get_governor()
+    if governor is not None:
+        budget = governor.usage()
+        logger.info("Claude budget: " + ", ".join(
+            f"{name} {spent:.0f}/{limit:.0f}" for name, (spent, limit) in budget['budgets'].items()
+        ) + f", paced {budget['waited_seconds']:.1f}s")
+    return stats
+
+
+class Cycle:
+    """One account's share of a polling cycle: its service, rules, ledger and log.
+
+    Provides the stage functions for work items (dicts with keys: cycle, id,
+    email, result) and counts the account's API usage.
+    """
+
+    def __init__(self, account, service, label_ids, skip_rules, api_key, rules,
+                 classification_logger, ledger, messages):
+        self.account = account
+        self.service = service
+        self.label_ids = label_ids
+        self.skip_rules = skip_rules
+        self.api_key = api_key
+        self.rules = rules
+        self.classification_logger = classification_logger
+        self.ledger = ledger
+        self.messages = messages
+        self.logged_ids = []
+        # Updated from every pipeline worker: go through count()
+        self.usage = Counter()
+        self._usage_lock = threading.Lock()
+
+        # In backlog mode, emails to submit as one Message Batch
+        self.batch: List[Dict] | None = None
+        self.batch_client = None
+
+        # Hourly/daily Claude budgets, shared by every account (None: unlimited)
+        self.governor = get_governor()
+
+    def count(self, name: str, amount: int = 1):
+        """Add to this cycle's usage counts (safe from any pipeline worker)."""
+        with self._usage_lock:
+            self.usage[name] += amount
+
+    def fetch_details(self, item: Dict) -> Dict | None:
+        """Download a message, or resume it from a verdict recorded before a crash."""
+        # Backing off or quarantined: don't even fetch the details
+        if not self.ledger.should_attempt(item['id']):
+            return None
 
-    # Fetch unread emails (exclude already classified)
-    exclude_labels = get_label_names(categories)
-    messages = fetch_unread_emails(service, exclude_labels=exclude_labels)
+        entry = self.ledger.get(item['id'])
+        if (entry and entry['state'] == CLASSIFIED
+                and entry['classification'] in self.label_ids):
+            # Verdict survived a crash before labeling: don't pay for it twice
+            logger.info(f"Resuming '{entry['email']['subject'][:50]}' from ledger")
+            CACHE_HITS.inc(cache='ledger')
+            item.update(email=entry['email'], result=entry)
+            return item
+        if entry and entry['state'] == BATCHED:
+            # Waiting on a Message Batch: collect_batches will label it
+            return None
+        if self.governor is not None and self.governor.blocked() and budget_policy() == 'defer':
+            # It could only be deferred after download: save the Gmail call
+            return None
 
-    if not messages:
-        logger.info("No new emails to process")
-        return
+        self.count('gmail_get')
+        with STAGE_SECONDS.time(stage='get'):
+            email = get_email_details(self.service, item['id'])
+        self.ledger.mark_fetched(email['id'])
+        item['email'] = email
+        return item
 
-    logger.info(f"Processing {len(messages)} unread emails")
+    def apply_skip_rules(self, item: Dict) -> Dict | None:
+        """Leave skip-rule matches in the inbox, marked read so we don't reprocess them."""
+        email = item['email']
+        if item['result'] is not None:
+            return item
+        with STAGE_SECONDS.time(stage='skip'):
+            skip = should_skip_email(email, self.skip_rules)
+        if not skip:
+            return item
 
-    # Process each email
-    for msg in messages:
+        self.mark_read(email['id'])
+        SKIPPED.inc()
+        self.ledger.clear_failures(email['id'])
+        logger.info(
+            f"Skipped '{email['subject'][:50]}' "
+            f"from {email['sender'][:30]} (matches skip rule)"
+        )
+        return None
+
+    def classify(self, item: Dict) -> Dict | None:
+        """Classify with AI and record the verdict before anything else happens."""
+        if item['result'] is not None:
+            return item
+
+        email = item['email']
+        if self.batch is not None:
+            self.batch.append(email)
+            return None
+
+        self.count('classify')
         try:
-            # Get email details
-            email = get_email_details(service, msg['id'])
-
-            # Skip if matches skip rules (leave in inbox, mark read so we don't reprocess)
-            if should_skip_email(email, skip_rules):
-                service.users().messages().modify(
-                    userId='me',
-                    id=email['id'],
-                    body={'removeLabelIds': ['UNREAD']}
-                ).execute()
-                logger.info(
-                    f"Skipped '{email['subject'][:50]}' "
-                    f"from {email['sender'][:30]} (matches skip rule)"
-                )
+            with STAGE_SECONDS.time(stage='classify'):
+                result = classify_email(email, self.api_key, rules=self.rules, governor=self.governor)
+        except BudgetExceeded as e:
+            return self.over_budget(item, e)
+
+        if result is None:
+            logger.warning(
+                f"Could not classify '{email['subject'][:50]}' "
+                f"from {email['sender'][:30]} — leaving in inbox"
+            )
+            self.record_failure(email['id'], 'unrecognized classification response')
+            return None
+
+        if result.get('model'):
+            self.count(f"decided_by {result['model']}")
+        self.ledger.mark_classified(email, result)
+        item['result'] = result
+        return item
+
+    def mark_read(self, email_id: str):
+        """Mark a message read, leaving it in the inbox, so it isn't listed again."""
+        self.count('gmail_modify')
+        with STAGE_SECONDS.time(stage='modify'):
+            execute(self.service.users().messages().modify(
+                userId='me',
+                id=email_id,
+                body={'removeLabelIds': ['UNREAD']}
+            ))
+
+    def over_budget(self, item: Dict, error: BudgetExceeded) -> Dict | None:
+        """Apply BUDGET_POLICY to an email the Claude budget can't cover now.
+
+        Not a failure: nothing is backed off or quarantined.
+        """
+        email, policy = item['email'], budget_policy()
+        if policy == 'rules':
+            history = self.ledger.sender_history(email['sender'])
+            category, count = max(history.items(), key=lambda entry: entry[1], default=(None, 0))
+            total = sum(history.values())
+            if (category in self.label_ids and count >= LOCAL_MIN_VERDICTS
+                    and count >= total * LOCAL_MIN_SHARE):
+                OVER_BUDGET.inc(policy='rules')
+                result = {
+                    'classification': category, 'confidence': None, 'model': 'local',
+                    'reasoning': f"sender's usual category ({count} of {total} recent emails); over budget",
+                }
+                self.ledger.mark_classified(email, result)
+                item['result'] = result
+                return item
+            policy = 'defer'
+
+        OVER_BUDGET.inc(policy=policy)
+        if policy == 'inbox':
+            self.mark_read(email['id'])
+            self.ledger.clear_failures(email['id'])
+            logger.info(f"Left '{email['subject'][:50]}' in the inbox: {error}")
+        else:
+            self.count('deferred')
+            logger.info(f"Deferred '{email['subject'][:50]}': {error}")
+        return None
+
+    def label(self, items: List[Dict]) -> List[Dict]:
+        """Apply labels, one batchModify call per label for whatever is queued."""
+        by_label = {}
+        for item in items:
+            by_label.setdefault(self.label_ids[item['result']['classification']], []).append(item)
+
+        labeled = []
+        for label_id, group in by_label.items():
+            try:
+                with STAGE_SECONDS.time(stage='modify'):
+                    if len(group) == 1:
+                        self.count('gmail_modify')
+                        apply_label(self.service, group[0]['id'], label_id)
+                    else:
+                        self.count('gmail_batch_modify')
+                        apply_label_batch(self.service, [item['id'] for item in group], label_id)
+            except Exception as e:
+                # The label may have been deleted in Gmail: look it up again next cycle
+                self.account.clear_label_cache()
+                for item in group:
+                    self.on_error('label', item, e)
                 continue
 
-            # Classify with AI
-            result = classify_email(email, api_key)
+            for item in group:
+                self.ledger.mark_labeled(item['id'])
+                self.ledger.clear_failures(item['id'])
+            labeled.extend(group)
+
+        return labeled
+
+    def backlog_size(self) -> int:
+        """Count listed messages that still need classifying."""
+        count = 0
+        for message in self.messages:
+            entry = self.ledger.get(message['id'])
+            if (entry is None or entry['state'] == FETCHED) and self.ledger.should_attempt(message['id']):
+                count += 1
+        return count
+
+    def get_batch_client(self):
+        if self.batch_client is None:
+            self.batch_client = get_batch_client(self.api_key)
+        return self.batch_client
+
+    def submit_batch(self):
+        """Submit the emails gathered in backlog mode as one Message Batch."""
+        emails, self.batch = self.batch, None
+        if not emails:
+            return
+
+        # Batches are already cheap, so they go straight to the final tier
+        model = cascade_models()[-1]
+        requests = []
+        for email in emails:
+            params = build_request(email, self.rules, model)
+            if self.governor is not None:
+                # Charged at the estimate, against the window limits only:
+                # a batch isn't worth pacing. What doesn't fit waits in the ledger
+                try:
+                    self.governor.acquire(self.governor.estimate(params), pace=False)
+                except BudgetExceeded as e:
+                    logger.info(f"[{self.account.name}] Batch cut to {len(requests)} of {len(emails)} emails: {e}")
+                    emails = emails[:len(requests)]
+                    break
+            requests.append({'custom_id': email['id'], 'params': params})
+        if not requests:
+            return
+        try:
+            batch_id = self.get_batch_client().create(requests)
+        except Exception as e:
+            # Still 'fetched' in the ledger: picked up again next cycle
+            logger.error(f"[{self.account.name}] Could not submit batch of {len(emails)} emails: {e}")
+            return
+
+        self.ledger.mark_batched(emails, batch_id)
+        self.count('batch_submitted', len(emails))
+        logger.info(f"[{self.account.name}] Submitted {len(emails)} emails as batch {batch_id}")
 
-            if result is None:
-                logger.warning(
-                    f"Could not classify '{email['subject'][:50]}' "
-                    f"from {email['sender'][:30]} — leaving in inbox"
-                )
+    def collect_batches(self):
+        """Label and log the results of every finished Message Batch.
+
+        Emails whose result is missing or unusable go back to real-time
+        classification (with the usual failure backoff).
+        """
+        for batch_id in self.ledger.open_batches():
+            try:
+                client = self.get_batch_client()
+                if not client.is_done(batch_id):
+                    continue
+                results = list(client.results(batch_id))
+            except Exception as e:
+                logger.error(f"[{self.account.name}] Could not check batch {batch_id}: {e}")
                 continue
 
-            # Apply the matching label
-            label_id = label_ids[result['classification']]
-            apply_label(service, email['id'], label_id)
-
-            # Log the classification
-            classification_logger.log_classification(
-                email_id=email['id'],
-                subject=email['subject'],
-                sender=email['sender'],
-                to=email['to'],
-                classification=result['classification'],
-                reasoning=result['reasoning']
-            )
+            categories = parse_categories(self.rules)
+            items = []
+            for email_id, text, error, usage in results:
+                entry = self.ledger.get(email_id)
+                if entry is None or entry['state'] != BATCHED:
+                    continue
+                result = parse_response(text, categories) if text else None
+                if result is None or result['classification'] not in self.label_ids:
+                    self.ledger.mark_fetched(email_id)
+                    self.record_failure(email_id, error or 'unrecognized classification response')
+                    continue
+                result['model'] = cascade_models()[-1]
+                result['api_calls'] = [call_usage(result['model'], usage, batch=True)]
+                self.ledger.mark_classified(entry['email'], result)
+                items.append({'cycle': self, 'id': email_id, 'email': entry['email'], 'result': result})
 
-            logger.info(
-                f"Classified '{email['subject'][:50]}...' as "
-                f"{result['classification']}: {result['reasoning']}"
-            )
+            # batchModify accepts at most 1000 IDs per call
+            for start in range(0, len(items), 1000):
+                for item in self.label(items[start:start + 1000]):
+                    self.log(item)
+            self.ledger.finish_batch(batch_id)
+            self.count('batch_collected', len(items))
+            logger.info(f"[{self.account.name}] Batch {batch_id}: labeled {len(items)} emails")
+
+    def log(self, item: Dict):
+        """Buffer the classification log entry, once a streamed reason has arrived."""
+        with STAGE_SECONDS.time(stage='log'):
+            email, result = item['email'], resolve_reasoning(item['result'])
+            _log_classification(self.classification_logger, email, result)
+        self.logged_ids.append(email['id'])
+
+        decided_by = f" [{result['model']}]" if result.get('model') else ''
+        logger.info(
+            f"Classified '{email['subject'][:50]}...' as "
+            f"{result['classification']}{decided_by}: {result['reasoning']}"
+        )
+
+    def on_error(self, stage: str, item: Dict, error: Exception):
+        logger.error(f"Error processing email {item['id']} ({stage}): {error}")
+        ERRORS.inc(stage=STAGE_NAMES.get(stage, stage))
+        self.record_failure(item['id'], str(error))
 
+    def record_failure(self, email_id: str, error: str):
+        """Back off a failing message, quarantining it after too many attempts."""
+        failure = self.ledger.record_failure(email_id, error)
+        if not failure['quarantined']:
+            return
+
+        logger.warning(
+            f"Quarantining email {email_id} after {failure['attempts']} failed attempts "
+            f"(label '{QUARANTINE_LABEL}'): {error}"
+        )
+        try:
+            label_id = get_label_id(self.service, QUARANTINE_LABEL) or create_label(self.service, QUARANTINE_LABEL)
+            quarantine_message(self.service, email_id, label_id)
+            self.ledger.mark_quarantine_labeled(email_id)
         except Exception as e:
-            logger.error(f"Error processing email {msg['id']}: {e}")
-            continue
+            # The ledger still holds it in local quarantine, so it won't be retried
+            logger.error(f"Could not apply quarantine label to {email_id}: {e}")
+
+    def finish(self):
+        """Flush the log, then mark its entries logged and close the ledger."""
+        try:
+            # Group commit: everything buffered this cycle hits disk once,
+            # and only then are the messages marked logged in the ledger
+            self.classification_logger.close()
+            self.ledger.mark_logged(self.logged_ids)
+        finally:
+            self.ledger.close()
 
-def write_heartbeat():
-    """Write a heartbeat timestamp so external monitors can detect staleness."""
+
+def write_heartbeat(shard: ShardManager = None, interval: float = 0):
+    """Write a heartbeat timestamp so external monitors can detect staleness.
+
+    In sharded mode the heartbeat also keeps this worker's leases alive:
+    leases are renewed through the `interval` seconds until the next cycle,
+    and only while cycles keep completing.
+    """
     heartbeat_path = LOG_DIR / 'heartbeat'
     heartbeat_path.write_text(str(int(time.time())))
+    if shard is not None:
+        shard.beat(interval)
+
+
+def write_metrics():
+    """Export metrics for node_exporter's textfile collector."""
+    try:
+        write_textfile(LOG_DIR / 'metrics.prom')
+    except OSError as e:
+        logger.warning(f"Could not write metrics: {e}")
+
+
+def start_metrics_server():
+    """Serve /metrics over HTTP if METRICS_PORT is set."""
+    port = os.environ.get('METRICS_PORT')
+    if not port:
+        return None
+    host = os.environ.get('METRICS_HOST', '127.0.0.1')
+    try:
+        server = serve(int(port), host)
+    except OSError as e:
+        logger.warning(f"Could not serve metrics on {host}:{port}: {e}")
+        return None
+    logger.info(f"Serving metrics at http://{host}:{port}/metrics")
+    return server
 
 
 def main():
     """Main service loop."""
     logger.info("Starting inbox classifier service")
+    accounts = load_accounts(LOG_DIR)
+    if len(accounts) > 1:
+        logger.info(f"Serving {len(accounts)} accounts: {', '.join(a.name for a in accounts)}")
+
+    # Individual API calls retry transient errors themselves; this only
+    # spaces out cycles that fail as a whole (e.g. Gmail down for minutes)
+    cycle_backoff = Backoff(base=10, cap=300)
+    poller = PollScheduler.from_env()
+    start_metrics_server()
+    profiler = get_profiler()
+    if profiler.install_signal_handler():
+        logger.info(f"Send SIGUSR1 (kill -USR1 {os.getpid()}) to profile the next cycle")
+
+    shard = shard_manager_from_env(accounts)
+    if shard is not None:
+        logger.info(f"Sharding accounts via leases as worker {shard.worker_id}")
+        shard.start()
 
     while True:
         try:
-            process_emails()
-            write_heartbeat()
-            logger.info("Waiting 60 seconds before next check...")
-            time.sleep(60)
+            # Between cycles is the only safe time to give up or take accounts
+            active = shard.rebalance() if shard is not None else accounts
+            with profiler.profile_cycle():
+                seen = process_emails(active)
+            cycle_backoff.reset()
+
+            poller.record_cycle(seen)
+            interval = poller.next_interval()
+            write_heartbeat(shard, interval)
+            write_metrics()
+            logger.info(f"Waiting {interval:.0f} seconds before next check...")
+            time.sleep(interval)
 
         except KeyboardInterrupt:
             logger.info("Service stopped by user")
+            if shard is not None:
+                shard.stop()
             break
 
         except AuthenticationError as e:
@@ -160,9 +712,10 @@ def main():
             wait_for_new_token()
 
         except Exception as e:
+            delay = cycle_backoff.next()
             logger.error(f"Error in main loop: {e}")
-            logger.info("Retrying in 5 minutes...")
-            time.sleep(300)
+            logger.info(f"Retrying in {delay:.0f} seconds...")
+            time.sleep(delay)
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,226 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List, Tuple, Union
+
+# Seconds; spans from a cached lookup up to a slow, retried API call
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+class Gauge:
+    """A value that can go up and down, optionally split by labels."""
+
+    def __init__(self, name: str, help: str):
+        self.name = name
+        self.help = help
+        self._values: Dict[Tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[_key(labels)] = value
+
+    def get(self, **labels) -> float | None:
+        with self._lock:
+            return self._values.get(_key(labels))
+
+    def render(self) -> str:
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} gauge']
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f'{self.name}{_format_labels(labels)} {value:g}')
+        return '\n'.join(lines)
+
+
+class Counter:
+    """A value that only goes up (events, calls, errors), optionally split by labels."""
+
+    def __init__(self, name: str, help: str):
+        self.name = name
+        self.help = help
+        self._values: Dict[Tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        key = _key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def get(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(_key(labels), 0)
+
+    def render(self) -> str:
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} counter']
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f'{self.name}{_format_labels(labels)} {value:g}')
+        return '\n'.join(lines)
+
+
+class Histogram:
+    """Distribution of observed values (e.g. durations) in cumulative buckets."""
+
+    def __init__(self, name: str, help: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [per-bucket counts (last is +Inf), sum, count]
+        self._values: Dict[Tuple, List] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = _key(labels)
+        index = next((i for i, bound in enumerate(self.buckets) if value <= bound), len(self.buckets))
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe how long the block takes, whether or not it raises."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels) -> int:
+        with self._lock:
+            entry = self._values.get(_key(labels))
+            return entry[2] if entry else 0
+
+    def sum(self, **labels) -> float:
+        with self._lock:
+            entry = self._values.get(_key(labels))
+            return entry[1] if entry else 0.0
+
+    def render(self) -> str:
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            for labels, (counts, total, count) in sorted(self._values.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets + ('+Inf',), counts):
+                    cumulative += bucket_count
+                    le = bound if bound == '+Inf' else f'{bound:g}'
+                    lines.append(f'{self.name}_bucket{_format_labels(labels + (("le", le),))} {cumulative}')
+                lines.append(f'{self.name}_sum{_format_labels(labels)} {total:g}')
+                lines.append(f'{self.name}_count{_format_labels(labels)} {count}')
+        return '\n'.join(lines)
+
+
+class Registry:
+    """Process-wide collection of metrics, rendered in Prometheus text format."""
+
+    def __init__(self):
+        self._metrics: Dict[str, Gauge | Counter | Histogram] = {}
+        self._lock = threading.Lock()
+
+    def gauge(self, name: str, help: str) -> Gauge:
+        """Return the gauge with this name, creating it on first use."""
+        return self._get(Gauge, name, help)
+
+    def counter(self, name: str, help: str) -> Counter:
+        """Return the counter with this name, creating it on first use."""
+        return self._get(Counter, name, help)
+
+    def histogram(self, name: str, help: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        """Return the histogram with this name, creating it on first use."""
+        return self._get(Histogram, name, help, buckets)
+
+    def _get(self, cls, name: str, help: str, *args):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, help, *args)
+            elif not isinstance(metric, cls):
+                raise ValueError(f"Metric {name} is already registered as a {type(metric).__name__}")
+            return metric
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda m: m.name)
+        return ''.join(metric.render() + '\n' for metric in metrics)
+
+
+REGISTRY = Registry()
+
+
+def gauge(name: str, help: str) -> Gauge:
+    """Return a gauge from the default registry."""
+    return REGISTRY.gauge(name, help)
+
+
+def counter(name: str, help: str) -> Counter:
+    """Return a counter from the default registry."""
+    return REGISTRY.counter(name, help)
+
+
+def histogram(name: str, help: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+    """Return a histogram from the default registry."""
+    return REGISTRY.histogram(name, help, buckets)
+
+
+# Every Gmail and Anthropic request attempt, counted where it is made
+API_CALLS = counter('inbox_classifier_api_calls_total', 'API requests made, by API and method (retries included)')
+
+
+def write_textfile(path: Union[str, Path], registry: Registry = REGISTRY):
+    """Write every metric to a file for node_exporter's textfile collector.
+
+    Written to a temporary file and renamed, so scrapers never see a
+    partial file.
+    """
+    path = Path(path)
+    tmp_path = path.with_name(path.name + '.tmp')
+    tmp_path.write_text(registry.render())
+    os.replace(tmp_path, path)
+
+
+def serve(port: int, host: str = '127.0.0.1', registry: Registry = REGISTRY) -> ThreadingHTTPServer:
+    """Serve the metrics at http://host:port/metrics from a daemon thread.
+
+    Returns:
+        The running server (call shutdown() to stop it)
+    """
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?')[0] != '/metrics':
+                self.send_error(404)
+                return
+            body = registry.render().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='metrics-http', daemon=True).start()
+    return server
+
+
+def _key(labels: Dict) -> Tuple:
+    # Label values are strings in the exposition format; sorting needs them comparable
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels: Tuple) -> str:
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in labels) + '}'
@@ -0,0 +1,130 @@
+import base64
+import codecs
+import re
+from typing import Dict, Iterator, Tuple
+
+from .html_text import html_to_text
+
+PREVIEW_CHARS = 300
+MAX_DEPTH = 20
+
+# base64 characters decoded per step when streaming HTML (a multiple of 4)
+HTML_CHUNK = 8192
+
+# The widest encodings we expect (UTF-8, UTF-16 with surrogates) use at
+# most 4 bytes per character
+MAX_BYTES_PER_CHAR = 4
+
+CHARSET_PATTERN = re.compile(r'charset\s*=\s*"?([\w.:-]+)"?', re.IGNORECASE)
+
+
+def iter_parts(payload: Dict, depth: int = 0) -> Iterator[Dict]:
+    """Yield every leaf part of a Gmail message payload, depth first.
+
+    Nested multiparts (e.g. multipart/alternative inside multipart/mixed)
+    are walked in order; nesting deeper than MAX_DEPTH is ignored.
+    """
+    parts = payload.get('parts')
+    if not parts:
+        yield payload
+        return
+    if depth >= MAX_DEPTH:
+        return
+    for part in parts:
+        yield from iter_parts(part, depth + 1)
+
+
+def is_attachment(part: Dict) -> bool:
+    """Return True for parts sent as attachments rather than message text."""
+    if part.get('filename'):
+        return True
+    disposition = header(part, 'Content-Disposition')
+    return disposition.lower().startswith('attachment')
+
+
+def header(part: Dict, name: str) -> str:
+    """Return a part's header value (case-insensitive), or ''."""
+    name = name.lower()
+    return next((h['value'] for h in part.get('headers', []) if h['name'].lower() == name), '')
+
+
+def part_charset(part: Dict) -> str:
+    """Return the charset declared in a part's Content-Type, defaulting to UTF-8.
+
+    Unknown charsets, and codecs that aren't text encodings (a sender can
+    declare charset=hex, base64 or rot13), fall back to UTF-8.
+    """
+    match = CHARSET_PATTERN.search(header(part, 'Content-Type'))
+    charset = match.group(1) if match else 'utf-8'
+    try:
+        codec = codecs.lookup(charset)
+        # bytes.decode only takes text encodings; any other codec is a LookupError
+        b'a'.decode(codec.name, 'ignore')
+    except LookupError:
+        return 'utf-8'
+    return codec.name
+
+
+def find_text_part(payload: Dict, mime_types: Tuple[str, ...] = ('text/plain',)) -> Dict | None:
+    """Return the best inline part with a body, preferring earlier mime_types.
+
+    A payload without a mimeType (as in minimal API responses) counts as
+    the first preferred type.
+    """
+    best, best_rank = None, len(mime_types)
+    for part in iter_parts(payload):
+        if 'data' not in part.get('body', {}) or is_attachment(part):
+            continue
+        mime_type = part.get('mimeType', mime_types[0]).lower()
+        if mime_type in mime_types and mime_types.index(mime_type) < best_rank:
+            best, best_rank = part, mime_types.index(mime_type)
+            if best_rank == 0:
+                break
+    return best
+
+
+def decode_prefix(data: str, charset: str = 'utf-8', max_chars: int = PREVIEW_CHARS) -> str:
+    """Decode at most max_chars characters from the start of base64url body data.
+
+    Only the base64 quanta needed for max_chars characters are decoded, so
+    the work is bounded by the preview size rather than the body size.
+    A multi-byte character cut off at the end is dropped.
+    """
+    max_bytes = max_chars * MAX_BYTES_PER_CHAR
+    quanta = -(-max_bytes // 3)
+    chunk = data[:quanta * 4]
+    raw = base64.urlsafe_b64decode(chunk + '=' * (-len(chunk) % 4))
+
+    decoder = codecs.getincrementaldecoder(charset)(errors='ignore')
+    final = len(chunk) == len(data)
+    return decoder.decode(raw, final=final)[:max_chars]
+
+
+def iter_decoded(data: str, charset: str = 'utf-8', chunk_size: int = HTML_CHUNK) -> Iterator[str]:
+    """Decode base64url body data lazily, chunk_size base64 characters at a time."""
+    decoder = codecs.getincrementaldecoder(charset)(errors='ignore')
+    for start in range(0, len(data), chunk_size):
+        chunk = data[start:start + chunk_size]
+        final = start + chunk_size >= len(data)
+        if final:
+            chunk += '=' * (-len(chunk) % 4)
+        yield decoder.decode(base64.urlsafe_b64decode(chunk), final=final)
+
+
+def extract_text(payload: Dict, max_chars: int = PREVIEW_CHARS) -> str:
+    """Return up to max_chars of the message's text, or ''.
+
+    Plain text is preferred; HTML-only messages are converted to their
+    visible text, streaming so parsing stops once max_chars are found.
+    """
+    part = find_text_part(payload, ('text/plain', 'text/html'))
+    if part is None and 'data' in payload.get('body', {}):
+        # Single-part message of another type: use its body as is
+        part = payload
+    if part is None:
+        return ''
+
+    data, charset = part['body']['data'], part_charset(part)
+    if part.get('mimeType', '').lower() == 'text/html':
+        return html_to_text(iter_decoded(data, charset), max_chars)
+    return decode_prefix(data, charset, max_chars)
@@ -0,0 +1,166 @@
+import logging
+import queue
+import threading
+import time
+from typing import Callable, Dict, Iterable, List
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class Stage:
+    """One step of a Pipeline: a pool of worker threads reading a bounded queue."""
+
+    def __init__(self, name: str, func: Callable, workers: int = 1, batch_size: int = 1, queue_size: int = 10):
+        """Initialize stage.
+
+        Args:
+            name: Stage name used in stats and error reports
+            func: Called with one item (or a list of items when batch_size > 1).
+                Returns the item to pass downstream, None to drop it, or for
+                batch stages a list of items.
+            workers: Number of worker threads
+            batch_size: Maximum items handed to func at once; workers take
+                whatever is already queued, up to this many, without waiting
+            queue_size: Capacity of the stage's input queue (backpressure)
+        """
+        self.name = name
+        self.func = func
+        self.workers = workers
+        self.batch_size = batch_size
+        self.queue = queue.Queue(maxsize=queue_size)
+
+        self.processed = 0
+        self.busy_seconds = 0.0
+        self._running = workers
+        self._lock = threading.Lock()
+
+    def stats(self) -> Dict:
+        """Return queue depth, items processed and throughput for this stage."""
+        with self._lock:
+            return {
+                'workers': self.workers,
+                'queue_depth': self.queue.qsize(),
+                'processed': self.processed,
+                'busy_seconds': self.busy_seconds,
+                'throughput': self.processed / self.busy_seconds if self.busy_seconds else 0.0,
+            }
+
+
+class Pipeline:
+    """Staged producer/consumer pipeline connected by bounded queues.
+
+    Each stage runs its own worker threads, so I/O in different stages
+    overlaps: while one message is being classified the next one's details
+    are already downloading. A full queue blocks the stage feeding it.
+    """
+
+    def __init__(self, on_error: Callable[[str, object, Exception], None] = None):
+        """Initialize pipeline.
+
+        Args:
+            on_error: Called with (stage name, item, exception) when a stage
+                raises; the item is dropped and the pipeline keeps going.
+        """
+        self.stages: List[Stage] = []
+        self.on_error = on_error
+
+    def add_stage(self, name: str, func: Callable, workers: int = 1, batch_size: int = 1, queue_size: int = 10):
+        """Append a stage; items flow through stages in the order they were added."""
+        self.stages.append(Stage(name, func, workers, batch_size, queue_size))
+        return self
+
+    def run(self, items: Iterable) -> Dict[str, Dict]:
+        """Push items through every stage and wait until all are done.
+
+        Returns:
+            Per-stage stats, keyed by stage name
+        """
+        threads = []
+        for index, stage in enumerate(self.stages):
+            downstream = self.stages[index + 1] if index + 1 < len(self.stages) else None
+            for n in range(stage.workers):
+                thread = threading.Thread(
+                    target=self._work, args=(stage, downstream),
+                    name=f'pipeline-{stage.name}-{n}', daemon=True
+                )
+                thread.start()
+                threads.append(thread)
+
+        first = self.stages[0]
+        for item in items:
+            first.queue.put(item)
+        for _ in range(first.workers):
+            first.queue.put(_STOP)
+
+        for thread in threads:
+            thread.join()
+
+        return self.stats()
+
+    def stats(self) -> Dict[str, Dict]:
+        """Return live per-stage stats (safe to call while running)."""
+        return {stage.name: stage.stats() for stage in self.stages}
+
+    def _work(self, stage: Stage, downstream: Stage | None):
+        try:
+            while True:
+                item = stage.queue.get()
+                if item is _STOP:
+                    break
+
+                batch = [item]
+                stopped = False
+                while len(batch) < stage.batch_size:
+                    try:
+                        extra = stage.queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if extra is _STOP:
+                        stopped = True
+                        break
+                    batch.append(extra)
+
+                for output in self._call(stage, batch):
+                    if downstream is not None:
+                        downstream.queue.put(output)
+
+                if stopped:
+                    break
+        finally:
+            # The last worker out tells the next stage there is nothing more
+            # coming, even if this one died: otherwise run() never returns
+            with stage._lock:
+                stage._running -= 1
+                last = stage._running == 0
+            if last and downstream is not None:
+                for _ in range(downstream.workers):
+                    downstream.queue.put(_STOP)
+
+    def _call(self, stage: Stage, batch: List) -> List:
+        start = time.monotonic()
+        try:
+            if stage.batch_size > 1:
+                outputs = stage.func(batch)
+            else:
+                outputs = [stage.func(batch[0])]
+        except Exception as e:
+            for item in batch:
+                self._report(stage, item, e)
+            outputs = []
+        finally:
+            with stage._lock:
+                stage.processed += len(batch)
+                stage.busy_seconds += time.monotonic() - start
+
+        return [output for output in outputs if output is not None]
+
+    def _report(self, stage: Stage, item, error: Exception):
+        if not self.on_error:
+            return
+        try:
+            self.on_error(stage.name, item, error)
+        except Exception as e:
+            # A failing error handler must not take the worker down with it
+            logger.exception(f"Error handler failed for {stage.name} ({error}): {e}")
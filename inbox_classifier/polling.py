@@ -0,0 +1,117 @@
+import math
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Iterable, List, Tuple
+
+from .metrics import gauge
+
+INTERVAL_GAUGE = gauge(
+    'inbox_classifier_poll_interval_seconds', 'Seconds until the next inbox check'
+)
+RATE_GAUGE = gauge(
+    'inbox_classifier_mail_arrival_rate', 'Estimated new emails per second'
+)
+
+
+def parse_quiet_hours(spec: str) -> List[Tuple[int, int]]:
+    """Parse 'HH:MM-HH:MM' windows separated by commas into minute-of-day ranges.
+
+    Windows may wrap midnight (e.g. '22:00-07:00').
+    """
+    windows = []
+    for window in filter(None, (w.strip() for w in spec.split(','))):
+        start, end = (_minutes(part) for part in window.split('-'))
+        windows.append((start, end))
+    return windows
+
+
+def _minutes(hhmm: str) -> int:
+    hours, minutes = hhmm.strip().split(':')
+    return int(hours) * 60 + int(minutes)
+
+
+class PollScheduler:
+    """Chooses how long to wait between inbox checks from the observed arrival rate.
+
+    The rate estimate reacts at once when mail arrives faster than
+    expected and otherwise decays with a time constant of `decay` seconds,
+    so polling speeds up to `floor` while mail is flowing and drifts back
+    toward `ceiling` when the inbox goes quiet. The interval aims for about
+    one new email per check. During quiet hours the interval is
+    `quiet_interval`, cut short when the window ends.
+    """
+
+    def __init__(self, floor: float = 10, ceiling: float = 300, decay: float = 600,
+                 quiet_hours: List[Tuple[int, int]] = None, quiet_interval: float = 900,
+                 clock: Callable[[], float] = time.time,
+                 now: Callable[[], datetime] = datetime.now):
+        self.floor = floor
+        self.ceiling = max(floor, ceiling)
+        self.decay = decay
+        self.quiet_hours = quiet_hours or []
+        self.quiet_interval = quiet_interval
+        self.clock = clock
+        self.now = now
+
+        self.rate = 0.0
+        self._last_poll = None
+        self._last_seen = set()
+
+    @classmethod
+    def from_env(cls) -> 'PollScheduler':
+        """Build from POLL_MIN_INTERVAL, POLL_MAX_INTERVAL, POLL_QUIET_HOURS and POLL_QUIET_INTERVAL."""
+        return cls(
+            floor=float(os.environ.get('POLL_MIN_INTERVAL', 10)),
+            ceiling=float(os.environ.get('POLL_MAX_INTERVAL', 300)),
+            quiet_hours=parse_quiet_hours(os.environ.get('POLL_QUIET_HOURS', '')),
+            quiet_interval=float(os.environ.get('POLL_QUIET_INTERVAL', 900)),
+        )
+
+    def record_cycle(self, seen: Iterable = None):
+        """Update the arrival rate from the messages seen by one inbox check.
+
+        Args:
+            seen: Identifiers of the unread messages found; only those not
+                seen by the previous check count as arrivals
+        """
+        seen = set(seen or ())
+        arrivals = len(seen - self._last_seen)
+        self._last_seen = seen
+
+        now = self.clock()
+        if self._last_poll is not None:
+            elapsed = max(now - self._last_poll, 1e-3)
+            decayed = self.rate * math.exp(-elapsed / self.decay)
+            self.rate = max(decayed, arrivals / elapsed)
+        self._last_poll = now
+        RATE_GAUGE.set(self.rate)
+
+    def next_interval(self) -> float:
+        """Return the seconds to wait before the next check (also exported as a metric)."""
+        remaining_quiet = self._quiet_remaining()
+        if remaining_quiet is not None:
+            interval = max(min(self.quiet_interval, remaining_quiet), self.floor)
+        elif self.rate > 0:
+            interval = min(max(1 / self.rate, self.floor), self.ceiling)
+        else:
+            interval = self.ceiling
+
+        INTERVAL_GAUGE.set(interval)
+        return interval
+
+    def _quiet_remaining(self) -> float | None:
+        """Return seconds left in the current quiet window, or None outside one."""
+        now = self.now()
+        minute = now.hour * 60 + now.minute
+        for start, end in self.quiet_hours:
+            if start <= end:
+                inside = start <= minute < end
+            else:
+                inside = minute >= start or minute < end
+            if inside:
+                end_at = now.replace(hour=end // 60, minute=end % 60, second=0, microsecond=0)
+                if end_at <= now:
+                    end_at += timedelta(days=1)
+                return (end_at - now).total_seconds()
+        return None
@@ -0,0 +1,235 @@
+import cProfile
+import io
+import json
+import logging
+import os
+import pstats
+import signal
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Union
+
+from .condense import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+# Lines of the cProfile summary and of each tracemalloc diff
+TOP_FUNCTIONS = 40
+TOP_ALLOCATIONS = 25
+
+
+class CycleProfiler:
+    """Opt-in profiling of polling cycles, written to `directory`.
+
+    While armed (PROFILE_CYCLES at startup, or SIGUSR1 at any time), each
+    cycle gets a cProfile of every thread (cycle-<time>.prof plus a text
+    summary) and a tracemalloc snapshot diffed against the previous one
+    (cycle-<time>-memory.txt). With a slow-email threshold, every message
+    is timed per stage and one taking longer overall is appended to
+    slow-emails.jsonl with its stage timings and sizes.
+
+    When neither is on, profile_cycle does nothing and stage functions are
+    not wrapped, so there is no overhead.
+    """
+
+    def __init__(self, directory: Union[str, Path], cycles: int = 0, signal_cycles: int = 1,
+                 slow_seconds: float = None):
+        """Initialize profiler.
+
+        Args:
+            directory: Where profiles and slow-email records go
+            cycles: Number of cycles to profile from the start
+            signal_cycles: Number of cycles SIGUSR1 arms
+            slow_seconds: Record messages taking longer than this (None: off)
+        """
+        self.directory = Path(directory)
+        self.signal_cycles = signal_cycles
+        self.slow_seconds = slow_seconds
+        self.remaining = cycles
+
+        self._profiling = False
+        self._thread_profiles: List[cProfile.Profile] = []
+        self._thread_local = threading.local()
+        self._snapshot = None
+        # Whether tracemalloc was started here (and so is ours to stop)
+        self._started_tracing = False
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, directory: Union[str, Path]) -> 'CycleProfiler':
+        """Build from PROFILE_CYCLES, PROFILE_SIGNAL_CYCLES and PROFILE_SLOW_EMAIL_SECONDS."""
+        slow = os.environ.get('PROFILE_SLOW_EMAIL_SECONDS')
+        return cls(
+            directory,
+            cycles=int(os.environ.get('PROFILE_CYCLES', 0)),
+            signal_cycles=int(os.environ.get('PROFILE_SIGNAL_CYCLES', 1)),
+            slow_seconds=float(slow) if slow else None,
+        )
+
+    def arm(self, cycles: int):
+        """Profile the next `cycles` cycles."""
+        self.remaining = max(self.remaining, cycles)
+
+    def install_signal_handler(self) -> bool:
+        """Arm profiling on SIGUSR1 (`kill -USR1 <pid>`), where the platform has it."""
+        if not hasattr(signal, 'SIGUSR1') or threading.current_thread() is not threading.main_thread():
+            return False
+        signal.signal(signal.SIGUSR1, lambda signum, frame: self.arm(self.signal_cycles))
+        return True
+
+    @property
+    def active(self) -> bool:
+        return self.remaining > 0 or self.slow_seconds is not None
+
+    @contextmanager
+    def profile_cycle(self):
+        """Profile the enclosed cycle if armed."""
+        if self.remaining <= 0:
+            yield
+            return
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(int(os.environ.get('PROFILE_TRACEMALLOC_FRAMES', 1)))
+            self._started_tracing = True
+            self._snapshot = tracemalloc.take_snapshot()
+
+        profile = cProfile.Profile()
+        self._thread_profiles = []
+        self._profiling = True
+        started = time.monotonic()
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            self._profiling = False
+            self.remaining -= 1
+            name = f"cycle-{datetime.now().strftime('%Y%m%d-%H%M%S')}"
+            try:
+                self._write_profile(name, profile, time.monotonic() - started)
+                self._write_memory(name)
+            except OSError as e:
+                logger.warning(f"Could not write profile: {e}")
+            if self.remaining <= 0:
+                if self._started_tracing:
+                    tracemalloc.stop()
+                    self._started_tracing = False
+                self._snapshot = None
+
+    def stage(self, name: str, func: Callable, batch: bool = False, last: bool = False) -> Callable:
+        """Wrap a pipeline stage function for profiling and slow-email timing.
+
+        Returns func itself when profiling is off. Items are the pipeline's
+        work-item dicts; batch stages take and return lists of them.
+        """
+        if not self.active:
+            return func
+
+        def wrapped(arg):
+            if self._profiling:
+                self._profile_thread()
+            if self.slow_seconds is None:
+                return func(arg)
+
+            items = arg if batch else [arg]
+            for item in items:
+                item.setdefault('started', time.perf_counter())
+            start = time.perf_counter()
+            try:
+                output = func(arg)
+            except Exception:
+                self._finish(items, name, start, 'error')
+                raise
+            if last:
+                done = items
+            elif batch:
+                passed = {id(item) for item in output}
+                done = [item for item in items if id(item) not in passed]
+            else:
+                done = items if output is None else []
+            self._finish(items, name, start, 'done' if last else 'dropped', done)
+            return output
+
+        return wrapped
+
+    def _finish(self, items: List[Dict], name: str, start: float, outcome: str, done: List[Dict] = None):
+        now = time.perf_counter()
+        for item in items:
+            timings = item.setdefault('timings', {})
+            timings[name] = timings.get(name, 0.0) + now - start
+        for item in items if done is None else done:
+            total = now - item['started']
+            if total >= self.slow_seconds:
+                self._record_slow(item, total, outcome)
+
+    def _record_slow(self, item: Dict, total: float, outcome: str):
+        email, result = item.get('email') or {}, item.get('result') or {}
+        body = email.get('body') or ''
+        record = {
+            'timestamp': datetime.utcnow().isoformat(),
+            'email_id': item['id'],
+            'account': getattr(getattr(item.get('cycle'), 'account', None), 'name', None),
+            'subject': (email.get('subject') or '')[:80],
+            'sender': email.get('sender'),
+            'outcome': outcome,
+            'total_seconds': round(total, 3),
+            'stages': {stage: round(seconds, 3) for stage, seconds in item['timings'].items()},
+            'body_chars': len(body),
+            'body_tokens': estimate_tokens(body),
+            'classification': result.get('classification'),
+            'model': result.get('model'),
+        }
+        with self._lock:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            with open(self.directory / 'slow-emails.jsonl', 'a') as f:
+                f.write(json.dumps(record) + '\n')
+
+    def _profile_thread(self):
+        """Profile the calling pipeline worker thread for the rest of the cycle."""
+        if getattr(self._thread_local, 'profile', None) is not None:
+            return
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Python 3.12+: the cycle's profile already sees every thread
+            profile = False
+        self._thread_local.profile = profile
+        if profile:
+            with self._lock:
+                self._thread_profiles.append(profile)
+
+    def _write_profile(self, name: str, profile: cProfile.Profile, seconds: float):
+        # Pipeline workers have exited by now; their profiles stopped with them
+        with self._lock:
+            thread_profiles, self._thread_profiles = self._thread_profiles, []
+        stats = pstats.Stats(profile)
+        for thread_profile in thread_profiles:
+            thread_profile.disable()
+            stats.add(thread_profile)
+        stats.dump_stats(str(self.directory / f'{name}.prof'))
+
+        summary = io.StringIO()
+        summary.write(f"Cycle took {seconds:.2f}s ({len(thread_profiles)} worker threads profiled)\n\n")
+        stats.stream = summary
+        stats.sort_stats('cumulative').print_stats(TOP_FUNCTIONS)
+        (self.directory / f'{name}.txt').write_text(summary.getvalue())
+        logger.info(f"Wrote cycle profile to {self.directory / name}.prof")
+
+    def _write_memory(self, name: str):
+        snapshot = tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+        ])
+        current, peak = tracemalloc.get_traced_memory()
+        lines = [f"Traced memory: {current / 1e6:.1f} MB (peak {peak / 1e6:.1f} MB)",
+                 f"Top {TOP_ALLOCATIONS} allocation changes since the previous snapshot:", ""]
+        if self._snapshot is not None:
+            for diff in snapshot.compare_to(self._snapshot, 'lineno')[:TOP_ALLOCATIONS]:
+                lines.append(str(diff))
+        self._snapshot = snapshot
+        (self.directory / f'{name}-memory.txt').write_text('\n'.join(lines) + '\n')
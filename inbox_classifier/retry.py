@@ -0,0 +1,116 @@
+import logging
+import os
+import random
+import time
+from email.utils import parsedate_to_datetime
+from typing import Callable
+
+import anthropic
+from googleapiclient.errors import HttpError
+
+logger = logging.getLogger(__name__)
+
+RETRYABLE_STATUSES = {408, 429, 500, 502, 503, 504, 529}
+# Gmail reports some rate limiting as 403 with one of these reasons
+RATE_LIMIT_REASONS = ('rateLimitExceeded', 'userRateLimitExceeded')
+# Shortest timeout an attempt gets, however close the deadline
+MIN_ATTEMPT_TIMEOUT = 1.0
+
+
+class Backoff:
+    """Decorrelated-jitter exponential backoff.
+
+    Each delay is drawn uniformly from [base, 3 * previous delay] and capped,
+    so concurrent retriers spread out instead of retrying in lockstep.
+    """
+
+    def __init__(self, base: float, cap: float):
+        self.base = base
+        self.cap = cap
+        self._delay = base
+
+    def next(self) -> float:
+        """Return the next delay in seconds."""
+        self._delay = min(self.cap, random.uniform(self.base, self._delay * 3))
+        return self._delay
+
+    def reset(self):
+        self._delay = self.base
+
+
+def status_code(error: Exception) -> int | None:
+    """Return the HTTP status of a Gmail or Anthropic API error, if any."""
+    if isinstance(error, HttpError):
+        return error.resp.status
+    if isinstance(error, anthropic.APIStatusError):
+        return error.status_code
+    return None
+
+
+def is_retryable(error: Exception) -> bool:
+    """Return True for errors worth retrying: 429, 5xx, timeouts and dropped connections."""
+    if isinstance(error, (ConnectionError, TimeoutError, anthropic.APIConnectionError)):
+        return True
+
+    status = status_code(error)
+    if status in RETRYABLE_STATUSES:
+        return True
+    if status == 403 and isinstance(error, HttpError):
+        return any(reason in str(error.content) for reason in RATE_LIMIT_REASONS)
+    return False
+
+
+def retry_after(error: Exception) -> float | None:
+    """Return the server's requested wait from a Retry-After header, in seconds."""
+    if isinstance(error, HttpError):
+        value = error.resp.get('retry-after')
+    elif isinstance(error, anthropic.APIStatusError):
+        value = error.response.headers.get('retry-after')
+    else:
+        return None
+    if not value:
+        return None
+
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+
+def call_with_retry(func: Callable, *args, pass_timeout: bool = False, **kwargs):
+    """Call func, retrying transient API errors until a per-call deadline.
+
+    Delays use decorrelated jitter between RETRY_BASE_DELAY (default 0.5 s)
+    and RETRY_MAX_DELAY (default 20 s), or the server's Retry-After when it
+    asks for longer. Once the next wait would pass RETRY_DEADLINE (default
+    60 s) after the first attempt, the last error is raised.
+
+    With pass_timeout, each attempt is called with `timeout=` the seconds
+    left until the deadline (at least MIN_ATTEMPT_TIMEOUT), so a hung
+    request is cut off there instead of running to the client's default.
+    """
+    deadline = time.monotonic() + float(os.environ.get('RETRY_DEADLINE', 60))
+    backoff = Backoff(
+        float(os.environ.get('RETRY_BASE_DELAY', 0.5)),
+        float(os.environ.get('RETRY_MAX_DELAY', 20))
+    )
+
+    attempt = 1
+    while True:
+        try:
+            if pass_timeout:
+                kwargs['timeout'] = max(deadline - time.monotonic(), MIN_ATTEMPT_TIMEOUT)
+            return func(*args, **kwargs)
+        except Exception as e:
+            if not is_retryable(e):
+                raise
+            delay = max(backoff.next(), retry_after(e) or 0)
+            if time.monotonic() + delay > deadline:
+                raise
+            logger.warning(f"Transient error (attempt {attempt}), retrying in {delay:.1f}s: {e}")
+            time.sleep(delay)
+            attempt += 1
@@ -33,12 +33,14 @@ Skip classification for:
 GITHUB_RAW_URL = 'https://raw.githubusercontent.com/{repo}/main/rules.md'
 
 
-def _load_local() -> str:
+def _load_local(rules_file: Path = None) -> str:
     """Load rules from local file, creating default if missing."""
-    if RULES_FILE.exists():
-        return RULES_FILE.read_text().strip()
-    CONFIG_DIR.mkdir(parents=True, exist_ok=True)
-    RULES_FILE.write_text(DEFAULT_RULES)
+    config_dir = CONFIG_DIR if rules_file is None else rules_file.parent
+    rules_file = rules_file or RULES_FILE
+    if rules_file.exists():
+        return rules_file.read_text().strip()
+    config_dir.mkdir(parents=True, exist_ok=True)
+    rules_file.write_text(DEFAULT_RULES)
     return DEFAULT_RULES
 
 
@@ -58,33 +60,37 @@ def _fetch_from_github(repo: str, token: str) -> str:
     return response.text
 
 
-def _update_cache(content: str) -> None:
+def _update_cache(content: str, rules_file: Path = None) -> None:
     """Write rules content to local cache file."""
-    CONFIG_DIR.mkdir(parents=True, exist_ok=True)
-    RULES_FILE.write_text(content)
+    config_dir = CONFIG_DIR if rules_file is None else rules_file.parent
+    config_dir.mkdir(parents=True, exist_ok=True)
+    (rules_file or RULES_FILE).write_text(content)
 
 
-def load_rules() -> str:
+def load_rules(rules_file: Path = None) -> str:
     """Load classification rules.
 
     If RULES_REPO is set, fetches from GitHub and caches locally.
     Falls back to local file on failure or when RULES_REPO is not set.
+
+    Args:
+        rules_file: Local rules file / cache. Defaults to ~/.inbox-classifier/rules.md
     """
     rules_repo = os.getenv('RULES_REPO')
 
     if not rules_repo:
-        return _load_local()
+        return _load_local(rules_file)
 
     github_token = os.getenv('GITHUB_TOKEN')
     if not github_token:
         logger.warning("RULES_REPO set but GITHUB_TOKEN missing, using local cache")
-        return _load_local()
+        return _load_local(rules_file)
 
     try:
         content = _fetch_from_github(rules_repo, github_token)
-        _update_cache(content)
+        _update_cache(content, rules_file)
         logger.info(f"Fetched rules from GitHub ({rules_repo})")
         return content
     except Exception as e:
         logger.warning(f"Failed to fetch rules from GitHub: {e}, using local cache")
-        return _load_local()
+        return _load_local(rules_file)
@@ -0,0 +1,177 @@
+import gzip
+import json
+import mmap
+import re
+import sqlite3
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Tuple, Union
+
+from .logger import log_segments
+
+# Each field is pulled out of the raw bytes with its own scan, so only the
+# fields the report needs are ever parsed. Escaped quotes inside subject or
+# reasoning can't produce a false '"sender": "' match.
+DAY_PATTERN = re.compile(rb'"timestamp": "(\d{4}-\d{2}-\d{2})')
+SENDER_PATTERN = re.compile(rb'"sender": "([^"\\\n]*(?:\\.[^"\\\n]*)*)"')
+CATEGORY_PATTERN = re.compile(rb'"classification": "([^"\\\n]*(?:\\.[^"\\\n]*)*)"')
+
+# Address inside a display-name From header, e.g. 'Shop <deals@shop.com>'
+ADDRESS_PATTERN = re.compile(r'<([^<>]+)>\s*$')
+
+
+def _read_segment(path: Path):
+    """Return a segment's bytes: memory-mapped if plain, decompressed if gzipped."""
+    if path.suffix == '.gz':
+        with gzip.open(path, 'rb') as f:
+            return f.read()
+    if path.stat().st_size == 0:
+        return b''
+    with open(path, 'rb') as f:
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def _extract_fields(data) -> List[Tuple[bytes, bytes, bytes]]:
+    """Return (day, sender, category) for every entry in a segment.
+
+    The three scans line up when every entry carries all three fields, which
+    holds for everything ClassificationLogger writes. If the counts disagree,
+    fall back to matching line by line.
+    """
+    days = DAY_PATTERN.findall(data)
+    senders = SENDER_PATTERN.findall(data)
+    categories = CATEGORY_PATTERN.findall(data)
+
+    if len(days) == len(senders) == len(categories):
+        return list(zip(days, senders, categories))
+
+    rows = []
+    for line in bytes(data).splitlines():
+        day, sender, category = (p.search(line) for p in (DAY_PATTERN, SENDER_PATTERN, CATEGORY_PATTERN))
+        if day and sender and category:
+            rows.append((day.group(1), sender.group(1), category.group(1)))
+    return rows
+
+
+def _decode(value: bytes) -> str:
+    """Decode a captured JSON string body, handling escapes only when present."""
+    if b'\\' in value:
+        return json.loads(b'"' + value + b'"')
+    return value.decode('utf-8', errors='replace')
+
+
+def segment_stats(path: Union[str, Path], since: str = '') -> Dict[str, Counter]:
+    """Aggregate per-category, per-sender and per-day counts for one log segment.
+
+    Runs in a worker process; only plain Counters cross the process boundary.
+    """
+    data = _read_segment(Path(path))
+    rows = _extract_fields(data)
+    if isinstance(data, mmap.mmap):
+        data.close()
+
+    if since:
+        cutoff = since.encode()
+        rows = [row for row in rows if row[0] >= cutoff]
+
+    days, senders, categories = zip(*rows) if rows else ((), (), ())
+
+    # Group on the raw bytes first, then decode and normalize once per
+    # distinct value instead of once per entry
+    by_sender = Counter()
+    for raw, count in Counter(senders).items():
+        by_sender[_sender_key(_decode(raw))] += count
+
+    return {
+        'category': Counter({_decode(k): v for k, v in Counter(categories).items()}),
+        'sender': by_sender,
+        'day': Counter({k.decode(): v for k, v in Counter(days).items()}),
+    }
+
+
+def collect_stats(log_path: Union[str, Path], since: str = '', workers: int = None) -> Dict[str, Counter]:
+    """Aggregate counts across every segment of a classification log.
+
+    Segments are processed in parallel with a process pool. Segments whose
+    date stamp is older than `since` (YYYY-MM-DD) are not read at all.
+    """
+    paths = [
+        p for p in log_segments(log_path)
+        if not since or not _segment_date(p) or _segment_date(p) >= since
+    ]
+
+    totals = {'category': Counter(), 'sender': Counter(), 'day': Counter()}
+    if len(paths) <= 1 or workers == 1:
+        results = [segment_stats(p, since) for p in paths]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(segment_stats, paths, [since] * len(paths)))
+
+    for result in results:
+        for key, counts in result.items():
+            totals[key].update(counts)
+
+    return totals
+
+
+def collect_db_stats(db_path: Union[str, Path], since: str = '') -> Dict[str, Counter]:
+    """Aggregate the same counts from a SQLite classification store.
+
+    The store (CLASSIFICATION_STORE=sqlite) holds the whole history, the
+    imported JSONL included; counting is left to GROUP BY queries, and
+    only distinct senders are normalized here.
+    """
+    conn = open_read_only(db_path)
+    try:
+        def grouped(column: str) -> List[Tuple[str, int]]:
+            return conn.execute(
+                f"SELECT {column}, COUNT(*) FROM classifications "
+                f"WHERE timestamp >= ? AND sender IS NOT NULL AND classification IS NOT NULL GROUP BY 1",
+                (since,)
+            ).fetchall()
+
+        categories, senders, days = grouped('classification'), grouped('sender'), grouped('substr(timestamp, 1, 10)')
+    finally:
+        conn.close()
+
+    by_sender = Counter()
+    for sender, count in senders:
+        by_sender[_sender_key(sender)] += count
+    return {'category': Counter(dict(categories)), 'sender': by_sender, 'day': Counter(dict(days))}
+
+
+def open_read_only(db_path: Union[str, Path]) -> sqlite3.Connection:
+    """Open a SQLite classification store for reading only, leaving it as the service wrote it."""
+    return sqlite3.connect(f'{Path(db_path).resolve().as_uri()}?mode=ro', uri=True)
+
+
+def _sender_key(sender: str) -> str:
+    match = ADDRESS_PATTERN.search(sender)
+    return (match.group(1) if match else sender).strip().lower()
+
+
+def _segment_date(path: Path) -> str:
+    match = re.search(r'-(\d{4}-\d{2}-\d{2})', path.name)
+    return match.group(1) if match else ''
+
+
+def format_report(stats: Dict[str, Counter], top: int = 10, days: int = 14) -> str:
+    """Render aggregated counts as a plain-text report."""
+    total = sum(stats['category'].values())
+    lines = [f"Total classified: {total}", "", "By category:"]
+
+    for category, count in stats['category'].most_common():
+        lines.append(f"  {category:<20} {count:>8}  {count / total:6.1%}")
+    if not total:
+        lines.append("  (no classifications logged)")
+
+    lines += ["", f"Top {top} senders:"]
+    for sender, count in stats['sender'].most_common(top):
+        lines.append(f"  {sender:<40} {count:>8}")
+
+    lines += ["", f"Last {days} days:"]
+    for day in sorted(stats['day'])[-days:]:
+        lines.append(f"  {day}  {stats['day'][day]:>8}")
+
+    return '\n'.join(lines)
@@ -0,0 +1,38 @@
+from inbox_classifier.accounts import Account, load_accounts
+
+
+def test_load_accounts_defaults_to_single_account(tmp_path, monkeypatch):
+    """Without ACCOUNTS, the original single-account layout is used."""
+    monkeypatch.delenv('ACCOUNTS', raising=False)
+
+    accounts = load_accounts(tmp_path)
+
+    assert len(accounts) == 1
+    assert accounts[0].name == 'default'
+    assert accounts[0].token_path == tmp_path / 'token.json'
+    assert accounts[0].ledger_path == tmp_path / 'ledger.db'
+
+
+def test_load_accounts_from_env(tmp_path, monkeypatch):
+    """Each named account gets its own config directory."""
+    monkeypatch.setenv('ACCOUNTS', 'work, personal')
+
+    accounts = load_accounts(tmp_path)
+
+    assert [a.name for a in accounts] == ['work', 'personal']
+    assert accounts[0].token_path == tmp_path / 'accounts' / 'work' / 'token.json'
+    assert accounts[1].rules_path == tmp_path / 'accounts' / 'personal' / 'rules.md'
+    assert (tmp_path / 'accounts' / 'personal').is_dir()
+
+
+def test_label_cache_is_keyed_by_categories(tmp_path):
+    """Cached label IDs are only reused while the categories are unchanged."""
+    account = Account('work', tmp_path)
+    account.cache_label_ids(['A', 'B'], {'A': 'l1', 'B': 'l2'})
+
+    assert account.cached_label_ids(['A', 'B']) == {'A': 'l1', 'B': 'l2'}
+    assert account.cached_label_ids(['A', 'B', 'C']) is None
+
+    account.clear_label_cache()
+
+    assert account.cached_label_ids(['A', 'B']) is None
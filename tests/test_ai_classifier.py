@@ -1,6 +1,16 @@
+import threading
+import time
+import pytest
 from unittest.mock import Mock, patch
+from inbox_classifier import ai_classifier
 from inbox_classifier.ai_classifier import classify_email, parse_categories
 
+
+@pytest.fixture(autouse=True)
+def clear_clients():
+    """Each test patches Anthropic, so don't reuse a client from another test."""
+    ai_classifier._clients.clear()
+
 MOCK_RULES = """Important emails include:
 - Transactional: receipts, confirmations, invoices, shipping notifications
 - Security: password resets, security alerts, 2FA codes
@@ -12,10 +22,9 @@ Optional emails include:
 - Promotional: sales, deals, marketing campaigns
 - Newsletters: regular updates, digests"""
 
-@patch('inbox_classifier.ai_classifier.time.sleep')
 @patch('inbox_classifier.ai_classifier.load_rules')
 @patch('inbox_classifier.ai_classifier.Anthropic')
-def test_classify_email_returns_important(mock_anthropic, mock_load_rules, mock_sleep):
+def test_classify_email_returns_important(mock_anthropic, mock_load_rules):
     """Test classification of important email."""
     mock_load_rules.return_value = MOCK_RULES
 
@@ -38,10 +47,9 @@ def test_classify_email_returns_important(mock_anthropic, mock_load_rules, mock_
     assert result['classification'] == 'Important'
     assert 'receipt' in result['reasoning'].lower()
 
-@patch('inbox_classifier.ai_classifier.time.sleep')
 @patch('inbox_classifier.ai_classifier.load_rules')
 @patch('inbox_classifier.ai_classifier.Anthropic')
-def test_classify_email_returns_optional(mock_anthropic, mock_load_rules, mock_sleep):
+def test_classify_email_returns_optional(mock_anthropic, mock_load_rules):
     """Test classification of optional email."""
     mock_load_rules.return_value = MOCK_RULES
 
@@ -64,10 +72,9 @@ def test_classify_email_returns_optional(mock_anthropic, mock_load_rules, mock_s
     assert result['classification'] == 'Optional'
     assert 'newsletter' in result['reasoning'].lower()
 
-@patch('inbox_classifier.ai_classifier.time.sleep')
 @patch('inbox_classifier.ai_classifier.load_rules')
 @patch('inbox_classifier.ai_classifier.Anthropic')
-def test_classify_email_returns_routine(mock_anthropic, mock_load_rules, mock_sleep):
+def test_classify_email_returns_routine(mock_anthropic, mock_load_rules):
     """Test classification of routine email."""
     mock_load_rules.return_value = MOCK_RULES
 
@@ -90,10 +97,9 @@ def test_classify_email_returns_routine(mock_anthropic, mock_load_rules, mock_sl
     assert result['classification'] == 'Routine'
     assert 'statement' in result['reasoning'].lower()
 
-@patch('inbox_classifier.ai_classifier.time.sleep')
 @patch('inbox_classifier.ai_classifier.load_rules')
 @patch('inbox_classifier.ai_classifier.Anthropic')
-def test_classify_email_returns_none_for_unrecognized(mock_anthropic, mock_load_rules, mock_sleep):
+def test_classify_email_returns_none_for_unrecognized(mock_anthropic, mock_load_rules):
     """Test that unrecognized responses return None (no default category)."""
     mock_load_rules.return_value = MOCK_RULES
 
@@ -143,3 +149,289 @@ Skip classification for:
 
     assert categories == ['Important', 'Optional']
     assert 'Skip' not in categories
+
+
+def make_client(mock_anthropic, *replies):
+    mock_client = Mock()
+    mock_anthropic.return_value = mock_client
+    mock_client.messages.create.side_effect = [Mock(content=[Mock(text=r)]) for r in replies]
+    return mock_client
+
+
+EMAIL = {'subject': 'Sale', 'sender': 'shop@example.com', 'to': 'me@example.com', 'body': '50% off'}
+
+
+@patch('inbox_classifier.ai_classifier.Anthropic')
+def test_cascade_accepts_confident_small_model(mock_anthropic, monkeypatch):
+    """Test that a confident first-tier verdict is final."""
+    monkeypatch.setenv('CLASSIFIER_MODELS', 'small,large')
+    client = make_client(mock_anthropic, 'Optional (95%): promotion')
+
+    result = classify_email(EMAIL, 'test-key', rules=MOCK_RULES)
+
+    assert [call['model'] for call in result.pop('api_calls')] == ['small']
+    assert result.pop('latency') >= 0
+    assert result == {'classification': 'Optional', 'reasoning': 'promotion', 'confidence': 95, 'model': 'small'}
+    assert client.messages.create.call_count == 1
+    assert client.messages.create.call_args.kwargs['model'] == 'small'
+
+
+@patch('inbox_classifier.ai_classifier.Anthropic')
+def test_cascade_escalates_low_confidence(mock_anthropic, monkeypatch):
+    """Test that an unsure first tier hands the email to the next model."""
+    monkeypatch.setenv('CLASSIFIER_MODELS', 'small,large')
+    monkeypatch.setenv('CASCADE_MIN_CONFIDENCE', '80')
+    client = make_client(mock_anthropic, 'Optional (60%): maybe', 'Important (70%): order update')
+
+    result = classify_email(EMAIL, 'test-key', rules=MOCK_RULES)
+
+    assert result['classification'] == 'Important'
+    assert result['model'] == 'large'
+    assert [c.kwargs['model'] for c in client.messages.create.call_args_list] == ['small', 'large']
+
+
+@patch('inbox_classifier.ai_classifier.Anthropic')
+def test_cascade_escalates_unparseable_reply(mock_anthropic, monkeypatch):
+    """Test that a reply naming no category escalates."""
+    monkeypatch.setenv('CLASSIFIER_MODELS', 'small,large')
+    make_client(mock_anthropic, 'I am not sure', 'Routine (90%): statement')
+
+    assert classify_email(EMAIL, 'test-key', rules=MOCK_RULES)['model'] == 'large'
+
+
+@patch('inbox_classifier.ai_classifier.Anthropic')
+def test_cascade_keeps_unsure_verdict_if_last_tier_fails(mock_anthropic, monkeypatch):
+    """Test that a low-confidence verdict is used when the last tier doesn't parse."""
+    monkeypatch.setenv('CLASSIFIER_MODELS', 'small,large')
+    make_client(mock_anthropic, 'Optional (40%): maybe', 'garbage')
+
+    result = classify_email(EMAIL, 'test-key', rules=MOCK_RULES)
+
+    assert result['classification'] == 'Optional'
+    assert result['model'] == 'small'
+
+
+def test_parse_response_reads_confidence():
+    """Test parsing with and without a confidence figure."""
+    from inbox_classifier.ai_classifier import parse_response
+    categories = ['Important', 'Routine']
+
+    assert parse_response('Routine (85%): statement', categories) == {
+        'classification': 'Routine', 'reasoning': 'statement', 'confidence': 85
+    }
+    assert parse_response('Important: urgent', categories)['confidence'] is None
+    assert parse_response('Importantly, nothing', categories) is None
+
+
+def test_parse_compact_reply():
+    """Test that numeric codes resolve to categories in one lookup."""
+    from inbox_classifier.ai_classifier import parse_response
+    categories = ['Important', 'Routine', 'Optional']
+
+    assert parse_response('2 90 monthly bank statement', categories) == {
+        'classification': 'Routine', 'reasoning': 'monthly bank statement', 'confidence': 90
+    }
+    assert parse_response('3 75', categories) == {
+        'classification': 'Optional', 'reasoning': '', 'confidence': 75
+    }
+    assert parse_response('4 90 unknown code', categories) is None
+    assert parse_response('', categories) is None
+
+
+def test_build_request_uses_codes_and_stop_sequence(monkeypatch):
+    """Test that the prompt lists numeric codes and the reply is capped at one line."""
+    from inbox_classifier.ai_classifier import build_request
+    monkeypatch.delenv('CLASSIFIER_REASONS', raising=False)
+
+    params = build_request(EMAIL, MOCK_RULES, 'small')
+
+    prompt = params['messages'][0]['content']
+    assert '1 = Important\n2 = Routine\n3 = Optional' in prompt
+    assert params['stop_sequences'] == ['\n']
+    assert params['max_tokens'] <= 40
+
+
+def test_build_request_without_reasons(monkeypatch):
+    """Test that reasons can be turned off to save output tokens."""
+    from inbox_classifier.ai_classifier import build_request
+    monkeypatch.setenv('CLASSIFIER_REASONS', 'off')
+
+    params = build_request(EMAIL, MOCK_RULES)
+
+    assert 'reason' not in params['messages'][0]['content'].split('Reply with')[1]
+    assert params['max_tokens'] <= 10
+
+
+class FakeStream:
+    """Raw event stream yielding text deltas; blocks before `hold_at` until released."""
+
+    def __init__(self, chunks, hold_at=None):
+        self.chunks = chunks
+        self.hold_at = hold_at
+        self.release = threading.Event()
+        self.closed = False
+
+    def __iter__(self):
+        for index, chunk in enumerate(self.chunks):
+            if index == self.hold_at:
+                assert self.release.wait(5)
+            yield Mock(type='content_block_delta', delta=Mock(type='text_delta', text=chunk))
+
+    def close(self):
+        self.closed = True
+
+
+def stream_client(mock_anthropic, *streams):
+    mock_client = Mock()
+    mock_anthropic.return_value = mock_client
+    mock_client.messages.create.side_effect = list(streams)
+    return mock_client
+
+
+@patch('inbox_classifier.ai_classifier.Anthropic')
+def test_streaming_returns_verdict_before_reason_finishes(mock_anthropic, monkeypatch):
+    """Test that the verdict is returned once settled and the reason follows in the background."""
+    monkeypatch.setenv('CLASSIFIER_STREAMING', 'on')
+    monkeypatch.setenv('CLASSIFIER_MODELS', 'small')
+    stream = FakeStream(['3', ' 9', '5 ', 'promo', 'tional sale'], hold_at=3)
+    client = stream_client(mock_anthropic, stream)
+
+    result = classify_email(EMAIL, 'key', rules=MOCK_RULES)
+
+    assert client.messages.create.call_args.kwargs['stream'] is True
+    assert result['classification'] == 'Optional'
+    assert result['confidence'] == 95
+    assert result['reasoning'] == ''
+
+    stream.release.set()
+    assert ai_classifier.resolve_reasoning(result)['reasoning'] == 'promotional sale'
+    assert 'pending_reasoning' not in result
+    assert stream.closed
+
+
+@patch('inbox_classifier.ai_classifier.Anthropic')
+def test_streaming_cancel_closes_stream(mock_anthropic, monkeypatch):
+    """Test that cancel mode closes the stream once the verdict is known."""
+    monkeypatch.setenv('CLASSIFIER_STREAMING', 'cancel')
+    monkeypatch.setenv('CLASSIFIER_MODELS', 'small')
+    stream = FakeStream(['1 88 ', 'security alert'], hold_at=1)
+    stream_client(mock_anthropic, stream)
+
+    result = classify_email(EMAIL, 'key', rules=MOCK_RULES)
+
+    assert stream.closed
+    assert result['classification'] == 'Important'
+    assert ai_classifier.resolve_reasoning(result)['reasoning'] == ''
+
+
+@patch('inbox_classifier.ai_classifier.Anthropic')
+def test_streaming_parses_reply_that_ends_early(mock_anthropic, monkeypatch):
+    """Test that a reply ending before the verdict settles is parsed whole."""
+    monkeypatch.setenv('CLASSIFIER_STREAMING', 'on')
+    monkeypatch.setenv('CLASSIFIER_MODELS', 'small,large')
+    stream_client(mock_anthropic, FakeStream(['2', ' 6']), FakeStream(['2 9', '0']))
+
+    result = classify_email(EMAIL, 'key', rules=MOCK_RULES)
+
+    assert [call['model'] for call in result.pop('api_calls')] == ['small', 'large']
+    del result['latency']
+    assert result == {'classification': 'Routine', 'reasoning': '', 'confidence': 90, 'model': 'large'}
+
+
+@patch('inbox_classifier.ai_classifier.Anthropic')
+def test_escalation_closes_unsure_reason_stream(mock_anthropic, monkeypatch):
+    """Test that an unsure tier's reason stops streaming when the next tier is asked."""
+    monkeypatch.setenv('CLASSIFIER_STREAMING', 'on')
+    monkeypatch.setenv('CLASSIFIER_MODELS', 'small,large')
+    unsure = FakeStream(['2 40 ', 'maybe a ', 'statement'], hold_at=1)
+    stream_client(mock_anthropic, unsure, FakeStream(['2 95 ', 'statement']))
+
+    result = ai_classifier.resolve_reasoning(classify_email(EMAIL, 'key', rules=MOCK_RULES))
+
+    assert unsure.closed
+    assert (result['model'], result['reasoning']) == ('large', 'statement')
+    unsure.release.set()
+
+
+@patch('inbox_classifier.ai_classifier.Anthropic')
+def test_streamed_call_settles_once_reason_is_read(mock_anthropic, monkeypatch):
+    """Test that a streamed call keeps its budget reservation until its reason has been read."""
+    from inbox_classifier.budget import Budget, BudgetGovernor
+    monkeypatch.setenv('CLASSIFIER_STREAMING', 'on')
+    monkeypatch.setenv('CLASSIFIER_MODELS', 'small')
+    stream = FakeStream(['2 95 ', 'statement'], hold_at=1)
+    stream_client(mock_anthropic, stream)
+    governor = BudgetGovernor([Budget(10**6, 3600, burst=1)])
+
+    result = classify_email(EMAIL, 'key', rules=MOCK_RULES, governor=governor)
+    reserved = governor.tokens
+
+    assert reserved > 0
+    stream.release.set()
+    ai_classifier.resolve_reasoning(result)
+    for _ in range(100):
+        if governor.tokens != reserved:
+            break
+        time.sleep(0.01)
+    # The stand-in stream reports no usage, so the reservation is settled to zero
+    assert governor.tokens == 0
+
+
+def test_verdict_waits_for_complete_code():
+    """Test that a code or confidence isn't settled while more digits may follow."""
+    pattern = ai_classifier.VERDICT_PATTERN
+    assert not pattern.match('1')
+    assert not pattern.match('10 8')
+    assert pattern.match('25 90 ').groups() == ('25', '90')
+    assert pattern.match('Important (95%): ').groups() == ('Important', '95')
+
+
+@patch('inbox_classifier.ai_classifier.Anthropic')
+def test_usage_of_every_cascade_tier_is_recorded(mock_anthropic, monkeypatch):
+    """Test that token counts of both tiers are kept when the small model is unsure."""
+    monkeypatch.setenv('CLASSIFIER_MODELS', 'small,large')
+    mock_client = Mock()
+    mock_anthropic.return_value = mock_client
+    mock_client.messages.create.side_effect = [
+        Mock(content=[Mock(text='2 40 unsure')], usage=Mock(
+            input_tokens=800, output_tokens=4, cache_read_input_tokens=0, cache_creation_input_tokens=0)),
+        Mock(content=[Mock(text='2 95 statement')], usage=Mock(
+            input_tokens=800, output_tokens=5, cache_read_input_tokens=0, cache_creation_input_tokens=0)),
+    ]
+
+    result = classify_email(EMAIL, 'key', rules=MOCK_RULES)
+
+    assert [(c['model'], c['input_tokens'], c['output_tokens']) for c in result['api_calls']] == [
+        ('small', 800, 4), ('large', 800, 5)
+    ]
+
+
+@patch('inbox_classifier.ai_classifier.Anthropic')
+def test_streamed_usage_includes_reason_tokens(mock_anthropic, monkeypatch):
+    """Test that a streamed call's usage is complete once its reason has been resolved."""
+    from fakes import FakeStream as PacedStream
+    monkeypatch.setenv('CLASSIFIER_STREAMING', 'on')
+    monkeypatch.setenv('CLASSIFIER_MODELS', 'small')
+    stream_client(mock_anthropic, PacedStream(['2 ', '95 ', 'monthly ', 'statement'], 0, 0, input_tokens=700))
+
+    result = ai_classifier.resolve_reasoning(classify_email(EMAIL, 'key', rules=MOCK_RULES))
+
+    assert result['reasoning'] == 'monthly statement'
+    assert result['api_calls'][0]['input_tokens'] == 700
+    assert result['api_calls'][0]['output_tokens'] > 1
+
+
+@patch('inbox_classifier.ai_classifier.Anthropic')
+def test_budget_refusal_keeps_unsure_verdict(mock_anthropic, monkeypatch):
+    """Test that running out of budget mid-cascade returns the unsure verdict, and raises without one."""
+    from inbox_classifier.budget import Budget, BudgetExceeded, BudgetGovernor
+    monkeypatch.setenv('CLASSIFIER_MODELS', 'small,large')
+    client = make_client(mock_anthropic, '2 40 maybe a statement', '3 90 sale')
+    governor = BudgetGovernor([Budget(1, 3600, kind='requests', burst=1)])
+
+    result = classify_email(EMAIL, 'key', rules=MOCK_RULES, governor=governor)
+
+    assert (result['classification'], result['model']) == ('Routine', 'small')
+    assert client.messages.create.call_count == 1
+    with pytest.raises(BudgetExceeded):
+        classify_email(EMAIL, 'key', rules=MOCK_RULES, governor=governor)
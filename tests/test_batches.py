@@ -0,0 +1,48 @@
+import pytest
+from unittest.mock import Mock, patch
+
+from fakes import FakeBatchClient
+from inbox_classifier import ai_classifier
+from inbox_classifier.batches import AnthropicBatchClient
+
+
+@pytest.fixture(autouse=True)
+def clear_clients():
+    """Each test patches Anthropic, so don't reuse a client from another test."""
+    ai_classifier._clients.clear()
+
+
+@patch('inbox_classifier.ai_classifier.Anthropic')
+def test_anthropic_client_maps_results(mock_anthropic):
+    """Test that succeeded and failed entries become (id, text, error, usage) tuples."""
+    batches = mock_anthropic.return_value.messages.batches
+    batches.create.return_value = Mock(id='msgbatch_1')
+    batches.retrieve.return_value = Mock(processing_status='ended')
+    ok = Mock(custom_id='a')
+    ok.result.type = 'succeeded'
+    ok.result.message.content = [Mock(text='Routine: fine')]
+    expired = Mock(custom_id='b')
+    expired.result.type = 'expired'
+    batches.results.return_value = iter([ok, expired])
+
+    client = AnthropicBatchClient('key')
+
+    assert client.create([{'custom_id': 'a', 'params': {}}]) == 'msgbatch_1'
+    assert client.is_done('msgbatch_1')
+    assert list(client.results('msgbatch_1')) == [
+        ('a', 'Routine: fine', None, ok.result.message.usage), ('b', None, 'expired', None)
+    ]
+
+
+def test_fake_client_ends_after_polls():
+    """Test that the fake batch endpoint answers each request once done."""
+    fake = FakeBatchClient(lambda params: params['reply'], polls_until_done=2)
+    batch_id = fake.create([
+        {'custom_id': 'a', 'params': {'reply': 'Routine: x'}},
+        {'custom_id': 'b', 'params': {'reply': None}},
+    ])
+
+    assert not fake.is_done(batch_id)
+    assert not fake.is_done(batch_id)
+    assert fake.is_done(batch_id)
+    assert list(fake.results(batch_id)) == [('a', 'Routine: x', None, None), ('b', None, 'errored', None)]
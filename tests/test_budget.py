@@ -0,0 +1,104 @@
+import pytest
+
+from inbox_classifier import budget
+from inbox_classifier.budget import Budget, BudgetExceeded, BudgetGovernor, get_governor
+
+
+class FakeClock:
+    def __init__(self, now=0.0):
+        self.now = now
+        self.slept = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+def make_governor(*budgets, max_wait=30, now=0.0):
+    clock = FakeClock(now)
+    return BudgetGovernor(list(budgets), max_wait=max_wait, clock=clock, sleep=clock.sleep), clock
+
+
+def test_window_limit_refuses_until_next_window():
+    """Test that a spent window refuses calls until the next clock-aligned window."""
+    governor, clock = make_governor(Budget(1000, 3600, burst=1), now=7200 + 100)
+    governor.acquire(600)
+
+    with pytest.raises(BudgetExceeded) as refused:
+        governor.acquire(600)
+
+    assert refused.value.retry_at == 3 * 3600
+    assert governor.blocked()
+    clock.now = 3 * 3600
+    assert not governor.blocked()
+    governor.acquire(600)
+
+
+def test_pacing_spreads_budget_across_window():
+    """Test that spending beyond the burst waits for the bucket to refill."""
+    # 3600 tokens/hour = 1 token/s; the bucket holds 10% = 360 tokens
+    governor, clock = make_governor(Budget(3600, 3600, burst=0.1))
+
+    assert governor.acquire(300) == 0
+    assert governor.acquire(70) == pytest.approx(10)
+    assert clock.slept == [pytest.approx(10)]
+
+
+def test_pacing_beyond_max_wait_is_refused():
+    """Test that a call needing a long wait is refused instead of blocking."""
+    governor, clock = make_governor(Budget(3600, 3600, burst=0.1), max_wait=5)
+    governor.acquire(360)
+
+    with pytest.raises(BudgetExceeded) as refused:
+        governor.acquire(100)
+
+    assert refused.value.retry_at == pytest.approx(100)
+    assert clock.slept == []
+    # Window limits alone still admit it (as for batch submissions)
+    governor.acquire(100, pace=False)
+
+
+def test_settle_corrects_estimate_to_actual():
+    """Test that unused estimated tokens are given back to the window."""
+    governor, _ = make_governor(Budget(1000, 86400, burst=1))
+    governor.acquire(900)
+    governor.settle(900, 300)
+
+    governor.acquire(600)
+
+    assert governor.usage()['budgets']['tokens per 86400s'] == (900, 1000)
+
+
+def test_request_budget_counts_calls():
+    """Test that request budgets charge one per call whatever its size."""
+    governor, _ = make_governor(Budget(2, 3600, kind='requests', burst=1))
+    governor.acquire(5000)
+    governor.acquire(5000)
+
+    with pytest.raises(BudgetExceeded):
+        governor.acquire(1)
+
+
+def test_estimate_is_prompt_plus_max_tokens():
+    """Test the pre-flight estimate of a rendered request."""
+    params = {'max_tokens': 40, 'messages': [{'role': 'user', 'content': 'word ' * 10}]}
+
+    assert BudgetGovernor.estimate(params) == 50
+
+
+def test_governor_from_environment(monkeypatch):
+    """Test that budgets are read from the environment, and absent budgets mean no governor."""
+    monkeypatch.setattr(budget, '_governor_loaded', False)
+    monkeypatch.setattr(budget, '_governor', None)
+    assert get_governor() is None
+
+    monkeypatch.setattr(budget, '_governor_loaded', False)
+    monkeypatch.setenv('CLAUDE_BUDGET_TOKENS_PER_DAY', '2000000')
+    monkeypatch.setenv('CLAUDE_BUDGET_REQUESTS_PER_HOUR', '600')
+    governor = get_governor()
+
+    assert [(b.name, b.limit) for b in governor.budgets] == [('tokens per day', 2_000_000), ('requests per hour', 600)]
+    assert get_governor() is governor
@@ -0,0 +1,120 @@
+import gzip
+import json
+from inbox_classifier.classification_store import SQLiteClassificationLogger, sender_domain
+
+
+def _log(store, email_id, sender='Bob <bob@Example.com>', classification='Optional'):
+    store.log_classification(
+        email_id=email_id,
+        subject='Test',
+        sender=sender,
+        to='me@example.com',
+        classification=classification,
+        reasoning='Test'
+    )
+
+
+def test_sender_domain():
+    """Test extracting the domain from From headers."""
+    assert sender_domain('Bob <bob@Example.com>') == 'example.com'
+    assert sender_domain('alice@mail.test.org') == 'mail.test.org'
+    assert sender_domain('') == ''
+
+
+def test_store_uses_wal(tmp_path):
+    """Test that the database is opened in WAL mode."""
+    store = SQLiteClassificationLogger(tmp_path / 'test.db')
+
+    mode = store._conn.execute('PRAGMA journal_mode').fetchone()[0]
+
+    assert mode == 'wal'
+    store.close()
+
+
+def test_store_buffers_until_flush(tmp_path):
+    """Test that entries are inserted in one batch on flush."""
+    store = SQLiteClassificationLogger(tmp_path / 'test.db', max_buffered=10)
+
+    _log(store, 'msg1')
+    assert store.find_by_email_id('msg1') == []
+
+    store.flush()
+
+    rows = store.find_by_email_id('msg1')
+    assert len(rows) == 1
+    assert rows[0]['sender_domain'] == 'example.com'
+    assert rows[0]['to_addr'] == 'me@example.com'
+    store.close()
+
+
+def test_store_queries_by_domain_and_category(tmp_path):
+    """Test indexed lookups by sender domain and category."""
+    db = tmp_path / 'test.db'
+    store = SQLiteClassificationLogger(db)
+    _log(store, 'msg1', sender='news@shop.com', classification='Optional')
+    _log(store, 'msg2', sender='boss@work.com', classification='Important')
+    _log(store, 'msg3', sender='deals@SHOP.com', classification='Optional')
+    store.close()
+
+    store = SQLiteClassificationLogger(db)
+    assert [r['email_id'] for r in store.find_by_sender_domain('shop.com')] == ['msg1', 'msg3']
+    assert [r['email_id'] for r in store.find_by_category('Important')] == ['msg2']
+    assert store.find_by_sender_domain('shop.com', since='2999-01-01') == []
+    store.close()
+
+
+def test_import_jsonl_reads_all_segments_once(tmp_path):
+    """Test that the JSONL importer reads rotated segments and runs only once."""
+    log_file = tmp_path / 'classifications.jsonl'
+    old = {'timestamp': '2026-02-12T10:00:00', 'email_id': 'old', 'sender': 'a@old.com',
+           'subject': 'S', 'to': 'me', 'classification': 'Routine', 'reasoning': 'R'}
+    new = dict(old, timestamp='2026-02-13T10:00:00', email_id='new')
+    with gzip.open(tmp_path / 'classifications-2026-02-12.jsonl.gz', 'wt') as f:
+        f.write(json.dumps(old) + '\n')
+    log_file.write_text(json.dumps(new) + '\n')
+
+    store = SQLiteClassificationLogger(tmp_path / 'test.db')
+
+    assert store.import_jsonl(log_file) == 2
+    assert store.import_jsonl(log_file) == 0
+    assert [r['email_id'] for r in store.find_by_sender_domain('old.com')] == ['old', 'new']
+    store.close()
+
+
+def test_records_deciding_model_and_migrates_old_databases(tmp_path):
+    """Test that the model column is added to databases created before it existed."""
+    import sqlite3
+    db = tmp_path / 'classifications.db'
+    conn = sqlite3.connect(db)
+    conn.execute(
+        'CREATE TABLE classifications (id INTEGER PRIMARY KEY, timestamp TEXT NOT NULL, '
+        'email_id TEXT NOT NULL, subject TEXT, sender TEXT, sender_domain TEXT, to_addr TEXT, '
+        'classification TEXT, reasoning TEXT)'
+    )
+    conn.close()
+
+    store = SQLiteClassificationLogger(db)
+    store.log_classification('msg1', 'S', 'a@b.com', 'me', 'Routine', 'r', model='claude-haiku-4-5')
+    store.flush()
+
+    assert store.find_by_email_id('msg1')[0]['model'] == 'claude-haiku-4-5'
+    store.close()
+
+
+def test_records_usage_columns(tmp_path):
+    """Test that token counts, cost and latency are stored and imported from JSONL."""
+    log = tmp_path / 'classifications.jsonl'
+    usage = {'input_tokens': 900, 'output_tokens': 12, 'cache_read_tokens': 0, 'cache_write_tokens': 0}
+    log.write_text(json.dumps({
+        'timestamp': '2026-02-01T00:00:00', 'email_id': 'old', 'sender': 'a@b.com',
+        'classification': 'Routine', 'reasoning': 'r', 'usage': usage, 'cost': 0.001, 'latency': 0.5
+    }) + '\n')
+    store = SQLiteClassificationLogger(tmp_path / 'classifications.db')
+    store.import_jsonl(log)
+    store.log_classification('new', 'S', 'a@b.com', 'me', 'Routine', 'r', usage=usage, cost=0.002, latency=0.3)
+    store.flush()
+
+    old, new = store.find_by_email_id('old')[0], store.find_by_email_id('new')[0]
+    assert (old['input_tokens'], old['output_tokens'], old['cost']) == (900, 12, 0.001)
+    assert (new['input_tokens'], new['cost'], new['latency']) == (900, 0.002, 0.3)
+    store.close()
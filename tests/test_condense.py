@@ -0,0 +1,110 @@
+from inbox_classifier.condense import (
+    condense, estimate_tokens, fill_budget, strip_boilerplate, strip_quotes, strip_signature
+)
+
+
+def test_strips_on_wrote_reply_history():
+    """Test that an 'On ... wrote:' block and everything after is removed."""
+    text = (
+        "Sounds good, see you then.\n\n"
+        "On Mon, Mar 2, 2026 at 9:14 AM Sam Lee <sam@example.com>\n"
+        "wrote:\n"
+        "> Shall we meet Thursday?\n"
+    )
+
+    assert strip_quotes(text).strip() == 'Sounds good, see you then.'
+
+
+def test_strips_outlook_original_message():
+    """Test that Outlook-style headers start quoted history."""
+    text = "Approved.\n\nFrom: Finance <f@example.com>\nSent: Monday\nSubject: PO 12\n\nPlease approve."
+
+    assert strip_quotes(text).strip() == 'Approved.'
+
+
+def test_keeps_body_with_unrelated_from_and_date_lines():
+    """Test that a 'From:' line only starts quoted history when a Sent:/Date: line follows it directly."""
+    text = (
+        "From: the editors\n\n"
+        "This week's picks are below.\n\n"
+        "Date: Saturday at the park\n"
+    )
+
+    assert strip_quotes(text) == text.rstrip('\n')
+
+
+def test_keeps_body_after_underscore_rule():
+    """Test that a rule of underscores alone (common in newsletters) doesn't cut the body."""
+    text = "Top story\n" + "_" * 30 + "\nSecond story"
+
+    assert strip_quotes(text) == text
+
+
+def test_strips_outlook_header_under_rule():
+    """Test that Outlook's rule followed by its header block starts quoted history."""
+    text = "Approved.\n" + "_" * 32 + "\nFrom: Finance <f@example.com>\nSent: Monday\n\nPlease approve."
+
+    assert strip_quotes(text).strip() == 'Approved.'
+
+
+def test_strips_quoted_lines():
+    """Test that inline '>' quotes are dropped but replies kept."""
+    text = "> question one?\nanswer one\n> question two?\nanswer two"
+
+    assert strip_quotes(text) == 'answer one\nanswer two'
+
+
+def test_strips_signature():
+    """Test that '-- ' signatures and 'Sent from my' lines are removed."""
+    text = "Running late.\nSent from my iPhone\n-- \nAlex Smith\nDirector"
+
+    assert strip_signature(text) == 'Running late.'
+
+
+def test_strips_boilerplate():
+    """Test that newsletter and legal boilerplate lines are removed."""
+    text = (
+        "View this email in your browser\n"
+        "Your March statement is ready.\n"
+        "Unsubscribe | Manage preferences\n"
+        "This email and any attachments are confidential.\n"
+        "© 2026 Example Bank. All rights reserved."
+    )
+
+    assert strip_boilerplate(text) == 'Your March statement is ready.'
+
+
+def test_estimate_tokens():
+    """Test the local token estimate on ordinary text."""
+    assert estimate_tokens('') == 0
+    assert estimate_tokens('Hello, world!') == 6
+    assert 8 <= estimate_tokens('The quick brown fox jumps over the lazy dog.') <= 14
+
+
+def test_fill_budget_cuts_at_word_boundary():
+    """Test that the output fits the budget and ends on a whole word."""
+    text = 'alpha beta gamma delta epsilon'
+
+    assert fill_budget(text, 5) == 'alpha beta gamma'
+    assert fill_budget('x' * 100, 5) == 'x' * 20
+
+
+def test_condense_keeps_real_content_within_budget():
+    """Test that content after boilerplate survives where a plain cut would lose it."""
+    text = (
+        "View in browser\n"
+        "Your package will arrive tomorrow between 9 and 11.\n\n"
+        "Thanks,\nShop\n-- \nShop Inc, 1 Main St\n\n"
+        "On Tue, Mar 3, 2026 Shop <noreply@shop.com> wrote:\n> earlier update\n"
+    )
+
+    assert condense(text, token_budget=80) == (
+        'Your package will arrive tomorrow between 9 and 11.\nThanks,\nShop'
+    )
+
+
+def test_condense_falls_back_when_everything_is_quoted():
+    """Test that a bare forward still yields some text."""
+    text = "> only quoted\n> lines here"
+
+    assert condense(text, token_budget=80) == text
@@ -0,0 +1,114 @@
+from types import SimpleNamespace
+
+import pytest
+
+from inbox_classifier.costs import (
+    SpendAggregator, call_cost, call_usage, format_spend_report, price_for, read_db_spend, summarize
+)
+
+
+def test_price_matches_longest_model_prefix():
+    """Test that dated snapshots get their family's price and unknown models the default."""
+    assert price_for('claude-sonnet-4-5-20250929') == price_for('claude-sonnet-4-5')
+    assert price_for('claude-opus-4-5')[0] == 5.00
+    assert price_for('claude-opus-4-1')[0] == 15.00
+    assert price_for('some-future-model') == price_for('claude-sonnet-4-5')
+
+
+def test_call_usage_reads_api_usage():
+    """Test that API usage fields are mapped, and missing ones count as zero."""
+    usage = SimpleNamespace(input_tokens=1000, output_tokens=10, cache_read_input_tokens=None)
+
+    call = call_usage('claude-haiku-4-5', usage)
+
+    assert call == {'model': 'claude-haiku-4-5', 'batch': False, 'input_tokens': 1000,
+                    'output_tokens': 10, 'cache_read_tokens': 0, 'cache_write_tokens': 0}
+    assert call_usage('claude-haiku-4-5')['input_tokens'] == 0
+
+
+def test_cost_per_model_with_batch_discount():
+    """Test that each call is priced at its own model's rate, batches at half price."""
+    small = call_usage('claude-haiku-4-5', SimpleNamespace(input_tokens=1_000_000, output_tokens=0))
+    large = call_usage('claude-sonnet-4-5', SimpleNamespace(input_tokens=0, output_tokens=1_000_000),
+                       batch=True)
+
+    assert call_cost(small) == pytest.approx(1.00)
+    assert call_cost(large) == pytest.approx(7.50)
+    assert summarize([small, large]) == {
+        'input_tokens': 1_000_000, 'output_tokens': 1_000_000,
+        'cache_read_tokens': 0, 'cache_write_tokens': 0, 'cost': pytest.approx(8.50),
+    }
+
+
+def entry(day, sender, category, cost, input_tokens=100):
+    return {'timestamp': f'{day}T10:00:00', 'sender': sender, 'classification': category,
+            'usage': {'input_tokens': input_tokens, 'output_tokens': 5}, 'cost': cost}
+
+
+def test_aggregator_totals_per_day_sender_and_category():
+    """Test spend grouped by day, sender address and category."""
+    aggregator = SpendAggregator()
+    aggregator.add(entry('2026-03-01', 'Shop <deals@shop.com>', 'Optional', 0.002))
+    aggregator.add(entry('2026-03-01', 'deals@shop.com', 'Optional', 0.003))
+    aggregator.add(entry('2026-03-02', 'boss@work.com', 'Important', 0.001))
+    aggregator.add({'timestamp': '2026-03-02T11:00:00', 'sender': 'boss@work.com', 'classification': 'Important'})
+
+    assert aggregator.by_day()['2026-03-01']['cost'] == pytest.approx(0.005)
+    assert aggregator.by_day()['2026-03-02']['emails'] == 2
+    assert aggregator.by_sender()['deals@shop.com']['input_tokens'] == 200
+    assert aggregator.by_category()['Important']['cost'] == pytest.approx(0.001)
+
+
+def test_aggregator_drops_days_outside_window():
+    """Test that the window rolls forward as newer days arrive."""
+    aggregator = SpendAggregator(days=2)
+    aggregator.add(entry('2026-03-01', 'a@x.com', 'Routine', 0.001))
+    aggregator.add(entry('2026-03-02', 'a@x.com', 'Routine', 0.001))
+    aggregator.add(entry('2026-03-03', 'a@x.com', 'Routine', 0.001))
+    aggregator.add(entry('2026-03-01', 'a@x.com', 'Routine', 0.001))
+
+    assert list(aggregator.by_day()) == ['2026-03-02', '2026-03-03']
+
+
+def test_hot_senders_ranked_by_cost_with_consistency():
+    """Test that the costliest senders come first, with their dominant category share."""
+    aggregator = SpendAggregator()
+    for _ in range(3):
+        aggregator.add(entry('2026-03-01', 'news@letter.com', 'Optional', 0.004))
+    aggregator.add(entry('2026-03-01', 'news@letter.com', 'Routine', 0.004))
+    aggregator.add(entry('2026-03-01', 'friend@home.com', 'Important', 0.001))
+
+    hot = aggregator.hot_senders(top=1)
+
+    assert hot == [{'sender': 'news@letter.com', 'emails': 4, 'cost': pytest.approx(0.016),
+                    'category': 'Optional', 'share': 0.75}]
+    assert 'news@letter.com' in format_spend_report(aggregator)
+
+
+def test_spend_read_from_sqlite_store(tmp_path, capsys, monkeypatch):
+    """Test that with the SQLite store selected, costs totals the database over the window."""
+    import json
+    from inbox_classifier.classification_store import SQLiteClassificationLogger
+    from inbox_classifier.cli import main
+    log_file = tmp_path / 'classifications.jsonl'
+    log_file.write_text(''.join(json.dumps(e) + '\n' for e in [
+        entry('2026-03-01', 'a@x.com', 'Routine', 0.001),
+        entry('2026-03-05', 'Shop <deals@shop.com>', 'Optional', 0.002),
+        entry('2026-03-06', 'deals@shop.com', 'Optional', 0.003),
+    ]))
+    store = SQLiteClassificationLogger(tmp_path / 'classifications.db')
+    store.import_jsonl(log_file)
+    store.close()
+
+    aggregator = SpendAggregator(days=2)
+    read_db_spend(aggregator, tmp_path / 'classifications.db')
+
+    assert list(aggregator.by_day()) == ['2026-03-05', '2026-03-06']
+    assert aggregator.by_sender()['deals@shop.com']['emails'] == 2
+    assert aggregator.by_sender()['deals@shop.com']['input_tokens'] == 200
+    assert aggregator.by_category()['Optional']['cost'] == pytest.approx(0.005)
+
+    monkeypatch.setenv('CLASSIFICATION_STORE', 'sqlite')
+    log_file.unlink()
+    main(['costs', '--db', str(tmp_path / 'classifications.db'), '--log', str(log_file)])
+    assert '3 emails, $0.0060' in capsys.readouterr().out
@@ -80,8 +80,9 @@ def test_get_email_details_handles_multipart():
 
     assert 'Multipart body' in details['body']
 
-def test_get_email_details_truncates_body():
-    """Test that body is truncated to 300 characters."""
+def test_get_email_details_truncates_body(monkeypatch):
+    """Test that body is truncated to the token budget (75 tokens ~ 300 characters)."""
+    monkeypatch.setenv('BODY_TOKEN_BUDGET', '75')
     long_text = 'A' * 500
     encoded = base64.urlsafe_b64encode(long_text.encode()).decode()
 
@@ -102,3 +103,55 @@ def test_get_email_details_truncates_body():
 
     assert len(details['body']) == 300
     assert details['body'] == 'A' * 300
+
+def test_get_email_details_handles_nested_multipart():
+    """Test that text inside multipart/alternative within multipart/mixed is found."""
+    mock_service = Mock()
+    mock_service.users().messages().get().execute.return_value = {
+        'id': 'msg1',
+        'payload': {
+            'mimeType': 'multipart/mixed',
+            'headers': [{'name': 'Subject', 'value': 'Nested'}],
+            'parts': [
+                {
+                    'mimeType': 'multipart/alternative',
+                    'parts': [
+                        {'mimeType': 'text/plain', 'body': {'data': base64.urlsafe_b64encode(b'Nested body').decode()}},
+                    ]
+                },
+                {'mimeType': 'application/pdf', 'filename': 'a.pdf', 'body': {'attachmentId': 'att1'}},
+            ]
+        },
+        'labelIds': ['INBOX']
+    }
+
+    details = get_email_details(mock_service, 'msg1')
+
+    assert details['body'] == 'Nested body'
+
+def test_fetch_unread_emails_follows_pages(monkeypatch):
+    """Test that result pages are followed up to FETCH_LIMIT."""
+    monkeypatch.setenv('FETCH_LIMIT', '3')
+    mock_service = Mock()
+    mock_service.users().messages().list().execute.side_effect = [
+        {'messages': [{'id': 'msg1'}, {'id': 'msg2'}], 'nextPageToken': 'page2'},
+        {'messages': [{'id': 'msg3'}, {'id': 'msg4'}], 'nextPageToken': 'page3'},
+    ]
+
+    messages = fetch_unread_emails(mock_service)
+
+    assert [m['id'] for m in messages] == ['msg1', 'msg2', 'msg3']
+    assert mock_service.users().messages().list.call_args.kwargs['pageToken'] == 'page2'
+
+def test_fetch_unread_emails_leaves_out_excluded_ids(monkeypatch):
+    """Test that excluded IDs are dropped without using up FETCH_LIMIT."""
+    monkeypatch.setenv('FETCH_LIMIT', '2')
+    mock_service = Mock()
+    mock_service.users().messages().list().execute.side_effect = [
+        {'messages': [{'id': 'msg1'}, {'id': 'msg2'}], 'nextPageToken': 'page2'},
+        {'messages': [{'id': 'msg3'}]},
+    ]
+
+    messages = fetch_unread_emails(mock_service, exclude_ids={'msg1'})
+
+    assert [m['id'] for m in messages] == ['msg2', 'msg3']
@@ -1,5 +1,5 @@
 from unittest.mock import Mock
-from inbox_classifier.email_labeler import apply_label
+from inbox_classifier.email_labeler import apply_label, apply_label_batch, quarantine_message
 
 def test_apply_label_adds_label_to_message():
     """Test applying label to email and archiving."""
@@ -20,3 +20,35 @@ def test_apply_label_adds_label_to_message():
             'removeLabelIds': ['INBOX']
         }
     )
+
+
+def test_quarantine_message_labels_and_marks_read():
+    """Test that quarantined messages stay in the inbox but are marked read."""
+    mock_service = Mock()
+
+    quarantine_message(mock_service, 'msg1', 'Label_Q')
+
+    mock_service.users().messages().modify.assert_called_with(
+        userId='me',
+        id='msg1',
+        body={
+            'addLabelIds': ['Label_Q'],
+            'removeLabelIds': ['UNREAD']
+        }
+    )
+
+
+def test_apply_label_batch_uses_batch_modify():
+    """Test labeling and archiving several messages in one call."""
+    mock_service = Mock()
+
+    apply_label_batch(mock_service, ['msg1', 'msg2'], 'Label_123')
+
+    mock_service.users().messages().batchModify.assert_called_with(
+        userId='me',
+        body={
+            'ids': ['msg1', 'msg2'],
+            'addLabelIds': ['Label_123'],
+            'removeLabelIds': ['INBOX']
+        }
+    )
@@ -0,0 +1,98 @@
+import pytest
+from googleapiclient.errors import HttpError
+from unittest.mock import patch
+
+import fakes
+from fakes import FakeAnthropic, FakeGmail, TokenBucket
+from inbox_classifier import ai_classifier
+from inbox_classifier.accounts import Account
+from inbox_classifier.email_fetcher import fetch_unread_emails, get_email_details
+from inbox_classifier.email_labeler import apply_label_batch
+from inbox_classifier.main import process_emails
+from synthetic import Mailbox
+
+
+@pytest.fixture
+def gmail(monkeypatch):
+    """A FakeGmail served through gmail_client.execute, as in production."""
+    monkeypatch.setenv('GMAIL_QUOTA_UNITS_PER_SECOND', '1000000')
+    with patch('inbox_classifier.gmail_client.thread_http', fakes.thread_http):
+        yield FakeGmail(Mailbox(40, seed=1), units_per_second=10**6)
+
+
+def test_mailbox_is_deterministic():
+    """Test that the same size and seed give the same mailbox."""
+    assert Mailbox(50, seed=3).messages == Mailbox(50, seed=3).messages
+    assert Mailbox(50, seed=3).messages != Mailbox(50, seed=4).messages
+
+
+def test_fake_gmail_serves_listing_and_details(gmail):
+    """Test that messages list, decode and disappear from the query once labeled."""
+    service = gmail.service()
+    messages = fetch_unread_emails(service, exclude_labels=['Important'])
+    assert len(messages) == 40
+
+    details = get_email_details(service, messages[0]['id'])
+    assert details['subject']
+    assert gmail.mailbox.category_of(details['sender']) in ('Important', 'Routine', 'Optional')
+
+    apply_label_batch(service, [m['id'] for m in messages[:10]], 'Label_1')
+    assert len(fetch_unread_emails(service)) == 30
+    assert len(gmail.labeled_at) == 10
+    assert gmail.calls['gmail.users.messages.get'] == 1
+
+
+def test_fake_gmail_rate_limits_over_quota(gmail, monkeypatch):
+    """Test that calls beyond the per-second quota get a 429 rateLimitExceeded."""
+    monkeypatch.setenv('RETRY_DEADLINE', '0')
+    gmail.quota = TokenBucket(5, clock=lambda: 0.0)
+    service = gmail.service()
+    get_email_details(service, gmail.mailbox.messages[0][0])
+
+    with pytest.raises(HttpError) as error:
+        get_email_details(service, gmail.mailbox.messages[1][0])
+
+    assert error.value.resp.status == 429
+    assert 'rateLimitExceeded' in str(error.value.content)
+
+
+def test_fake_gmail_delivers_new_mail(monkeypatch):
+    """Test that mail arrives on delivery, recycling the mailbox under new IDs, and archived mail is forgotten."""
+    monkeypatch.setenv('GMAIL_QUOTA_UNITS_PER_SECOND', '1000000')
+    monkeypatch.setattr('inbox_classifier.gmail_client.thread_http', fakes.thread_http)
+    gmail = FakeGmail(Mailbox(3, seed=1), units_per_second=10**6, delivered=0)
+    service = gmail.service()
+    assert fetch_unread_emails(service) == []
+
+    gmail.deliver(4)
+    messages = fetch_unread_emails(service)
+    assert len({m['id'] for m in messages}) == 4
+    # The fourth message is the first one again, under its own ID
+    assert get_email_details(service, messages[3]['id'])['subject'] == \
+        get_email_details(service, messages[0]['id'])['subject']
+
+    apply_label_batch(service, [messages[0]['id']], 'Label_1')
+    assert gmail.expunge_archived() == 1
+    assert gmail.unlabeled() == 3 and not gmail.labeled_at
+
+
+@pytest.mark.parametrize('threshold', ['0', '10'])
+def test_process_emails_end_to_end(gmail, threshold, tmp_path, monkeypatch):
+    """Test that a synthetic backlog is fully labeled, in real time and via batches."""
+    monkeypatch.setenv('ANTHROPIC_API_KEY', 'key')
+    monkeypatch.setenv('BATCH_THRESHOLD', threshold)
+    monkeypatch.setenv('CLASSIFIER_MODELS', 'model')
+    claude = FakeAnthropic(mailbox=gmail.mailbox)
+    monkeypatch.setattr(ai_classifier, 'Anthropic', claude)
+    monkeypatch.setattr('inbox_classifier.main.get_gmail_service', lambda token_path=None: gmail.service())
+    ai_classifier._clients.clear()
+    account = Account('default', tmp_path)
+
+    process_emails([account])
+    if threshold != '0':
+        assert claude.calls['batch_requests'] == 40
+        process_emails([account])
+
+    assert gmail.unlabeled() == 0
+    assert len(gmail.labeled_at) == 40
+    assert gmail.calls['gmail.users.messages.get'] == 40
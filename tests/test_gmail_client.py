@@ -0,0 +1,58 @@
+import threading
+from unittest.mock import Mock
+from inbox_classifier.gmail_client import execute, thread_http
+
+
+def test_execute_passes_thread_transport():
+    """Test that requests run on the calling thread's transport."""
+    request = Mock()
+    request.execute.return_value = {'id': 'msg1'}
+
+    result = execute(request)
+
+    assert result == {'id': 'msg1'}
+    http = request.execute.call_args.kwargs['http']
+    assert http.credentials is request.http.credentials
+
+
+def test_thread_http_is_per_thread():
+    """Test that each thread gets its own connection pool."""
+    credentials = Mock()
+    seen = []
+
+    def worker():
+        seen.append(thread_http(credentials))
+
+    threads = [threading.Thread(target=worker) for _ in range(2)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert seen[0] is not seen[1]
+    assert seen[0].http is not seen[1].http
+    assert thread_http(credentials) is thread_http(credentials)
+
+
+def test_thread_http_keeps_one_transport_per_user():
+    """Test that credentials rebuilt every cycle replace the user's cached transport."""
+    from inbox_classifier import gmail_client
+    first, second = Mock(refresh_token='user-1'), Mock(refresh_token='user-1')
+
+    thread_http(first)
+    http = thread_http(second)
+
+    assert http.credentials is second
+    assert [h.credentials for h in gmail_client._thread_local.authorized.values()].count(first) == 0
+
+
+def test_execute_charges_quota(monkeypatch):
+    """Test that each request is charged to its user's quota before running."""
+    request = Mock()
+    request.methodId = 'gmail.users.messages.get'
+    scheduler = Mock()
+    monkeypatch.setattr('inbox_classifier.gmail_client.scheduler_for', lambda credentials: scheduler)
+
+    execute(request)
+
+    scheduler.acquire.assert_called_once_with('gmail.users.messages.get')
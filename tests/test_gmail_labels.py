@@ -135,8 +135,9 @@ def test_ensure_labels_exist_mixed_scenario():
     # Verify create was called twice (for Routine and Optional)
     assert mock_labels.create.call_count == 2
 
-def test_get_label_id_handles_api_error():
+def test_get_label_id_handles_api_error(monkeypatch):
     """Test that get_label_id handles HttpError gracefully."""
+    monkeypatch.setenv('RETRY_DEADLINE', '0')  # 500s are retried; give up at once
     mock_service = Mock()
     mock_error = HttpError(resp=Mock(status=500), content=b'Server Error')
     mock_service.users().labels().list().execute.side_effect = mock_error
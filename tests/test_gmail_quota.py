@@ -0,0 +1,79 @@
+import threading
+import time
+from unittest.mock import Mock
+
+from inbox_classifier.gmail_quota import QuotaScheduler, scheduler_for
+
+GET = 'gmail.users.messages.get'
+MODIFY = 'gmail.users.messages.modify'
+BATCH = 'gmail.users.messages.batchModify'
+
+
+def test_bursts_within_bucket_do_not_wait():
+    """Test that calls up to one second's budget go straight through."""
+    scheduler = QuotaScheduler(units_per_second=100)
+
+    waited = [scheduler.acquire(GET) for _ in range(20)]
+
+    assert max(waited) < 0.05
+    usage = scheduler.usage()
+    assert usage['units'] == 100
+    assert usage['calls'] == 20
+
+
+def test_sustained_usage_is_throttled_to_rate():
+    """Test that calls beyond the bucket wait for units to refill."""
+    scheduler = QuotaScheduler(units_per_second=100)
+    scheduler.acquire(BATCH)
+    scheduler.acquire(BATCH)
+
+    start = time.monotonic()
+    scheduler.acquire(BATCH)  # needs 50 more units: ~0.5s at 100 units/s
+
+    assert 0.4 < time.monotonic() - start < 1.0
+    assert scheduler.usage()['waited_seconds'] > 0.4
+
+
+def test_unknown_methods_use_default_cost():
+    """Test that methods without a known cost are still charged."""
+    scheduler = QuotaScheduler()
+
+    scheduler.acquire('gmail.users.something.new')
+
+    assert scheduler.usage()['units'] == 5
+
+
+def test_waiting_calls_are_served_by_priority():
+    """Test that label/modify calls overtake queued message downloads."""
+    scheduler = QuotaScheduler(units_per_second=50)
+    scheduler.acquire(BATCH)  # drain the bucket
+    order = []
+
+    def call(method_id):
+        scheduler.acquire(method_id)
+        order.append(method_id)
+
+    getter = threading.Thread(target=call, args=(GET,))
+    getter.start()
+    while scheduler.usage()['waiting'] < 1:
+        time.sleep(0.001)
+    modifier = threading.Thread(target=call, args=(MODIFY,))
+    modifier.start()
+    getter.join()
+    modifier.join()
+
+    assert order == [MODIFY, GET]
+
+
+def test_scheduler_is_shared_per_user(monkeypatch):
+    """Test that rebuilt credentials for the same user share one budget."""
+    monkeypatch.setenv('GMAIL_QUOTA_UNITS_PER_SECOND', '100')
+    monkeypatch.setenv('GMAIL_QUOTA_HEADROOM', '0.5')
+
+    first = scheduler_for(Mock(refresh_token='token-a'))
+    again = scheduler_for(Mock(refresh_token='token-a'))
+    other = scheduler_for(Mock(refresh_token='token-b'))
+
+    assert first is again
+    assert first is not other
+    assert first.rate == 50
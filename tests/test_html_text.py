@@ -0,0 +1,62 @@
+from inbox_classifier.html_text import TextExtractor, html_to_text
+
+
+def test_extracts_visible_text_and_decodes_entities():
+    """Test that tags are dropped and entities decoded."""
+    html = '<html><body><h1>Sale</h1><p>Save 20% &amp; more&nbsp;today</p></body></html>'
+
+    assert html_to_text(html) == 'Sale\nSave 20% & more today'
+
+
+def test_drops_script_style_and_head():
+    """Test that non-visible elements contribute no text."""
+    html = (
+        '<head><title>Newsletter</title><style>.a{color:red}</style></head>'
+        '<body><script>track()</script><noscript>Enable JS</noscript>Hello</body>'
+    )
+
+    assert html_to_text(html) == 'Hello'
+
+
+def test_drops_hidden_preheaders():
+    """Test that display:none preheaders and hidden elements are skipped."""
+    html = (
+        '<div style="display: none; max-height:0">Preview text &zwnj;&nbsp;&zwnj;</div>'
+        '<span hidden>secret</span>'
+        '<div><div>nested</div> visible</div>'
+        '<img src="https://t.example.com/open.gif" width="1" height="1">'
+    )
+
+    assert html_to_text(html) == 'nested\nvisible'
+
+
+def test_nested_hidden_elements_end_correctly():
+    """Test that skipping resumes after the hidden element's own end tag."""
+    html = '<div style="display:none"><div>a</div><div>b</div></div>shown'
+
+    assert html_to_text(html) == 'shown'
+
+
+def test_stops_after_max_chars():
+    """Test that output is capped and later chunks are never parsed."""
+    consumed = []
+
+    def chunks():
+        for i in range(1000):
+            consumed.append(i)
+            yield f'<p>paragraph number {i}</p>'
+
+    text = html_to_text(chunks(), max_chars=50)
+
+    assert len(text) == 50
+    assert text.startswith('paragraph number 0')
+    assert len(consumed) < 10
+
+
+def test_extractor_marks_done():
+    """Test that the extractor reports when its budget is used."""
+    parser = TextExtractor(max_chars=5)
+    parser.feed('<p>abc</p>')
+    assert not parser.done
+    parser.feed('<p>defgh</p>')
+    assert parser.done
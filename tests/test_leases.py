@@ -0,0 +1,143 @@
+import multiprocessing
+import time
+
+from inbox_classifier.accounts import Account
+from inbox_classifier.leases import MemoryLeaseStore, SQLiteLeaseStore, ShardManager
+
+NAMES = ['a', 'b', 'c', 'd', 'e', 'f']
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_accounts(tmp_path):
+    return [Account(name, tmp_path / name) for name in NAMES]
+
+
+def served(manager):
+    return {account.name for account in manager.rebalance()}
+
+
+def test_single_worker_takes_every_account(tmp_path):
+    """A lone worker serves all accounts."""
+    manager = ShardManager(MemoryLeaseStore(), 'w1', make_accounts(tmp_path), clock=FakeClock())
+
+    assert served(manager) == set(NAMES)
+
+
+def test_joining_worker_gets_a_fair_share(tmp_path):
+    """Accounts are split disjointly once a second worker joins."""
+    store, clock = MemoryLeaseStore(), FakeClock()
+    w1 = ShardManager(store, 'w1', make_accounts(tmp_path), clock=clock)
+    w2 = ShardManager(store, 'w2', make_accounts(tmp_path), clock=clock)
+    served(w1)
+
+    # w2 registers; w1 gives back its surplus; w2 picks it up
+    assert served(w2) == set()
+    first = served(w1)
+    second = served(w2)
+
+    assert len(first) == len(second) == 3
+    assert first | second == set(NAMES)
+    assert first & second == set()
+
+
+def test_dead_workers_accounts_move_after_ttl(tmp_path):
+    """Leases of a worker that stops heartbeating expire and are taken over."""
+    store, clock = MemoryLeaseStore(), FakeClock()
+    w1 = ShardManager(store, 'w1', make_accounts(tmp_path), ttl=60, clock=clock)
+    w2 = ShardManager(store, 'w2', make_accounts(tmp_path), ttl=60, clock=clock)
+    served(w1)
+    served(w2)
+    served(w1)
+    served(w2)
+
+    clock.now += 30
+    assert len(served(w2)) == 3  # w1's leases are still valid
+
+    clock.now += 31
+    assert served(w2) == set(NAMES)
+
+
+def test_leases_renewed_through_long_sleeps_but_not_stalls(tmp_path):
+    """Test that a sleep longer than max_stall (quiet hours) keeps leases, and an overdue cycle lets them lapse."""
+    clock = FakeClock()
+    store = MemoryLeaseStore()
+    w1 = ShardManager(store, 'w1', make_accounts(tmp_path), ttl=60, max_stall=300, clock=clock)
+    served(w1)
+
+    w1.beat(sleep=900)
+    clock.now += 850
+    assert w1.renew()
+    assert set(store.owners(clock.now).values()) == {'w1'}
+
+    clock.now += 50 + 301
+    assert not w1.renew()
+    clock.now += 61
+    assert store.owners(clock.now) == {}
+
+
+def test_stop_releases_leases_immediately(tmp_path):
+    """A clean shutdown hands accounts over without waiting for the TTL."""
+    store, clock = MemoryLeaseStore(), FakeClock()
+    w1 = ShardManager(store, 'w1', make_accounts(tmp_path), clock=clock)
+    w2 = ShardManager(store, 'w2', make_accounts(tmp_path), clock=clock)
+    served(w1)
+    served(w2)
+
+    w1.stop()
+
+    assert served(w2) == set(NAMES)
+
+
+def test_sqlite_claim_is_exclusive_until_expiry(tmp_path):
+    """Only the owner can renew an unexpired lease."""
+    store = SQLiteLeaseStore(tmp_path / 'leases.db')
+
+    assert store.claim('a', 'w1', now=0, expires_at=100)
+    assert not store.claim('a', 'w2', now=50, expires_at=150)
+    assert store.claim('a', 'w1', now=50, expires_at=150)
+    assert store.claim('a', 'w2', now=151, expires_at=250)
+    assert store.owners(now=200) == {'a': 'w2'}
+    store.close()
+
+
+def _run_worker(db_path, worker_id, base_dir, results):
+    accounts = [Account(name, base_dir) for name in NAMES]
+    manager = ShardManager(SQLiteLeaseStore(db_path), worker_id, accounts, ttl=5)
+    deadline = time.time() + 20
+    while time.time() < deadline:
+        held = {account.name for account in manager.rebalance()}
+        results[worker_id] = sorted(held)
+        if sum(len(v) for v in results.values()) == len(NAMES) and len(results) == 3:
+            time.sleep(0.5)
+            break
+        time.sleep(0.05)
+    results[worker_id] = sorted(account.name for account in manager.rebalance())
+
+
+def test_processes_share_accounts_through_sqlite(tmp_path):
+    """Several local worker processes converge on disjoint, complete coverage."""
+    manager = multiprocessing.Manager()
+    results = manager.dict()
+    workers = [
+        multiprocessing.Process(
+            target=_run_worker, args=(tmp_path / 'leases.db', f'w{n}', tmp_path, results)
+        )
+        for n in range(3)
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(timeout=30)
+
+    held = [set(names) for names in results.values()]
+    assert len(held) == 3
+    assert set().union(*held) == set(NAMES)
+    assert sum(len(h) for h in held) == len(NAMES)
+    assert all(len(h) == 2 for h in held)
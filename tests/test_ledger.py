@@ -0,0 +1,207 @@
+import sqlite3
+import time
+from inbox_classifier.ledger import ProcessedLedger
+
+EMAIL = {'id': 'msg1', 'subject': 'Receipt', 'sender': 'shop@shop.com', 'to': 'me@example.com', 'body': 'x'}
+RESULT = {'classification': 'Routine', 'reasoning': 'A receipt'}
+
+
+def test_unknown_message_returns_none(tmp_path):
+    """Test that messages never seen have no entry."""
+    ledger = ProcessedLedger(tmp_path / 'ledger.db')
+
+    assert ledger.get('msg1') is None
+    ledger.close()
+
+
+def test_state_transitions_persist(tmp_path):
+    """Test that each step survives reopening the ledger."""
+    db = tmp_path / 'ledger.db'
+    ledger = ProcessedLedger(db)
+    ledger.mark_fetched('msg1')
+    ledger.mark_classified(EMAIL, RESULT)
+    ledger.close()
+
+    ledger = ProcessedLedger(db)
+    entry = ledger.get('msg1')
+
+    assert entry['state'] == 'classified'
+    assert entry['classification'] == 'Routine'
+    assert entry['reasoning'] == 'A receipt'
+    assert entry['email'] == {'id': 'msg1', 'subject': 'Receipt', 'sender': 'shop@shop.com', 'to': 'me@example.com'}
+    ledger.close()
+
+
+def test_pending_logs_lists_labeled_messages(tmp_path):
+    """Test that labeled-but-unlogged messages are reported until logged."""
+    ledger = ProcessedLedger(tmp_path / 'ledger.db')
+    ledger.mark_classified(EMAIL, RESULT)
+    ledger.mark_labeled('msg1')
+
+    assert [e['email_id'] for e in ledger.pending_logs()] == ['msg1']
+
+    ledger.mark_logged(['msg1'])
+
+    assert ledger.pending_logs() == []
+    assert ledger.get('msg1')['state'] == 'logged'
+    ledger.close()
+
+
+def test_mark_fetched_discards_old_verdict(tmp_path):
+    """Test that reprocessing a message (e.g. after reset) starts fresh."""
+    ledger = ProcessedLedger(tmp_path / 'ledger.db')
+    ledger.mark_classified(EMAIL, RESULT)
+
+    ledger.mark_fetched('msg1')
+
+    entry = ledger.get('msg1')
+    assert entry['state'] == 'fetched'
+    assert entry['classification'] is None
+    ledger.close()
+
+
+def test_prune_removes_old_logged_entries(tmp_path):
+    """Test that completed entries are forgotten after max_age_days."""
+    ledger = ProcessedLedger(tmp_path / 'ledger.db')
+    ledger.mark_classified(EMAIL, RESULT)
+    ledger.mark_logged(['msg1'])
+    ledger.mark_classified(dict(EMAIL, id='msg2'), RESULT)
+    time.sleep(0.01)
+
+    ledger.prune(max_age_days=0)
+
+    assert ledger.get('msg1') is None
+    assert ledger.get('msg2')['state'] == 'classified'
+    ledger.close()
+
+
+def test_record_failure_backs_off_exponentially(tmp_path):
+    """Test that each failure doubles the wait before the next attempt."""
+    ledger = ProcessedLedger(tmp_path / 'ledger.db', backoff_base=60, backoff_max=150)
+
+    first = ledger.record_failure('msg1', 'boom')
+    second = ledger.record_failure('msg1', 'boom')
+    third = ledger.record_failure('msg1', 'boom')
+
+    assert first['attempts'] == 1
+    assert 59 < first['next_attempt_at'] - time.time() <= 60
+    assert 119 < second['next_attempt_at'] - time.time() <= 120
+    assert 149 < third['next_attempt_at'] - time.time() <= 150
+    assert not ledger.should_attempt('msg1')
+    assert ledger.should_attempt('msg2')
+    ledger.close()
+
+
+def test_record_failure_quarantines_after_max_attempts(tmp_path):
+    """Test that a message is quarantined once max_attempts is reached."""
+    ledger = ProcessedLedger(tmp_path / 'ledger.db', max_attempts=2, backoff_base=0)
+
+    assert not ledger.record_failure('msg1', 'boom')['quarantined']
+    assert ledger.should_attempt('msg1')
+    assert ledger.record_failure('msg1', 'still boom')['quarantined']
+
+    assert not ledger.should_attempt('msg1')
+    assert ledger.quarantined() == [{'email_id': 'msg1', 'attempts': 2, 'last_error': 'still boom'}]
+    ledger.close()
+
+
+def test_prune_keeps_quarantines_until_labeled(tmp_path):
+    """Test that a quarantine only held locally survives pruning, and a labeled one is forgotten."""
+    ledger = ProcessedLedger(tmp_path / 'ledger.db', max_attempts=1)
+    ledger.record_failure('local', 'boom')
+    ledger.record_failure('labeled', 'boom')
+    ledger.mark_quarantine_labeled('labeled')
+    ledger.record_failure('stale', 'boom')
+    ledger._write('UPDATE failures SET quarantined = 0 WHERE email_id = ?', ('stale',))
+    time.sleep(0.01)
+
+    ledger.prune(max_age_days=0)
+
+    assert [q['email_id'] for q in ledger.quarantined()] == ['local']
+    assert ledger.should_attempt('labeled') and ledger.should_attempt('stale')
+    ledger.close()
+
+
+def test_held_back_lists_backing_off_and_quarantined(tmp_path):
+    """Test that messages not due for another attempt are held back from the unread list."""
+    ledger = ProcessedLedger(tmp_path / 'ledger.db', max_attempts=2, backoff_base=60)
+    ledger.record_failure('waiting', 'boom')
+    ledger.record_failure('quarantined', 'boom')
+    ledger.record_failure('quarantined', 'boom')
+    ledger.record_failure('due', 'boom')
+    ledger._write('UPDATE failures SET next_attempt_at = 0 WHERE email_id = ?', ('due',))
+
+    assert ledger.held_back() == {'waiting', 'quarantined'}
+    ledger.close()
+
+
+def test_migrates_failures_table_from_earlier_schema(tmp_path):
+    """Test that a ledger created before quarantine_labeled existed gains the column."""
+    db = tmp_path / 'ledger.db'
+    conn = sqlite3.connect(str(db))
+    conn.execute('CREATE TABLE failures (email_id TEXT PRIMARY KEY, attempts INTEGER NOT NULL, '
+                 'next_attempt_at REAL NOT NULL, last_error TEXT, quarantined INTEGER NOT NULL DEFAULT 0, '
+                 'updated_at REAL NOT NULL)')
+    conn.execute("INSERT INTO failures VALUES ('msg1', 5, 0, 'boom', 1, 0)")
+    conn.commit()
+    conn.close()
+
+    ledger = ProcessedLedger(db)
+    ledger.prune()
+
+    assert [q['email_id'] for q in ledger.quarantined()] == ['msg1']
+    ledger.close()
+
+
+def test_clear_failures_resets_attempts(tmp_path):
+    """Test that success forgets earlier failures."""
+    ledger = ProcessedLedger(tmp_path / 'ledger.db')
+    ledger.record_failure('msg1', 'boom')
+
+    ledger.clear_failures('msg1')
+
+    assert ledger.should_attempt('msg1')
+    assert ledger.record_failure('msg1', 'boom')['attempts'] == 1
+    ledger.close()
+
+
+def test_batched_messages_and_open_batches(tmp_path):
+    """Test that batch submissions persist until their results are collected."""
+    db = tmp_path / 'ledger.db'
+    ledger = ProcessedLedger(db)
+    ledger.mark_batched([EMAIL], 'batch-1')
+    ledger.close()
+
+    ledger = ProcessedLedger(db)
+    assert ledger.open_batches() == ['batch-1']
+    assert ledger.get('msg1')['state'] == 'batched'
+    assert ledger.get('msg1')['email']['subject'] == 'Receipt'
+
+    ledger.finish_batch('batch-1')
+    assert ledger.open_batches() == []
+    ledger.close()
+
+
+def test_prune_forgets_stale_batched_messages(tmp_path):
+    """Test that messages stuck waiting on an expired batch get classified again."""
+    ledger = ProcessedLedger(tmp_path / 'ledger.db')
+    ledger.mark_batched([EMAIL], 'batch-1')
+
+    ledger.prune(batch_max_age_days=0)
+
+    assert ledger.get('msg1') is None
+    ledger.close()
+
+
+def test_sender_history_counts_labeled_verdicts(tmp_path):
+    """Test that only labeled or logged verdicts count toward a sender's history."""
+    ledger = ProcessedLedger(tmp_path / 'ledger.db')
+    for n, category in enumerate(['Routine', 'Routine', 'Optional', 'Routine']):
+        ledger.mark_classified(dict(EMAIL, id=f'msg{n}'), dict(RESULT, classification=category))
+        if n < 3:
+            ledger.mark_labeled(f'msg{n}')
+    ledger.mark_logged(['msg0'])
+
+    assert ledger.sender_history('shop@shop.com') == {'Routine': 2, 'Optional': 1}
+    assert ledger.sender_history('other@shop.com') == {}
+    ledger.close()
@@ -1,6 +1,12 @@
+import gzip
 import json
+import os
+import threading
 from pathlib import Path
-from inbox_classifier.logger import ClassificationLogger
+from unittest.mock import patch
+
+from inbox_classifier import logger as logger_module
+from inbox_classifier.logger import ClassificationLogger, wait_for_compression
 
 def test_logger_writes_to_file(tmp_path):
     """Test that logger writes classifications to JSONL."""
@@ -15,6 +21,7 @@ def test_logger_writes_to_file(tmp_path):
         classification='Important',
         reasoning='Test reason'
     )
+    logger.close()
 
     assert log_file.exists()
 
@@ -40,5 +47,149 @@ def test_logger_creates_directory(tmp_path):
         classification='Optional',
         reasoning='Test'
     )
+    logger.close()
 
     assert log_file.exists()
+
+
+def _log(logger, email_id):
+    logger.log_classification(
+        email_id=email_id,
+        subject='Test',
+        sender='test@example.com',
+        to='me@example.com',
+        classification='Optional',
+        reasoning='Test'
+    )
+
+
+def test_logger_buffers_until_flush(tmp_path):
+    """Test that entries are held in memory until the buffer is flushed."""
+    log_file = tmp_path / "test.jsonl"
+    logger = ClassificationLogger(log_file, max_buffered=10, flush_interval=3600)
+
+    _log(logger, 'msg1')
+    _log(logger, 'msg2')
+
+    assert not log_file.exists()
+
+    logger.flush()
+
+    assert len(log_file.read_text().splitlines()) == 2
+    logger.close()
+
+
+def test_logger_flushes_when_buffer_full(tmp_path):
+    """Test that reaching max_buffered triggers a flush."""
+    log_file = tmp_path / "test.jsonl"
+    logger = ClassificationLogger(log_file, max_buffered=2, flush_interval=3600)
+
+    _log(logger, 'msg1')
+    _log(logger, 'msg2')
+    _log(logger, 'msg3')
+
+    assert len(log_file.read_text().splitlines()) == 2
+
+    logger.close()
+
+    assert len(log_file.read_text().splitlines()) == 3
+
+
+def test_logger_flushes_after_interval(tmp_path):
+    """Test that an entry older than flush_interval triggers a flush."""
+    log_file = tmp_path / "test.jsonl"
+    logger = ClassificationLogger(log_file, max_buffered=100, flush_interval=0)
+
+    _log(logger, 'msg1')
+
+    assert len(log_file.read_text().splitlines()) == 1
+    logger.close()
+
+
+def test_logger_rotates_and_compresses_old_segment(tmp_path):
+    """Test that a file from a previous day is rotated to a gzipped segment."""
+    log_file = tmp_path / "test.jsonl"
+    log_file.write_text('{"email_id": "old"}\n')
+    yesterday = 1771000000  # 2026-02-13 UTC
+    os.utime(log_file, (yesterday, yesterday))
+
+    logger = ClassificationLogger(log_file)
+    _log(logger, 'new')
+    logger.close()
+    wait_for_compression()
+
+    segment = tmp_path / "test-2026-02-13.jsonl.gz"
+    assert segment.exists()
+    assert not (tmp_path / "test-2026-02-13.jsonl").exists()
+    with gzip.open(segment, 'rt') as f:
+        assert json.loads(f.readline())['email_id'] == 'old'
+
+    entry = json.loads(log_file.read_text().splitlines()[0])
+    assert entry['email_id'] == 'new'
+
+
+def test_logger_compresses_leftover_segments(tmp_path):
+    """Test that uncompressed segments from an interrupted run are compressed."""
+    leftover = tmp_path / "test-2026-02-12.jsonl"
+    leftover.write_text('{"email_id": "old"}\n')
+
+    logger = ClassificationLogger(tmp_path / "test.jsonl")
+    logger.close()
+    wait_for_compression()
+
+    assert not leftover.exists()
+    assert (tmp_path / "test-2026-02-12.jsonl.gz").exists()
+
+
+def test_close_leaves_compression_running(tmp_path):
+    """Test that close() doesn't wait for compression, and later loggers don't compress the same segment."""
+    leftover = tmp_path / "test-2026-02-12.jsonl"
+    leftover.write_text('{"email_id": "old"}\n')
+    release, started = threading.Event(), []
+    real_compress = logger_module.compress_segment
+
+    def slow_compress(segment):
+        started.append(segment)
+        release.wait(5)
+        return real_compress(segment)
+
+    with patch.object(logger_module, 'compress_segment', slow_compress):
+        ClassificationLogger(tmp_path / "test.jsonl").close()
+        ClassificationLogger(tmp_path / "test.jsonl").close()
+        assert leftover.exists()
+
+        release.set()
+        wait_for_compression()
+
+    assert started == [leftover]
+    assert (tmp_path / "test-2026-02-12.jsonl.gz").exists()
+
+
+def test_logger_records_deciding_model(tmp_path):
+    """Test that the cascade tier is logged only when given."""
+    log_file = tmp_path / "test.jsonl"
+    logger = ClassificationLogger(log_file)
+
+    logger.log_classification('msg1', 'S', 'a@b.com', 'me', 'Routine', 'r', model='claude-haiku-4-5')
+    logger.log_classification('msg2', 'S', 'a@b.com', 'me', 'Routine', 'r')
+    logger.close()
+
+    first, second = [json.loads(line) for line in log_file.read_text().splitlines()]
+    assert first['model'] == 'claude-haiku-4-5'
+    assert 'model' not in second
+
+
+def test_logger_records_usage_cost_and_latency(tmp_path):
+    """Test that token counts, cost and latency are logged when given."""
+    log_file = tmp_path / "test.jsonl"
+    logger = ClassificationLogger(log_file)
+    usage = {'input_tokens': 900, 'output_tokens': 12, 'cache_read_tokens': 0, 'cache_write_tokens': 0}
+
+    logger.log_classification('msg1', 'S', 'a@b.com', 'me', 'Routine', 'r', model='claude-haiku-4-5',
+                              usage=usage, cost=0.00096, latency=0.42)
+    logger.close()
+
+    entry = json.loads(log_file.read_text())
+    assert entry['usage'] == usage
+    assert entry['cost'] == 0.00096
+    assert entry['latency'] == 0.42
@@ -1,6 +1,25 @@
 import pytest
 from unittest.mock import Mock, patch, call
 from inbox_classifier.main import process_emails, wait_for_new_token
+from inbox_classifier.ledger import ProcessedLedger
+
+
+@pytest.fixture(autouse=True)
+def ledger_path(tmp_path, monkeypatch):
+    """Keep account state (ledger, logs) out of the real config directory."""
+    monkeypatch.setattr('inbox_classifier.main.LOG_DIR', tmp_path)
+    return tmp_path / 'ledger.db'
+
+
+def make_cycle(ledger, service=None, label_ids=None, messages=()):
+    """Build a Cycle for the default account around a real ledger."""
+    from inbox_classifier.main import Cycle
+    from inbox_classifier.accounts import Account
+    return Cycle(
+        Account('default', ledger.db_path.parent), service or Mock(), label_ids or {},
+        [], 'key', 'rules', Mock(), ledger, [{'id': m} for m in messages]
+    )
+
 
 @patch('inbox_classifier.main.load_dotenv')
 @patch('inbox_classifier.main.os.getenv')
@@ -91,7 +110,8 @@ def test_process_emails_full_workflow(
 
     mock_fetch.assert_called_once_with(
         mock_service,
-        exclude_labels=['Important', 'Routine', 'Optional']
+        exclude_labels=['Important', 'Routine', 'Optional'],
+        exclude_ids=set()
     )
 
     # Verify both emails were processed
@@ -309,6 +329,384 @@ def test_process_emails_skips_matching_email(
     assert mock_logger.log_classification.call_count == 1
 
 
+@patch('inbox_classifier.main.load_dotenv')
+@patch('inbox_classifier.main.os.getenv')
+@patch('inbox_classifier.main.load_rules')
+@patch('inbox_classifier.main.parse_categories')
+@patch('inbox_classifier.main.parse_skip_rules')
+@patch('inbox_classifier.main.get_gmail_service')
+@patch('inbox_classifier.main.ensure_labels_exist')
+@patch('inbox_classifier.main.get_label_names')
+@patch('inbox_classifier.main.fetch_unread_emails')
+@patch('inbox_classifier.main.get_email_details')
+@patch('inbox_classifier.main.classify_email')
+@patch('inbox_classifier.main.apply_label')
+@patch('inbox_classifier.main.should_skip_email')
+@patch('inbox_classifier.main.ClassificationLogger')
+def test_process_emails_resumes_from_ledger(
+    mock_logger_class,
+    mock_should_skip,
+    mock_apply_label,
+    mock_classify,
+    mock_get_details,
+    mock_fetch,
+    mock_get_label_names,
+    mock_ensure_labels,
+    mock_get_service,
+    mock_parse_skip,
+    mock_parse_categories,
+    mock_load_rules,
+    mock_getenv,
+    mock_load_dotenv,
+    ledger_path
+):
+    """Test that verdicts recorded before a crash are reused, not reclassified."""
+    email = {'id': 'msg-1', 'subject': 'Receipt', 'sender': 'shop@shop.com', 'to': 'me@example.com'}
+    ledger = ProcessedLedger(ledger_path)
+    ledger.mark_classified(email, {'classification': 'Routine', 'reasoning': 'Receipt'})
+    labeled = dict(email, id='msg-0')
+    ledger.mark_classified(labeled, {'classification': 'Optional', 'reasoning': 'Ad'})
+    ledger.mark_labeled('msg-0')
+    ledger.close()
+
+    mock_getenv.return_value = 'test-api-key'
+    mock_parse_categories.return_value = ['Important', 'Routine', 'Optional']
+    mock_parse_skip.return_value = []
+    mock_service = Mock()
+    mock_get_service.return_value = mock_service
+    mock_ensure_labels.return_value = {'Important': 'label-123', 'Routine': 'label-789', 'Optional': 'label-456'}
+    mock_fetch.return_value = [{'id': 'msg-1'}]
+    mock_logger = Mock()
+    mock_logger_class.return_value = mock_logger
+
+    process_emails()
+
+    mock_get_details.assert_not_called()
+    mock_classify.assert_not_called()
+    mock_apply_label.assert_called_once_with(mock_service, 'msg-1', 'label-789')
+    # Labeled-but-unlogged message from the crashed run is logged too
+    logged = [c.kwargs['email_id'] for c in mock_logger.log_classification.call_args_list]
+    assert logged == ['msg-0', 'msg-1']
+
+    ledger = ProcessedLedger(ledger_path)
+    assert ledger.get('msg-0')['state'] == 'logged'
+    assert ledger.get('msg-1')['state'] == 'logged'
+    ledger.close()
+
+
+class TestBudgetPolicy:
+    """Tests for emails the Claude budget can't cover."""
+
+    EMAIL = {'id': 'msg-9', 'subject': 'Sale', 'sender': 'Shop <deals@shop.com>', 'to': 'me', 'body': ''}
+
+    def over_budget(self, ledger, monkeypatch, policy, service=None):
+        from inbox_classifier.budget import BudgetExceeded
+        monkeypatch.setenv('BUDGET_POLICY', policy)
+        cycle = make_cycle(ledger, service, {'Optional': 'label-o'})
+        item = {'id': 'msg-9', 'email': self.EMAIL, 'result': None}
+        with patch('inbox_classifier.main.classify_email', side_effect=BudgetExceeded('spent', 0)):
+            return cycle.classify(item)
+
+    def test_defer_leaves_message_untouched(self, ledger_path, monkeypatch):
+        """Deferred emails are neither labeled nor backed off."""
+        ledger = ProcessedLedger(ledger_path)
+        service = Mock()
+
+        assert self.over_budget(ledger, monkeypatch, 'defer', service) is None
+
+        service.users.assert_not_called()
+        assert ledger.should_attempt('msg-9')
+        ledger.close()
+
+    def test_inbox_marks_read(self, ledger_path, monkeypatch):
+        """With BUDGET_POLICY=inbox the email stays in the inbox, marked read."""
+        ledger = ProcessedLedger(ledger_path)
+        service = Mock()
+
+        with patch('inbox_classifier.main.execute') as mock_execute:
+            assert self.over_budget(ledger, monkeypatch, 'inbox', service) is None
+
+        service.users().messages().modify.assert_called_once_with(
+            userId='me', id='msg-9', body={'removeLabelIds': ['UNREAD']}
+        )
+        mock_execute.assert_called_once()
+        ledger.close()
+
+    def test_rules_uses_senders_usual_category(self, ledger_path, monkeypatch):
+        """With BUDGET_POLICY=rules a consistently classified sender gets its usual label."""
+        ledger = ProcessedLedger(ledger_path)
+        for n in range(3):
+            ledger.mark_classified(dict(self.EMAIL, id=f'old-{n}'), {'classification': 'Optional', 'reasoning': ''})
+            ledger.mark_labeled(f'old-{n}')
+
+        item = self.over_budget(ledger, monkeypatch, 'rules')
+
+        assert item['result']['classification'] == 'Optional'
+        assert item['result']['model'] == 'local'
+        assert ledger.get('msg-9')['state'] == 'classified'
+        ledger.close()
+
+    def test_rules_defers_unknown_sender(self, ledger_path, monkeypatch):
+        """Without enough history, BUDGET_POLICY=rules defers."""
+        ledger = ProcessedLedger(ledger_path)
+
+        assert self.over_budget(ledger, monkeypatch, 'rules') is None
+        assert ledger.get('msg-9') is None
+        ledger.close()
+
+
+class TestFailureQuarantine:
+    """Tests for per-message failure backoff and quarantine."""
+
+    @patch('inbox_classifier.main.get_email_details')
+    def test_message_in_backoff_is_not_fetched(self, mock_get_details, ledger_path):
+        """A message that failed recently is skipped without any API call."""
+        from inbox_classifier.main import run_pipeline
+        ledger = ProcessedLedger(ledger_path)
+        ledger.record_failure('msg-1', 'boom')
+
+        run_pipeline([make_cycle(ledger, messages=['msg-1'])])
+
+        mock_get_details.assert_not_called()
+        ledger.close()
+
+    @patch('inbox_classifier.main.quarantine_message')
+    @patch('inbox_classifier.main.get_label_id')
+    @patch('inbox_classifier.main.classify_email')
+    @patch('inbox_classifier.main.get_email_details')
+    def test_quarantines_after_max_attempts(self, mock_get_details, mock_classify,
+                                            mock_get_label_id, mock_quarantine, ledger_path):
+        """An unclassifiable message is quarantined once it runs out of attempts."""
+        from inbox_classifier.main import run_pipeline
+        ledger = ProcessedLedger(ledger_path, max_attempts=2, backoff_base=0)
+        service = Mock()
+        mock_get_details.return_value = {
+            'id': 'msg-1', 'subject': 'Odd', 'sender': 'x@y.com', 'to': 'me', 'body': ''
+        }
+        mock_classify.return_value = None
+        mock_get_label_id.return_value = 'Label_Q'
+
+        run_pipeline([make_cycle(ledger, service, messages=['msg-1'])])
+        mock_quarantine.assert_not_called()
+
+        run_pipeline([make_cycle(ledger, service, messages=['msg-1'])])
+        mock_quarantine.assert_called_once_with(service, 'msg-1', 'Label_Q')
+        assert not ledger.should_attempt('msg-1')
+        # Labeled in Gmail, so the ledger may forget it in time
+        ledger.prune(max_age_days=-1)
+        assert ledger.quarantined() == []
+        ledger.close()
+
+    @patch('inbox_classifier.main.quarantine_message', side_effect=Exception('label deleted'))
+    @patch('inbox_classifier.main.get_label_id')
+    def test_local_quarantine_survives_pruning(self, mock_get_label_id, mock_quarantine, ledger_path):
+        """A message whose quarantine label failed stays quarantined in the ledger."""
+        ledger = ProcessedLedger(ledger_path, max_attempts=1)
+
+        make_cycle(ledger).record_failure('msg-1', 'boom')
+        ledger.prune(max_age_days=-1)
+
+        assert not ledger.should_attempt('msg-1')
+        assert 'msg-1' in ledger.held_back()
+        ledger.close()
+
+
+class TestCycleLabelBatching:
+    """Tests for the label stage's batchModify grouping."""
+
+    @patch('inbox_classifier.main.apply_label_batch')
+    @patch('inbox_classifier.main.apply_label')
+    def test_groups_queued_messages_by_label(self, mock_apply_label, mock_apply_batch, ledger_path):
+        """Messages sharing a label go out in one batchModify call."""
+        ledger = ProcessedLedger(ledger_path)
+        service = Mock()
+        cycle = make_cycle(ledger, service, {'Routine': 'label-r', 'Optional': 'label-o'})
+        items = [
+            {'id': 'msg-1', 'email': {}, 'result': {'classification': 'Optional'}},
+            {'id': 'msg-2', 'email': {}, 'result': {'classification': 'Routine'}},
+            {'id': 'msg-3', 'email': {}, 'result': {'classification': 'Optional'}},
+        ]
+
+        labeled = cycle.label(items)
+
+        mock_apply_batch.assert_called_once_with(service, ['msg-1', 'msg-3'], 'label-o')
+        mock_apply_label.assert_called_once_with(service, 'msg-2', 'label-r')
+        assert [item['id'] for item in labeled] == ['msg-1', 'msg-3', 'msg-2']
+        ledger.close()
+
+    @patch('inbox_classifier.main.apply_label', side_effect=Exception('label deleted'))
+    def test_label_stage_is_timed_and_errors_counted(self, mock_apply_label, ledger_path):
+        """Each label call is timed as 'modify' and its failures counted under that stage."""
+        from inbox_classifier.main import ERRORS, STAGE_SECONDS
+        ledger = ProcessedLedger(ledger_path)
+        cycle = make_cycle(ledger, label_ids={'Routine': 'label-r'})
+        timed, errors = STAGE_SECONDS.count(stage='modify'), ERRORS.get(stage='modify')
+
+        cycle.label([{'id': 'msg-1', 'email': {}, 'result': {'classification': 'Routine'}}])
+
+        assert STAGE_SECONDS.count(stage='modify') == timed + 1
+        assert ERRORS.get(stage='modify') == errors + 1
+        ledger.close()
+
+    @patch('inbox_classifier.main.execute')
+    def test_skip_rules_timed_for_every_email(self, mock_execute, ledger_path):
+        """Every skip-rule check is timed as 'skip'; marking a match read is a timed 'modify' call."""
+        from inbox_classifier.main import STAGE_SECONDS
+        ledger = ProcessedLedger(ledger_path)
+        cycle = make_cycle(ledger)
+        cycle.skip_rules = [('from', 'alerts@bank.com')]
+        checks, modifies = STAGE_SECONDS.count(stage='skip'), STAGE_SECONDS.count(stage='modify')
+        emails = [{'id': 'msg-1', 'subject': 'Alert', 'sender': 'alerts@bank.com', 'to': 'me', 'body': ''},
+                  {'id': 'msg-2', 'subject': 'Hi', 'sender': 'friend@x.com', 'to': 'me', 'body': ''}]
+
+        kept = [cycle.apply_skip_rules({'id': e['id'], 'email': e, 'result': None}) for e in emails]
+
+        assert [item and item['id'] for item in kept] == [None, 'msg-2']
+        assert STAGE_SECONDS.count(stage='skip') == checks + 2
+        assert STAGE_SECONDS.count(stage='modify') == modifies + 1
+        assert cycle.usage['gmail_modify'] == 1
+        mock_execute.assert_called_once()
+        ledger.close()
+
+    def test_log_records_usage_and_cost(self, ledger_path):
+        """Tokens of every tier asked are totaled and priced per model in the log."""
+        from inbox_classifier.costs import call_usage
+        from inbox_classifier.main import SPEND
+        from types import SimpleNamespace
+        ledger = ProcessedLedger(ledger_path)
+        cycle = make_cycle(ledger)
+        email = {'id': 'msg-1', 'subject': 'News', 'sender': 'a@b.com', 'to': 'me', 'body': ''}
+        calls = [
+            call_usage('claude-haiku-4-5', SimpleNamespace(input_tokens=1000, output_tokens=10)),
+            call_usage('claude-sonnet-4-5', SimpleNamespace(input_tokens=1000, output_tokens=10)),
+        ]
+        spent = SPEND.get(model='claude-sonnet-4-5')
+
+        cycle.log({'id': 'msg-1', 'email': email, 'result': {
+            'classification': 'Optional', 'reasoning': 'digest', 'model': 'claude-sonnet-4-5',
+            'api_calls': calls, 'latency': 1.2
+        }})
+
+        logged = cycle.classification_logger.log_classification.call_args.kwargs
+        assert logged['usage']['input_tokens'] == 2000
+        assert logged['cost'] == pytest.approx((1000 * 1 + 10 * 5 + 1000 * 3 + 10 * 15) / 1e6)
+        assert logged['latency'] == 1.2
+        assert SPEND.get(model='claude-sonnet-4-5') == pytest.approx(spent + (1000 * 3 + 10 * 15) / 1e6)
+        ledger.close()
+
+    def test_log_waits_for_streamed_reason(self, ledger_path):
+        """A reason still streaming when the label is applied is logged once it arrives."""
+        from concurrent.futures import Future
+        ledger = ProcessedLedger(ledger_path)
+        cycle = make_cycle(ledger)
+        reason = Future()
+        reason.set_result('weekly digest')
+        email = {'id': 'msg-1', 'subject': 'News', 'sender': 'a@b.com', 'to': 'me', 'body': ''}
+
+        cycle.log({'id': 'msg-1', 'email': email, 'result': {
+            'classification': 'Optional', 'reasoning': '', 'pending_reasoning': reason
+        }})
+
+        logged = cycle.classification_logger.log_classification.call_args.kwargs
+        assert logged['reasoning'] == 'weekly digest'
+        ledger.close()
+
+
+def test_usage_counts_survive_concurrent_workers(ledger_path):
+    """Usage counted from many worker threads at once loses no increments."""
+    import sys
+    import threading
+    interval = sys.getswitchinterval()
+    # Switch threads as often as possible to expose lost updates
+    sys.setswitchinterval(1e-6)
+    ledger = ProcessedLedger(ledger_path)
+    cycle = make_cycle(ledger)
+
+    def work():
+        for _ in range(5000):
+            cycle.count('classify')
+
+    try:
+        threads = [threading.Thread(target=work) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        sys.setswitchinterval(interval)
+        ledger.close()
+
+    assert cycle.usage['classify'] == 40000
+
+
+class TestMultiAccount:
+    """Tests for serving several accounts from one process."""
+
+    @patch('inbox_classifier.main.load_dotenv')
+    @patch('inbox_classifier.main.os.getenv')
+    @patch('inbox_classifier.main.load_rules')
+    @patch('inbox_classifier.main.get_gmail_service')
+    @patch('inbox_classifier.main.ensure_labels_exist')
+    @patch('inbox_classifier.main.fetch_unread_emails')
+    @patch('inbox_classifier.main.get_email_details')
+    @patch('inbox_classifier.main.classify_email')
+    @patch('inbox_classifier.main.apply_label')
+    @patch('inbox_classifier.main.ClassificationLogger')
+    def test_accounts_share_pipeline_fairly(
+        self, mock_logger_class, mock_apply_label, mock_classify, mock_get_details,
+        mock_fetch, mock_ensure_labels, mock_get_service, mock_load_rules,
+        mock_getenv, mock_load_dotenv, tmp_path
+    ):
+        """Messages are interleaved across accounts and labels are cached between cycles."""
+        from inbox_classifier.accounts import Account
+        work, home = Account('work', tmp_path / 'work'), Account('home', tmp_path / 'home')
+        services = {work.token_path: Mock(name='work'), home.token_path: Mock(name='home')}
+
+        mock_getenv.return_value = 'test-api-key'
+        mock_load_rules.return_value = 'Routine emails include:\n- stuff'
+        mock_get_service.side_effect = lambda token_path: services[token_path]
+        mock_ensure_labels.return_value = {'Routine': 'label-r'}
+        mock_fetch.side_effect = lambda service, exclude_labels, exclude_ids: (
+            [{'id': 'w1'}, {'id': 'w2'}, {'id': 'w3'}] if service is services[work.token_path]
+            else [{'id': 'h1'}]
+        )
+        mock_get_details.side_effect = lambda service, msg_id: {
+            'id': msg_id, 'subject': 'S', 'sender': 'x@y.com', 'to': 'me', 'body': ''
+        }
+        mock_classify.return_value = {'classification': 'Routine', 'reasoning': 'r'}
+
+        process_emails([work, home])
+
+        fetched = [c.args[1] for c in mock_get_details.call_args_list]
+        assert fetched == ['w1', 'h1', 'w2', 'w3']
+        mock_load_rules.assert_any_call(work.rules_path)
+        mock_load_rules.assert_any_call(home.rules_path)
+        assert mock_ensure_labels.call_count == 2
+
+        process_emails([work, home])
+
+        # Label IDs come from each account's cache on the second cycle
+        assert mock_ensure_labels.call_count == 2
+
+    @patch('inbox_classifier.main.load_dotenv')
+    @patch('inbox_classifier.main.os.getenv')
+    @patch('inbox_classifier.main.start_cycle')
+    @patch('inbox_classifier.main.run_pipeline')
+    def test_broken_account_does_not_stop_others(self, mock_run, mock_start, mock_getenv,
+                                                 mock_load_dotenv, tmp_path):
+        """An account whose setup fails is skipped; the rest are processed."""
+        from inbox_classifier.accounts import Account
+        from inbox_classifier.gmail_auth import AuthenticationError
+        good_cycle = Mock(messages=[{'id': 'm1'}])
+        mock_getenv.return_value = 'test-api-key'
+        mock_start.side_effect = [AuthenticationError('revoked'), good_cycle]
+
+        process_emails([Account('a', tmp_path / 'a'), Account('b', tmp_path / 'b')])
+
+        mock_run.assert_called_once_with([good_cycle])
+        good_cycle.finish.assert_called_once()
+
+
 class TestWaitForNewToken:
     """Tests for wait_for_new_token token-polling behavior."""
 
@@ -399,3 +797,173 @@ class TestMainAuthRetry:
         assert mock_process.call_count == 3
         # heartbeat only written on success (second call)
         mock_heartbeat.assert_called_once()
+
+
+class TestOpenClassificationLogger:
+    """Tests for classification log backend selection."""
+
+    @patch('inbox_classifier.main.ClassificationLogger')
+    def test_defaults_to_jsonl(self, mock_logger_class, monkeypatch, tmp_path):
+        """Without CLASSIFICATION_STORE the JSONL logger is used."""
+        from inbox_classifier.main import open_classification_logger
+        from inbox_classifier.accounts import Account
+        monkeypatch.delenv('CLASSIFICATION_STORE', raising=False)
+
+        assert open_classification_logger(Account('default', tmp_path)) is mock_logger_class.return_value
+        mock_logger_class.assert_called_once_with(tmp_path / 'classifications.jsonl')
+
+    @patch('inbox_classifier.main.SQLiteClassificationLogger')
+    def test_sqlite_imports_existing_jsonl(self, mock_store_class, monkeypatch, tmp_path):
+        """CLASSIFICATION_STORE=sqlite opens the SQLite store and imports JSONL history."""
+        from inbox_classifier.main import open_classification_logger
+        from inbox_classifier.accounts import Account
+        monkeypatch.setenv('CLASSIFICATION_STORE', 'sqlite')
+        mock_store_class.return_value.import_jsonl.return_value = 0
+
+        store = open_classification_logger(Account('default', tmp_path))
+
+        assert store is mock_store_class.return_value
+        mock_store_class.assert_called_once_with(tmp_path / 'classifications.db')
+        store.import_jsonl.assert_called_once_with(tmp_path / 'classifications.jsonl')
+
+
+class TestBacklogMode:
+    """Tests for classifying backlogs through Message Batches."""
+
+    EMAILS = {
+        f'msg-{n}': {'id': f'msg-{n}', 'subject': f'S{n}', 'sender': 'x@y.com', 'to': 'me', 'body': 'b'}
+        for n in range(3)
+    }
+
+    @staticmethod
+    def reply(params):
+        content = params['messages'][0]['content']
+        return None if 'Subject: S2' in content else 'Routine: looks routine'
+
+    def submit(self, ledger, fake):
+        from inbox_classifier.main import run_pipeline
+        cycle = make_cycle(ledger, label_ids={'Routine': 'label-r'}, messages=list(self.EMAILS))
+        cycle.rules = 'Routine emails include:\n- stuff'
+        cycle.batch, cycle.batch_client = [], fake
+        with patch('inbox_classifier.main.get_email_details', side_effect=lambda s, i: self.EMAILS[i]), \
+                patch('inbox_classifier.main.classify_email') as mock_classify:
+            run_pipeline([cycle])
+        mock_classify.assert_not_called()
+        return cycle
+
+    def test_backlog_is_submitted_as_one_batch(self, ledger_path):
+        """In backlog mode emails are submitted instead of classified in real time."""
+        from fakes import FakeBatchClient
+        ledger = ProcessedLedger(ledger_path)
+        fake = FakeBatchClient(self.reply)
+
+        self.submit(ledger, fake)
+
+        [(batch_id, requests)] = fake.batches.items()
+        assert [r['custom_id'] for r in requests] == ['msg-0', 'msg-1', 'msg-2']
+        assert ledger.open_batches() == [batch_id]
+        assert ledger.get('msg-0')['state'] == 'batched'
+        ledger.close()
+
+    @patch('inbox_classifier.main.apply_label_batch')
+    @patch('inbox_classifier.main.get_email_details')
+    def test_results_are_labeled_in_bulk_after_restart(self, mock_get_details, mock_apply_batch, ledger_path):
+        """Finished batches found in the ledger after a restart are labeled and logged."""
+        from fakes import FakeBatchClient
+        from inbox_classifier.main import run_pipeline
+        fake = FakeBatchClient(self.reply, polls_until_done=1)
+        ledger = ProcessedLedger(ledger_path)
+        self.submit(ledger, fake)
+        ledger.close()
+
+        # Restart: a fresh ledger connection; the batch is still running
+        ledger = ProcessedLedger(ledger_path)
+        cycle = make_cycle(ledger, label_ids={'Routine': 'label-r'}, messages=list(self.EMAILS))
+        cycle.rules, cycle.batch_client = 'Routine emails include:\n- stuff', fake
+        cycle.collect_batches()
+        mock_apply_batch.assert_not_called()
+        run_pipeline([cycle])
+        mock_get_details.assert_not_called()
+
+        cycle.collect_batches()
+        cycle.finish()
+
+        mock_apply_batch.assert_called_once_with(cycle.service, ['msg-0', 'msg-1'], 'label-r')
+        ledger = ProcessedLedger(ledger_path)
+        assert ledger.get('msg-0')['state'] == 'logged'
+        assert ledger.open_batches() == []
+        # The errored request goes back to real time, after a backoff
+        assert ledger.get('msg-2')['state'] == 'fetched'
+        assert not ledger.should_attempt('msg-2')
+        ledger.close()
+
+    def test_backlog_size_counts_only_unclassified(self, ledger_path):
+        """Messages already batched or backing off don't count toward the backlog."""
+        ledger = ProcessedLedger(ledger_path)
+        ledger.mark_batched([self.EMAILS['msg-0']], 'batch-1')
+        ledger.record_failure('msg-1', 'boom')
+
+        cycle = make_cycle(ledger, messages=['msg-0', 'msg-1', 'msg-2', 'msg-3'])
+
+        assert cycle.backlog_size() == 2
+        ledger.close()
+
+    @patch('inbox_classifier.main.get_batch_client')
+    @patch('inbox_classifier.main.apply_label')
+    @patch('inbox_classifier.main.fetch_unread_emails')
+    @patch('inbox_classifier.main.get_gmail_service')
+    @patch('inbox_classifier.main.load_rules')
+    def test_finished_batches_are_labeled_before_listing(self, mock_load_rules, mock_get_service, mock_fetch,
+                                                         mock_apply_label, mock_get_batch_client, tmp_path):
+        """A new cycle labels finished batches before listing unread mail, so it doesn't reclassify them."""
+        from inbox_classifier.accounts import Account
+        from fakes import FakeBatchClient
+        from inbox_classifier.main import start_cycle
+        fake = FakeBatchClient(self.reply)
+        batch_id = fake.create([{'custom_id': 'msg-0', 'params': {'messages': [{'content': 'Subject: S0'}]}}])
+        ledger = ProcessedLedger(tmp_path / 'ledger.db')
+        ledger.mark_batched([self.EMAILS['msg-0']], batch_id)
+        ledger.close()
+        mock_get_batch_client.return_value = fake
+        mock_load_rules.return_value = 'Routine emails include:\n- stuff'
+        account = Account('default', tmp_path)
+        account.cache_label_ids(['Routine'], {'Routine': 'label-r'})
+        order = Mock()
+        order.attach_mock(mock_apply_label, 'label')
+        order.attach_mock(mock_fetch, 'fetch')
+        mock_fetch.return_value = []
+
+        cycle = start_cycle(account, 'key')
+        cycle.finish()
+
+        assert [c[0] for c in order.mock_calls] == ['label', 'fetch']
+
+    @patch('inbox_classifier.main.open_classification_logger')
+    @patch('inbox_classifier.main.fetch_unread_emails')
+    @patch('inbox_classifier.main.get_gmail_service')
+    @patch('inbox_classifier.main.load_rules')
+    def test_failed_start_closes_ledger_and_log(self, mock_load_rules, mock_get_service, mock_fetch,
+                                                mock_open_logger, tmp_path):
+        """A cycle that fails to start closes the ledger and log it opened."""
+        from inbox_classifier.accounts import Account
+        from inbox_classifier.main import start_cycle
+        mock_load_rules.return_value = 'Routine emails include:\n- stuff'
+        account = Account('default', tmp_path)
+        account.cache_label_ids(['Routine'], {'Routine': 'label-r'})
+        closed = []
+
+        with patch.object(ProcessedLedger, 'close', autospec=True,
+                          side_effect=lambda ledger: closed.append(ledger)):
+            mock_fetch.side_effect = Exception('list failed')
+            with pytest.raises(Exception, match='list failed'):
+                start_cycle(account, 'key')
+            assert len(closed) == 1
+            mock_open_logger.return_value.close.assert_called_once()
+
+            mock_open_logger.side_effect = Exception('log failed')
+            with pytest.raises(Exception, match='log failed'):
+                start_cycle(account, 'key')
+            assert len(closed) == 2
+
+        for ledger in closed:
+            ProcessedLedger.close(ledger)
@@ -0,0 +1,106 @@
+import urllib.error
+import urllib.request
+
+import pytest
+
+from inbox_classifier.metrics import Registry, serve, write_textfile
+
+
+def test_render_prometheus_text_format():
+    """Test that gauges render with help, type and labels."""
+    registry = Registry()
+    gauge = registry.gauge('queue_depth', 'Items waiting')
+    gauge.set(3, stage='classify')
+    gauge.set(1.5, stage='label "batch"')
+
+    text = registry.render()
+
+    assert '# HELP queue_depth Items waiting\n' in text
+    assert '# TYPE queue_depth gauge\n' in text
+    assert 'queue_depth{stage="classify"} 3\n' in text
+    assert 'queue_depth{stage="label \\"batch\\""} 1.5\n' in text
+
+
+def test_gauge_is_created_once():
+    """Test that asking for the same name returns the same gauge."""
+    registry = Registry()
+
+    assert registry.gauge('a', 'x') is registry.gauge('a', 'x')
+
+
+def test_write_textfile_replaces_atomically(tmp_path):
+    """Test that the metrics file is written without leaving a temp file."""
+    registry = Registry()
+    registry.gauge('up', 'Service is up').set(1)
+    path = tmp_path / 'metrics.prom'
+
+    write_textfile(path, registry)
+
+    assert path.read_text().endswith('up 1\n')
+    assert list(tmp_path.iterdir()) == [path]
+
+
+def test_counter_accumulates_per_label_set():
+    """Test that counters add up separately for each label set."""
+    registry = Registry()
+    calls = registry.counter('api_calls_total', 'Calls')
+    calls.inc(api='gmail')
+    calls.inc(2, api='gmail')
+    calls.inc(api='anthropic')
+
+    assert calls.get(api='gmail') == 3
+    assert '# TYPE api_calls_total counter\n' in registry.render()
+    assert 'api_calls_total{api="gmail"} 3\n' in registry.render()
+
+
+def test_histogram_renders_cumulative_buckets():
+    """Test that a histogram renders cumulative buckets, sum and count."""
+    registry = Registry()
+    seconds = registry.histogram('stage_seconds', 'Stage time', buckets=(0.1, 1))
+    seconds.observe(0.05, stage='get')
+    seconds.observe(0.5, stage='get')
+    seconds.observe(5, stage='get')
+
+    text = registry.render()
+
+    assert 'stage_seconds_bucket{stage="get",le="0.1"} 1\n' in text
+    assert 'stage_seconds_bucket{stage="get",le="1"} 2\n' in text
+    assert 'stage_seconds_bucket{stage="get",le="+Inf"} 3\n' in text
+    assert 'stage_seconds_sum{stage="get"} 5.55\n' in text
+    assert 'stage_seconds_count{stage="get"} 3\n' in text
+
+
+def test_histogram_times_blocks_that_raise():
+    """Test that time() records the span even when the block fails."""
+    seconds = Registry().histogram('stage_seconds', 'Stage time')
+
+    with pytest.raises(RuntimeError):
+        with seconds.time(stage='classify'):
+            raise RuntimeError('boom')
+
+    assert seconds.count(stage='classify') == 1
+
+
+def test_name_cannot_change_type():
+    """Test that reusing a metric name for another type is an error."""
+    registry = Registry()
+    registry.counter('calls', 'Calls')
+
+    with pytest.raises(ValueError):
+        registry.gauge('calls', 'Calls')
+
+
+def test_serve_exposes_metrics_endpoint():
+    """Test that /metrics serves the registry and other paths are 404."""
+    registry = Registry()
+    registry.gauge('up', 'Service is up').set(1)
+    server = serve(0, registry=registry)
+    base = f'http://127.0.0.1:{server.server_address[1]}'
+    try:
+        with urllib.request.urlopen(f'{base}/metrics') as response:
+            assert response.read().decode().endswith('up 1\n')
+        with pytest.raises(urllib.error.HTTPError):
+            urllib.request.urlopen(f'{base}/other')
+    finally:
+        server.shutdown()
+        server.server_close()
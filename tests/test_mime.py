@@ -0,0 +1,116 @@
+import base64
+from unittest.mock import patch
+
+from inbox_classifier.mime import decode_prefix, extract_text, find_text_part, part_charset
+
+
+def b64(text: str, charset: str = 'utf-8') -> str:
+    return base64.urlsafe_b64encode(text.encode(charset)).decode().rstrip('=')
+
+
+def leaf(mime_type, text, charset='utf-8', **extra):
+    return {
+        'mimeType': mime_type,
+        'headers': [{'name': 'Content-Type', 'value': f'{mime_type}; charset="{charset}"'}],
+        'body': {'data': b64(text, charset)},
+        **extra,
+    }
+
+
+def test_finds_plain_text_in_nested_multipart():
+    """Test that multipart/alternative inside multipart/mixed is searched."""
+    payload = {
+        'mimeType': 'multipart/mixed',
+        'parts': [
+            {
+                'mimeType': 'multipart/alternative',
+                'parts': [leaf('text/html', '<p>Hi</p>'), leaf('text/plain', 'Hi there')],
+            },
+            leaf('text/plain', 'attached notes', filename='notes.txt'),
+        ],
+    }
+
+    assert extract_text(payload) == 'Hi there'
+
+
+def test_attachments_are_ignored():
+    """Test that text attachments are not mistaken for the body."""
+    payload = {'mimeType': 'multipart/mixed', 'parts': [leaf('text/plain', 'log', filename='a.log')]}
+
+    assert find_text_part(payload) is None
+    assert extract_text(payload) == ''
+
+
+def test_honors_declared_charset():
+    """Test that the part's charset is used instead of assuming UTF-8."""
+    part = leaf('text/plain', 'Grüße aus Köln', charset='iso-8859-1')
+
+    assert part_charset(part) == 'iso8859-1'
+    assert extract_text({'mimeType': 'multipart/mixed', 'parts': [part]}) == 'Grüße aus Köln'
+
+
+def test_unknown_charset_falls_back_to_utf8():
+    """Test that a bogus charset doesn't break decoding."""
+    part = leaf('text/plain', 'hello')
+    part['headers'][0]['value'] = 'text/plain; charset=x-made-up'
+
+    assert part_charset(part) == 'utf-8'
+
+
+def test_decodes_only_the_needed_prefix():
+    """Test that a huge body is decoded only as far as the budget requires."""
+    data = b64('é' * 1_000_000)
+
+    with patch('inbox_classifier.mime.base64.urlsafe_b64decode', wraps=base64.urlsafe_b64decode) as decode:
+        text = decode_prefix(data, 'utf-8', max_chars=300)
+
+    assert text == 'é' * 300
+    assert len(decode.call_args.args[0]) <= 300 * 4 * 4 // 3 + 4
+
+
+def test_truncated_multibyte_character_is_dropped():
+    """Test that a character split by the cut is not emitted as garbage."""
+    data = b64('€' * 10)  # 3 bytes each
+
+    assert decode_prefix(data, 'utf-8', max_chars=1) == '€'
+    assert decode_prefix(b64('a€'), 'utf-8', max_chars=300) == 'a€'
+
+
+def test_single_part_body_without_mime_type():
+    """Test that a bare payload body is used as the text."""
+    assert extract_text({'body': {'data': b64('Just text')}}) == 'Just text'
+
+
+def test_html_only_message_is_converted_to_text():
+    """Test that HTML-only mail yields its visible text."""
+    payload = {
+        'mimeType': 'multipart/alternative',
+        'parts': [leaf('text/html', '<style>p{}</style><p>Your order &#35;123 shipped</p>')],
+    }
+
+    assert extract_text(payload) == 'Your order #123 shipped'
+
+
+def test_html_is_streamed_and_stops_early():
+    """Test that only the start of a huge HTML body is decoded."""
+    html = '<p>' + 'word ' * 2_000_000 + '</p>'
+    payload = leaf('text/html', html)
+
+    with patch('inbox_classifier.mime.base64.urlsafe_b64decode', wraps=base64.urlsafe_b64decode) as decode:
+        text = extract_text(payload, max_chars=100)
+
+    assert text.startswith('word word')
+    assert decode.call_count == 1
+
+
+def test_non_text_codec_charset_falls_back_to_utf8():
+    """Test that charsets naming bytes-to-bytes codecs are treated as UTF-8 instead of raising."""
+    for charset in ('hex', 'base64', 'rot13', 'zlib', 'bz2', 'quopri', 'uu'):
+        part = {
+            'mimeType': 'text/plain',
+            'headers': [{'name': 'Content-Type', 'value': f'text/plain; charset={charset}'}],
+            'body': {'data': b64('Plain text')},
+        }
+
+        assert part_charset(part) == 'utf-8'
+        assert extract_text({'parts': [part]}) == 'Plain text'
@@ -0,0 +1,137 @@
+import threading
+import time
+from inbox_classifier.pipeline import Pipeline
+
+
+def test_pipeline_runs_items_through_stages_in_order():
+    """Test that items pass through every stage, preserving order with one worker each."""
+    results = []
+    pipeline = Pipeline()
+    pipeline.add_stage('double', lambda x: x * 2)
+    pipeline.add_stage('inc', lambda x: x + 1)
+    pipeline.add_stage('collect', results.append)
+
+    pipeline.run([1, 2, 3])
+
+    assert results == [3, 5, 7]
+
+
+def test_pipeline_drops_none_outputs():
+    """Test that returning None removes an item from the pipeline."""
+    results = []
+    pipeline = Pipeline()
+    pipeline.add_stage('filter', lambda x: x if x % 2 else None)
+    pipeline.add_stage('collect', results.append)
+
+    pipeline.run(range(6))
+
+    assert results == [1, 3, 5]
+
+
+def test_pipeline_reports_errors_and_continues():
+    """Test that a failing item is reported and the rest keep flowing."""
+    errors = []
+    results = []
+
+    def fail_on_two(x):
+        if x == 2:
+            raise ValueError('boom')
+        return x
+
+    pipeline = Pipeline(on_error=lambda stage, item, e: errors.append((stage, item, str(e))))
+    pipeline.add_stage('check', fail_on_two)
+    pipeline.add_stage('collect', results.append)
+
+    pipeline.run([1, 2, 3])
+
+    assert results == [1, 3]
+    assert errors == [('check', 2, 'boom')]
+
+
+def test_pipeline_survives_failing_error_handler():
+    """Test that an on_error handler raising doesn't kill the worker and hang run()."""
+    results = []
+
+    def broken_handler(stage, item, error):
+        raise RuntimeError('database is locked')
+
+    pipeline = Pipeline(on_error=broken_handler)
+    pipeline.add_stage('fail', lambda x: 1 / x, workers=2)
+    pipeline.add_stage('collect', results.append)
+
+    runner = threading.Thread(target=pipeline.run, args=([1, 0, 2, 0, 4],), daemon=True)
+    runner.start()
+    runner.join(timeout=5)
+
+    assert not runner.is_alive()
+    assert sorted(results) == [0.25, 0.5, 1.0]
+
+
+def test_pipeline_batches_queued_items():
+    """Test that batch stages receive whatever is queued, up to batch_size."""
+    batches = []
+    release = threading.Event()
+
+    def gate(x):
+        release.wait()
+        return x
+
+    def record(batch):
+        batches.append(list(batch))
+        return batch
+
+    pipeline = Pipeline()
+    pipeline.add_stage('gate', gate, workers=4)
+    pipeline.add_stage('batch', record, batch_size=3)
+    threading.Timer(0.05, release.set).start()
+
+    pipeline.run(range(4))
+
+    assert sorted(x for batch in batches for x in batch) == [0, 1, 2, 3]
+    assert all(len(batch) <= 3 for batch in batches)
+
+
+def test_pipeline_overlaps_stages():
+    """Test that slow stages run concurrently rather than one item at a time."""
+    pipeline = Pipeline()
+    pipeline.add_stage('download', lambda x: time.sleep(0.05) or x)
+    pipeline.add_stage('classify', lambda x: time.sleep(0.05) or x)
+
+    start = time.monotonic()
+    pipeline.run(range(6))
+    elapsed = time.monotonic() - start
+
+    # Sequential would take 6 * 0.1 = 0.6s; overlapped about 7 * 0.05 = 0.35s
+    assert elapsed < 0.5
+
+
+def test_pipeline_bounded_queue_applies_backpressure():
+    """Test that a full queue blocks the upstream stage."""
+    max_depth = []
+    pipeline = Pipeline()
+
+    def slow(x):
+        max_depth.append(pipeline.stages[1].queue.qsize())
+        time.sleep(0.01)
+
+    pipeline.add_stage('fast', lambda x: x)
+    pipeline.add_stage('slow', slow, queue_size=2)
+
+    pipeline.run(range(20))
+
+    assert max(max_depth) <= 2
+
+
+def test_pipeline_stats():
+    """Test per-stage processed counts and throughput."""
+    pipeline = Pipeline()
+    pipeline.add_stage('a', lambda x: x, workers=2)
+    pipeline.add_stage('b', lambda x: None)
+
+    stats = pipeline.run(range(5))
+
+    assert stats['a']['processed'] == 5
+    assert stats['a']['workers'] == 2
+    assert stats['b']['processed'] == 5
+    assert stats['b']['queue_depth'] == 0
+    assert stats['a']['throughput'] > 0
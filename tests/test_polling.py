@@ -0,0 +1,93 @@
+from datetime import datetime
+
+from inbox_classifier.metrics import REGISTRY
+from inbox_classifier.polling import PollScheduler, parse_quiet_hours
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+NOON = lambda: datetime(2026, 3, 2, 12, 0)
+
+
+def make_scheduler(**kwargs):
+    clock = FakeClock()
+    return PollScheduler(floor=10, ceiling=300, clock=clock, now=NOON, **kwargs), clock
+
+
+def poll(scheduler, clock, elapsed, seen):
+    clock.now += elapsed
+    scheduler.record_cycle(seen)
+    return scheduler.next_interval()
+
+
+def test_idle_inbox_polls_at_ceiling():
+    """Test that with no mail the scheduler waits the maximum interval."""
+    scheduler, clock = make_scheduler()
+
+    assert poll(scheduler, clock, 0, []) == 300
+    assert poll(scheduler, clock, 300, []) == 300
+
+
+def test_flowing_mail_shortens_to_floor():
+    """Test that a burst of new mail drops the interval to the floor."""
+    scheduler, clock = make_scheduler()
+    poll(scheduler, clock, 0, [])
+
+    assert poll(scheduler, clock, 60, [f'm{i}' for i in range(10)]) == 10
+
+
+def test_interval_backs_off_when_mail_stops():
+    """Test that the interval grows gradually back toward the ceiling."""
+    scheduler, clock = make_scheduler(decay=600)
+    poll(scheduler, clock, 0, [])
+    poll(scheduler, clock, 60, [f'm{i}' for i in range(10)])
+
+    intervals = [poll(scheduler, clock, 10, []) for _ in range(30)]
+    intervals += [poll(scheduler, clock, 300, []) for _ in range(10)]
+
+    assert intervals == sorted(intervals)
+    assert 10 < intervals[30] < 300
+    assert intervals[-1] == 300
+
+
+def test_only_new_messages_count_as_arrivals():
+    """Test that messages still unread from the last check are not counted again."""
+    scheduler, clock = make_scheduler()
+    poll(scheduler, clock, 0, ['stuck'])
+
+    assert poll(scheduler, clock, 300, ['stuck']) == 300
+
+
+def test_quiet_hours_use_quiet_interval():
+    """Test that quiet hours override the rate and end on time."""
+    clock = FakeClock()
+    scheduler = PollScheduler(
+        floor=10, ceiling=300, clock=clock, quiet_hours=parse_quiet_hours('22:00-07:00'),
+        quiet_interval=900, now=lambda: datetime(2026, 3, 2, 23, 0)
+    )
+    scheduler.record_cycle(['a', 'b', 'c'])
+
+    assert scheduler.next_interval() == 900
+
+    scheduler.now = lambda: datetime(2026, 3, 3, 6, 55)
+    assert scheduler.next_interval() == 300  # wakes when the window ends
+
+
+def test_parse_quiet_hours():
+    """Test that windows are parsed into minutes of the day."""
+    assert parse_quiet_hours('22:00-07:00, 12:30-13:00') == [(1320, 420), (750, 780)]
+    assert parse_quiet_hours('') == []
+
+
+def test_interval_is_exported_as_metric():
+    """Test that the chosen interval is published as a gauge."""
+    scheduler, clock = make_scheduler()
+    poll(scheduler, clock, 0, [])
+
+    assert 'inbox_classifier_poll_interval_seconds 300' in REGISTRY.render()
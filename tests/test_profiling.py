@@ -0,0 +1,97 @@
+import json
+import os
+import pstats
+import signal
+import tracemalloc
+
+import pytest
+
+from inbox_classifier.pipeline import Pipeline
+from inbox_classifier.profiling import CycleProfiler
+
+
+def busy_classify(item):
+    sum(range(1000))
+    return item
+
+
+def run(profiler, items):
+    pipeline = Pipeline()
+    pipeline.add_stage('details', profiler.stage('details', lambda item: None if item['id'] == 'skip' else item))
+    pipeline.add_stage('classify', profiler.stage('classify', busy_classify), workers=2)
+    pipeline.add_stage('label', profiler.stage('label', lambda batch: batch, batch=True), batch_size=10)
+    pipeline.add_stage('log', profiler.stage('log', lambda item: None, last=True))
+    pipeline.run(items)
+
+
+def test_off_by_default(tmp_path):
+    """Test that an unarmed profiler leaves stage functions unwrapped and writes nothing."""
+    profiler = CycleProfiler(tmp_path / 'profiles')
+
+    assert profiler.stage('classify', busy_classify) is busy_classify
+    with profiler.profile_cycle():
+        pass
+    assert not (tmp_path / 'profiles').exists()
+
+
+def test_profiles_armed_cycles_including_workers(tmp_path):
+    """Test that each armed cycle writes a cProfile covering worker threads and a memory diff."""
+    profiler = CycleProfiler(tmp_path, cycles=1)
+
+    with profiler.profile_cycle():
+        run(profiler, [{'id': f'msg-{n}'} for n in range(5)])
+
+    [prof] = tmp_path.glob('cycle-*.prof')
+    functions = {name for _, _, name in pstats.Stats(str(prof)).stats}
+    assert 'busy_classify' in functions
+    assert prof.with_suffix('.txt').read_text().startswith('Cycle took')
+    assert 'Traced memory' in next(tmp_path.glob('cycle-*-memory.txt')).read_text()
+    assert profiler.remaining == 0
+    assert not tracemalloc.is_tracing()
+
+    # Disarmed again: the next cycle isn't profiled
+    with profiler.profile_cycle():
+        pass
+    assert len(list(tmp_path.glob('cycle-*.prof'))) == 1
+
+
+def test_leaves_outside_tracing_running(tmp_path):
+    """Test that tracemalloc started by someone else is still tracing after the last armed cycle."""
+    profiler = CycleProfiler(tmp_path, cycles=1)
+    tracemalloc.start()
+    try:
+        with profiler.profile_cycle():
+            pass
+        assert tracemalloc.is_tracing()
+    finally:
+        tracemalloc.stop()
+
+
+def test_records_slow_emails_with_stage_timings(tmp_path):
+    """Test that messages over the threshold are recorded, including dropped ones."""
+    profiler = CycleProfiler(tmp_path, slow_seconds=0)
+    email = {'subject': 'Big newsletter', 'sender': 'news@example.com', 'body': 'word ' * 100}
+
+    run(profiler, [{'id': 'msg-1', 'email': email, 'result': {'classification': 'Optional'}},
+                   {'id': 'skip', 'email': email}])
+
+    records = {r['email_id']: r for r in map(json.loads, (tmp_path / 'slow-emails.jsonl').read_text().splitlines())}
+    assert records['msg-1']['outcome'] == 'done'
+    assert set(records['msg-1']['stages']) == {'details', 'classify', 'label', 'log'}
+    assert records['msg-1']['body_chars'] == 500
+    assert records['msg-1']['classification'] == 'Optional'
+    assert records['skip']['outcome'] == 'dropped'
+    assert set(records['skip']['stages']) == {'details'}
+
+
+@pytest.mark.skipif(not hasattr(signal, 'SIGUSR1'), reason='no SIGUSR1 on this platform')
+def test_sigusr1_arms_profiling(tmp_path):
+    """Test that SIGUSR1 arms the configured number of cycles."""
+    profiler = CycleProfiler(tmp_path, signal_cycles=2)
+    previous = signal.getsignal(signal.SIGUSR1)
+    try:
+        assert profiler.install_signal_handler()
+        os.kill(os.getpid(), signal.SIGUSR1)
+        assert profiler.remaining == 2
+    finally:
+        signal.signal(signal.SIGUSR1, previous)
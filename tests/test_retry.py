@@ -0,0 +1,167 @@
+import socket
+import threading
+import time
+from unittest.mock import Mock, patch
+
+import anthropic
+import pytest
+from google.oauth2.credentials import Credentials
+from googleapiclient.errors import HttpError
+from googleapiclient.http import HttpRequest
+
+from inbox_classifier import ai_classifier
+from inbox_classifier.gmail_client import execute
+from inbox_classifier.retry import Backoff, call_with_retry, is_retryable, retry_after
+
+
+EMAIL = {'subject': 'Receipt', 'sender': 'shop@example.com', 'to': 'me@example.com', 'body': 'Thanks'}
+
+
+def http_error(status, headers=None, content=b''):
+    resp = Mock(status=status)
+    resp.get = (headers or {}).get
+    return HttpError(resp=resp, content=content)
+
+
+def anthropic_error(cls, status, headers=None):
+    return cls('error', response=Mock(status_code=status, headers=headers or {}), body=None)
+
+
+def test_backoff_is_jittered_and_capped():
+    """Test that delays stay within [base, cap] and grow from the base."""
+    backoff = Backoff(base=1, cap=10)
+
+    delays = [backoff.next() for _ in range(50)]
+
+    assert all(1 <= d <= 10 for d in delays)
+    assert delays[0] <= 3
+    backoff.reset()
+    assert backoff.next() <= 3
+
+
+def test_retryable_errors():
+    """Test which errors are considered transient."""
+    assert is_retryable(http_error(429))
+    assert is_retryable(http_error(503))
+    assert is_retryable(http_error(403, content=b'{"reason": "userRateLimitExceeded"}'))
+    assert is_retryable(ConnectionResetError())
+    assert is_retryable(anthropic_error(anthropic.RateLimitError, 429))
+    assert is_retryable(anthropic_error(anthropic.InternalServerError, 529))
+
+    assert not is_retryable(http_error(404))
+    assert not is_retryable(http_error(403, content=b'{"reason": "forbidden"}'))
+    assert not is_retryable(anthropic_error(anthropic.BadRequestError, 400))
+    assert not is_retryable(ValueError())
+
+
+def test_retry_after_header():
+    """Test that Retry-After is read from Gmail and Anthropic errors."""
+    assert retry_after(http_error(429, {'retry-after': '7'})) == 7
+    assert retry_after(anthropic_error(anthropic.RateLimitError, 429, {'retry-after': '3'})) == 3
+    assert retry_after(http_error(429)) is None
+    assert retry_after(ValueError()) is None
+
+
+@patch('inbox_classifier.retry.time.sleep')
+def test_retries_transient_errors_then_succeeds(mock_sleep):
+    """Test that a brief blip costs a couple of short sleeps."""
+    func = Mock(side_effect=[http_error(503), ConnectionResetError(), 'ok'])
+
+    assert call_with_retry(func, 'a', key='b') == 'ok'
+    assert func.call_count == 3
+    func.assert_called_with('a', key='b')
+    assert mock_sleep.call_count == 2
+    assert all(call.args[0] <= 20 for call in mock_sleep.call_args_list)
+
+
+@patch('inbox_classifier.retry.time.sleep')
+def test_honors_retry_after(mock_sleep):
+    """Test that the server's requested wait is respected."""
+    func = Mock(side_effect=[http_error(429, {'retry-after': '12'}), 'ok'])
+
+    call_with_retry(func)
+
+    mock_sleep.assert_called_once_with(12)
+
+
+@patch('inbox_classifier.retry.time.sleep')
+def test_permanent_errors_are_not_retried(mock_sleep):
+    """Test that non-transient errors propagate immediately."""
+    func = Mock(side_effect=http_error(404))
+
+    with pytest.raises(HttpError):
+        call_with_retry(func)
+    assert func.call_count == 1
+    mock_sleep.assert_not_called()
+
+
+@patch('inbox_classifier.retry.time.sleep')
+def test_gives_up_at_deadline(mock_sleep, monkeypatch):
+    """Test that retries stop once the next wait would pass the deadline."""
+    monkeypatch.setenv('RETRY_DEADLINE', '10')
+    func = Mock(side_effect=http_error(429, {'retry-after': '30'}))
+
+    with pytest.raises(HttpError):
+        call_with_retry(func)
+    assert func.call_count == 1
+    mock_sleep.assert_not_called()
+
+
+@pytest.fixture
+def hanging_server():
+    """URL of a local server that accepts connections and never answers."""
+    server = socket.create_server(('127.0.0.1', 0))
+    held = []
+
+    def accept():
+        while True:
+            try:
+                held.append(server.accept()[0])
+            except OSError:
+                return
+
+    threading.Thread(target=accept, daemon=True).start()
+    yield f'http://127.0.0.1:{server.getsockname()[1]}'
+    server.close()
+    for connection in held:
+        connection.close()
+
+
+def test_attempts_get_the_time_left_as_timeout(monkeypatch):
+    """Test that each attempt's timeout is what is left of the deadline."""
+    monkeypatch.setenv('RETRY_DEADLINE', '30')
+    monkeypatch.setenv('RETRY_BASE_DELAY', '0')
+    func = Mock(side_effect=[TimeoutError(), 'ok'])
+
+    assert call_with_retry(func, pass_timeout=True) == 'ok'
+
+    first, second = (call.kwargs['timeout'] for call in func.call_args_list)
+    assert 29 < first <= 30
+    assert second <= first
+
+
+def test_hung_gmail_call_is_cut_off_at_deadline(hanging_server, monkeypatch):
+    """Test that a Gmail request that never gets an answer fails at RETRY_DEADLINE."""
+    monkeypatch.setenv('RETRY_DEADLINE', '1')
+    credentials = Credentials(token='token')
+    request = HttpRequest(Mock(credentials=credentials), lambda response, content: content,
+                          f'{hanging_server}/gmail/v1/users/me/messages', methodId='gmail.users.messages.list')
+
+    started = time.monotonic()
+    with pytest.raises(TimeoutError):
+        execute(request)
+    assert time.monotonic() - started < 3
+
+
+def test_hung_claude_call_is_cut_off_at_deadline(hanging_server, monkeypatch):
+    """Test that a Claude request that never gets an answer fails at RETRY_DEADLINE."""
+    monkeypatch.setenv('RETRY_DEADLINE', '1')
+    monkeypatch.setenv('ANTHROPIC_BASE_URL', hanging_server)
+    monkeypatch.setenv('CLASSIFIER_MODELS', 'small')
+    monkeypatch.setenv('CLASSIFIER_STREAMING', 'off')
+    monkeypatch.setattr(ai_classifier, '_clients', {})
+
+    started = time.monotonic()
+    with pytest.raises(anthropic.APITimeoutError):
+        ai_classifier.classify_email(EMAIL, 'key', rules='Important emails include:\n- receipts')
+    assert time.monotonic() - started < 3
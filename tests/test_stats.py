@@ -0,0 +1,144 @@
+from collections import Counter
+import gzip
+import json
+import pytest
+from inbox_classifier.logger import ClassificationLogger
+from inbox_classifier.stats import collect_db_stats, collect_stats, format_report, segment_stats
+from inbox_classifier.cli import main
+
+
+def _entry(day, sender, classification, subject='Hi'):
+    return json.dumps({
+        'timestamp': f'{day}T12:00:00',
+        'email_id': 'msg',
+        'subject': subject,
+        'sender': sender,
+        'to': 'me@example.com',
+        'classification': classification,
+        'reasoning': 'because'
+    }) + '\n'
+
+
+def test_segment_stats_counts_fields(tmp_path):
+    """Test per-category, per-sender and per-day counts for one segment."""
+    log_file = tmp_path / 'classifications.jsonl'
+    log_file.write_text(
+        _entry('2026-02-13', 'Shop <deals@shop.com>', 'Optional')
+        + _entry('2026-02-13', 'deals@SHOP.com', 'Optional')
+        + _entry('2026-02-14', 'boss@work.com', 'Important', subject='"sender": "fake"')
+    )
+
+    stats = segment_stats(log_file)
+
+    assert stats['category'] == {'Optional': 2, 'Important': 1}
+    assert stats['sender'] == {'deals@shop.com': 2, 'boss@work.com': 1}
+    assert stats['day'] == {'2026-02-13': 2, '2026-02-14': 1}
+
+
+def test_segment_stats_decodes_escaped_values(tmp_path):
+    """Test that JSON escapes in captured fields are decoded."""
+    log_file = tmp_path / 'classifications.jsonl'
+    log_file.write_text(_entry('2026-02-13', 'Café <cafe@example.com>', '0_Wichtigé'))
+
+    stats = segment_stats(log_file)
+
+    assert stats['category'] == {'0_Wichtigé': 1}
+    assert stats['sender'] == {'cafe@example.com': 1}
+
+
+def test_collect_stats_reads_gzip_segments_in_parallel(tmp_path):
+    """Test aggregation across compressed segments and the active file."""
+    log_file = tmp_path / 'classifications.jsonl'
+    with gzip.open(tmp_path / 'classifications-2026-02-12.jsonl.gz', 'wt') as f:
+        f.write(_entry('2026-02-12', 'a@a.com', 'Routine'))
+    with gzip.open(tmp_path / 'classifications-2026-02-13.jsonl.gz', 'wt') as f:
+        f.write(_entry('2026-02-13', 'a@a.com', 'Routine'))
+    log_file.write_text(_entry('2026-02-14', 'b@b.com', 'Optional'))
+
+    stats = collect_stats(log_file, workers=2)
+
+    assert stats['category'] == {'Routine': 2, 'Optional': 1}
+    assert stats['sender'] == {'a@a.com': 2, 'b@b.com': 1}
+
+
+def test_collect_stats_since_filters_entries(tmp_path):
+    """Test that --since skips older segments and entries."""
+    log_file = tmp_path / 'classifications.jsonl'
+    with gzip.open(tmp_path / 'classifications-2026-02-12.jsonl.gz', 'wt') as f:
+        f.write(_entry('2026-02-12', 'a@a.com', 'Routine'))
+    log_file.write_text(
+        _entry('2026-02-13', 'a@a.com', 'Routine')
+        + _entry('2026-02-14', 'b@b.com', 'Optional')
+    )
+
+    stats = collect_stats(log_file, since='2026-02-14', workers=1)
+
+    assert stats['day'] == {'2026-02-14': 1}
+
+
+def test_stats_reads_logger_output(tmp_path):
+    """Test that the fast parser understands ClassificationLogger's format."""
+    log_file = tmp_path / 'classifications.jsonl'
+    logger = ClassificationLogger(log_file)
+    logger.log_classification('msg1', 'Subj', 'x@y.com', 'me', 'Important', 'r')
+    logger.close()
+
+    stats = collect_stats(log_file)
+
+    assert stats['category'] == {'Important': 1}
+
+
+def test_format_report_empty():
+    """Test report rendering with no data."""
+    report = format_report({'category': Counter(), 'sender': Counter(), 'day': Counter()})
+
+    assert 'Total classified: 0' in report
+
+
+def test_cli_stats_prints_report(tmp_path, capsys):
+    """Test the stats subcommand."""
+    log_file = tmp_path / 'classifications.jsonl'
+    log_file.write_text(_entry('2026-02-13', 'a@a.com', 'Routine'))
+
+    main(['stats', '--log', str(log_file)])
+
+    out = capsys.readouterr().out
+    assert 'Total classified: 1' in out
+    assert 'Routine' in out
+    assert 'a@a.com' in out
+
+
+def _sqlite_store(tmp_path):
+    from inbox_classifier.classification_store import SQLiteClassificationLogger
+    db_path = tmp_path / 'classifications.db'
+    log_file = tmp_path / 'classifications.jsonl'
+    log_file.write_text(_entry('2026-02-13', 'Shop <deals@shop.com>', 'Optional'))
+    store = SQLiteClassificationLogger(db_path)
+    store.import_jsonl(log_file)
+    store.log_classification('msg-2', 'Hi', 'deals@SHOP.com', 'me@example.com', 'Optional', 'sale')
+    store.log_classification('msg-3', 'Hi', 'boss@work.com', 'me@example.com', 'Important', 'boss')
+    store.close()
+    return db_path
+
+
+def test_collect_db_stats_counts_the_sqlite_store(tmp_path):
+    """Test that the SQLite store's history, imported JSONL included, is counted."""
+    stats = collect_db_stats(_sqlite_store(tmp_path))
+
+    assert stats['category'] == Counter({'Optional': 2, 'Important': 1})
+    assert stats['sender'] == Counter({'deals@shop.com': 2, 'boss@work.com': 1})
+    assert stats['day']['2026-02-13'] == 1
+    assert sum(collect_db_stats(tmp_path / 'classifications.db', since='2026-02-14')['day'].values()) == 2
+
+
+def test_cli_stats_reads_sqlite_store(tmp_path, capsys, monkeypatch):
+    """Test that stats reads the database, not the stale JSONL log, once the SQLite store is selected."""
+    monkeypatch.setenv('CLASSIFICATION_STORE', 'sqlite')
+    db_path = _sqlite_store(tmp_path)
+
+    main(['stats', '--log', str(tmp_path / 'classifications.jsonl'), '--db', str(db_path)])
+
+    assert 'Total classified: 3' in capsys.readouterr().out
+    with pytest.raises(SystemExit):
+        main(['stats', '--db', str(tmp_path / 'missing.db')])
+    assert 'does not exist' in capsys.readouterr().err